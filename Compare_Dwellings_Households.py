@@ -1,37 +1,15 @@
-import pandas as pd
-import json
+from zip_panel import load_panel
 
-# --- Paths ---
-dwellings_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/DwellingData/2023Dwellings.csv'
-households_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Households.json'
-
-# === Load Dwellings ===
-dwellings_df = pd.read_csv(dwellings_path)
-dwellings_df['Zip Code'] = dwellings_df['NAME'].str.extract(r'(\d{5})')
-dwellings_df['Zip Code'] = dwellings_df['Zip Code'].astype(str).str.zfill(5)
+# === Dwellings (ACS B25024) and Households (ACS B11001), joined by ZIP in the cached ZIP-year panel ===
+panel = load_panel()
+# Both are per-ZIP sources, repeated across the panel's years; keep one row per ZIP
+check = panel[panel['has_dwellings'] & panel['has_households']].drop_duplicates('Zip Code')
+check = check[['Zip Code', 'num_detached', 'detached_vacant', 'num_households']].reset_index(drop=True)
 
 # Single-family detached total units (occupied + vacant)
-dwellings_df['detached_total'] = pd.to_numeric(dwellings_df['B25024_002E'], errors='coerce')
-# Vacant detached units
-dwellings_df['detached_vacant'] = pd.to_numeric(dwellings_df['B25024_010E'], errors='coerce')
+check['detached_total'] = check['num_detached']
 # Occupied detached units
-dwellings_df['detached_occupied'] = dwellings_df['detached_total'] - dwellings_df['detached_vacant']
-
-# === Load Households JSON ===
-with open(households_path, 'r') as f:
-    data = json.load(f)
-headers = data[0]
-rows = data[1:]
-households_df = pd.DataFrame(rows, columns=headers)
-households_df.rename(columns={
-    'zip code tabulation area': 'Zip Code',
-    'B11001_001E': 'num_households'
-}, inplace=True)
-households_df['Zip Code'] = households_df['Zip Code'].astype(str).str.zfill(5)
-households_df['num_households'] = pd.to_numeric(households_df['num_households'], errors='coerce')
-
-# === Merge for Quick Check ===
-check = dwellings_df.merge(households_df[['Zip Code', 'num_households']], on='Zip Code', how='inner')
+check['detached_occupied'] = check['detached_total'] - check['detached_vacant']
 
 # Compare households vs occupied detached units
 check['difference_households_vs_occupied_detached'] = check['num_households'] - check['detached_occupied']
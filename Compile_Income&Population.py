@@ -1,6 +1,8 @@
 
 import pandas as pd
 
+from zip_codes import normalize_zips, extract_zip
+
 # === Step 1: Load both datasets ===
 
 # Replace with your actual file paths
@@ -19,13 +21,12 @@ print("Population data columns:", pop_df.columns)
 
 # === Step 2: Filter and aggregate tax data to 2020 ===
 tax_df_2020 = tax_df[tax_df['TaxYear'] == 2020].copy()
-tax_df_2020['ZipCode'] = tax_df_2020['ZipCode'].astype(str).str.zfill(5)
+tax_df_2020['ZipCode'] = normalize_zips(tax_df_2020['ZipCode'])
 tax_df_2020 = tax_df_2020[['ZipCode', 'CAAGI']]
 
 # For population data:
 # Extract the numeric ZIP from the NAME column (e.g., 'ZCTA5_95014' → '95014')
-pop_df['ZipCode'] = pop_df['NAME'].str.extract(r'ZCTA5 (\d{5})')
-pop_df['ZipCode'] = pop_df['ZipCode'].astype(str)
+pop_df['ZipCode'] = extract_zip(pop_df['NAME'])
 
 # Keep only relevant columns
 pop_df = pop_df[['ZipCode', 'P1_001N']]
@@ -97,19 +98,15 @@ print("✅ Updated CSV now includes CAAGI_per_capita")
 
 
 # === Step 6: Map per-capita income by ZIP ===
-import geopandas as gpd
 import matplotlib.pyplot as plt
+from zcta_store import load_zcta
 
 # Clip the top 1% for color scaling
 upper = merged_df['CAAGI_per_capita'].quantile(0.99)
 map_df = merged_df[merged_df['CAAGI_per_capita'] <= upper]
 
-# Load ZCTA shapefile (replace with your actual path)
-shapefile_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/tl_2025_us_zcta520/tl_2025_us_zcta520.shp'
-zcta_gdf = gpd.read_file(shapefile_path)
-
-# Make sure the ZCTA column matches your ZIP codes
-zcta_gdf['ZipCode'] = zcta_gdf['ZCTA5CE20'].astype(str).str.zfill(5)  # adjust column name if different
+# Load California ZCTAs from the prebuilt store (zip5 is already normalized)
+zcta_gdf = load_zcta(figsize=(10, 12)).rename(columns={'zip5': 'ZipCode'})
 
 # Merge shapefile with your data
 map_gdf = zcta_gdf.merge(map_df, on='ZipCode', how='left')
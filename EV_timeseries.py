@@ -1,77 +1,49 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+
+from fuel_taxonomy import PLUGIN_CLASSES
+from fleet_cube import load_fleet_cube, cumulative_curves, fleet_composition, fleet_turnover, make_shares
 
 # ---------------- USER CONFIG ----------------
 CSV_FILE = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/DMV Count Expanded Years No Counties.csv'
+CUBE_PATH = None  # None = '<csv name>_cube.npz' next to the CSV
 START_YEAR = 1995  # earliest model year to show
+TOP_MAKES = 8      # makes shown in the EV + PHEV make-share trend
 # --------------------------------------------
 
-# --- Step 1: Load CSV ---
-df = pd.read_csv(CSV_FILE)
-
-# --- Step 2: Clean columns ---
-# Ensure Model Year is numeric (some may be <1992 etc.)
-def parse_model_year(x):
-    try:
-        x = str(x).strip()
-        if x.startswith('<'):
-            return int(x[1:]) - 1  # e.g., '<1992' -> 1991
-        return int(x)
-    except:
-        return None
-
-df['Model_Year'] = df['Model Year'].apply(parse_model_year)
-df['Vehicles'] = pd.to_numeric(df['Vehicles'], errors='coerce').fillna(0)
-
-# --- Step 3: Filter to EVs and PHEVs ---
-def is_ev(fuel):
-    fuel = str(fuel).lower()
-    return 'battery electric' in fuel
-
-def is_phev(fuel):
-    fuel = str(fuel).lower()
-    return 'plug-in hybrid' in fuel or 'phev' in fuel
-
-df = df[df['Fuel'].apply(lambda f: is_ev(f) or is_phev(f))]
-
-# --- NEW: Only use Year 2023 to avoid duplicates ---
-df = df[df['Year'] == 2023]
-
-# --- DEBUG: check totals ---
-total_all_vehicles = df['Vehicles'].sum()
-print(f"Total EV + PHEVs in filtered dataset: {total_all_vehicles:,}")
-
-# Optional: see cumulative table
-print("\nCumulative EV + PHEVs by Model Year:")
-agg_debug = df.groupby('Model_Year')['Vehicles'].sum().sort_index().cumsum().reset_index(name='Cumulative_Vehicles')
-print(agg_debug)
-
+# --- Step 1: Load the fleet cube (parsed from the CSV only when it changes) ---
+cube = load_fleet_cube(CSV_FILE, CUBE_PATH)
+snapshots = [int(y) for y in cube['snapshots']]
+print(f"Snapshot years: {snapshots}")
 
-# --- Step 4: Aggregate by model year ---
-agg = df.groupby('Model_Year')['Vehicles'].sum().reset_index()
+# --- Step 2: Cumulative EV + PHEVs by model year, every snapshot ---
+curves_all = cumulative_curves(cube, PLUGIN_CLASSES)
+totals = curves_all.groupby('Year')['Vehicles'].sum()
+for year, total in totals.items():
+    print(f"Total EV + PHEVs in {year} snapshot: {total:,}")
 
-# --- Step 5: Sort by model year and calculate cumulative sum ---
-agg = agg.sort_values('Model_Year')
-agg['Cumulative_Vehicles'] = agg['Vehicles'].cumsum()
+print("\nCumulative EV + PHEVs by Model Year (latest snapshot):")
+print(curves_all[curves_all['Year'] == snapshots[-1]].reset_index(drop=True))
 
-# --- Step 6: Filter for years >= START_YEAR ---
-agg = agg[agg['Model_Year'] >= START_YEAR]
+agg = curves_all[curves_all['Model_Year'] >= START_YEAR]
 
-import matplotlib.ticker as mtick
-
-# --- Step 7: Plot cumulative EV + PHEVs (scaled y-axis in thousands) ---
+# --- Step 3: Plot cumulative EV + PHEVs, one line per snapshot (thousands) ---
 plt.figure(figsize=(10, 6))
-plt.plot(
-    agg['Model_Year'],
-    agg['Cumulative_Vehicles'],
-    marker='o',
-    linewidth=2
-)
-plt.title('Cumulative EV + PHEV Registrations in California by Year')
-plt.xlabel('Year', fontsize=14)
+for year, curve in agg.groupby('Year'):
+    plt.plot(
+        curve['Model_Year'],
+        curve['Cumulative_Vehicles'],
+        marker='o',
+        linewidth=2,
+        label=f"{year} registrations"
+    )
+plt.title('Cumulative EV + PHEV Registrations in California by Model Year')
+plt.xlabel('Model Year', fontsize=14)
 plt.ylabel('Cumulative Vehicles (Thousands)', fontsize=14)
 plt.grid(True, alpha=0.3)
 plt.xlim(agg['Model_Year'].min(), agg['Model_Year'].max())
+plt.legend()
 
 # Scale y-axis to thousands
 plt.gca().yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, _: f'{int(x/1000):,}'))
@@ -79,6 +51,39 @@ plt.gca().yaxis.set_major_formatter(mtick.FuncFormatter(lambda x, _: f'{int(x/10
 plt.tight_layout()
 plt.show()
 
-# --- Optional: save processed cumulative data ---
+# --- Step 4: Fleet composition and turnover between snapshots ---
+composition = fleet_composition(cube)
+print("\nRegistered vehicles by fuel class:")
+print(composition)
+
+turnover = pd.concat([
+    fleet_turnover(cube).assign(Fleet_Segment='all'),
+    fleet_turnover(cube, PLUGIN_CLASSES).assign(Fleet_Segment='EV + PHEV'),
+], ignore_index=True)
+print("\nFleet turnover between snapshots:")
+print(turnover)
+
+# --- Step 5: EV + PHEV make-share trend ---
+shares = make_shares(cube, PLUGIN_CLASSES)
+top = shares[shares['Year'] == snapshots[-1]].nlargest(TOP_MAKES, 'Vehicles')['Make']
+trend = shares[shares['Make'].isin(top)].pivot(index='Year', columns='Make', values='Share').fillna(0)[list(top)]
+
+plt.figure(figsize=(10, 6))
+for make in trend.columns:
+    plt.plot(trend.index, trend[make], marker='o', linewidth=2, label=make)
+plt.title(f'EV + PHEV Make Share in California (top {TOP_MAKES} makes)')
+plt.xlabel('Registration Year', fontsize=14)
+plt.ylabel('Share of EV + PHEVs', fontsize=14)
+plt.gca().yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+plt.grid(True, alpha=0.3)
+plt.legend()
+plt.tight_layout()
+plt.show()
+
+# --- Optional: save processed data ---
 agg.to_csv('ev_phev_cumulative_by_model_year.csv', index=False)
-print("✅ Cumulative EV + PHEV data saved to ev_phev_cumulative_by_model_year.csv")
+composition.to_csv('fleet_composition_by_year.csv')
+turnover.to_csv('fleet_turnover_by_year.csv', index=False)
+shares.to_csv('ev_phev_make_share_by_year.csv', index=False)
+print("✅ Cumulative EV + PHEV curves (every snapshot year) saved to ev_phev_cumulative_by_model_year.csv")
+print("✅ Fleet composition, turnover and make shares saved")
@@ -1,27 +1,13 @@
-import pandas as pd
 import numpy as np
 
-# -----------------------------
-# 1. Load data
-# -----------------------------
-# Path to EV share long CSV (your long-form CSV from previous script)
-ev_csv_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/ev_share_long.csv'
-
-# Path to updated income/population CSV with CAAGI_per_capita
-income_csv_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/CA_income_population.csv'
-
-# Load CSVs
-ev_df = pd.read_csv(ev_csv_path, dtype={'Zip Code': str})
-income_df = pd.read_csv(income_csv_path, dtype={'ZipCode': str})
+from zip_panel import load_panel
 
 # -----------------------------
-# 2. Merge EV data with per-capita income
+# 1-2. EV share (every year) with per-capita income, joined by ZIP
 # -----------------------------
-# Ensure consistent column names
-income_df = income_df.rename(columns={'ZipCode': 'Zip Code'})
-
-# Merge on Zip Code
-merged_df = pd.merge(ev_df, income_df[['Zip Code', 'CAAGI_per_capita']], on='Zip Code', how='inner')
+# Both come from the cached ZIP-year panel (ev_share_long.csv and CA_income_population.csv)
+panel = load_panel()
+merged_df = panel.loc[panel['has_ev'] & panel['has_income'], ['Year', 'Zip Code', 'EV_Share', 'CAAGI_per_capita']].copy()
 
 print(f"Merged dataset has {len(merged_df)} rows")
 
@@ -2,15 +2,13 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
-# 1. Define the rate structures
-rates = {
-    'S1_Volumetric': 0.45, 'S1_Peak': 0.57, 'S1_OffPeak': 0.42, 'S1_Fixed': 0.0,
-    'S2_Volumetric': 0.39, 'S2_Peak': 0.51, 'S2_OffPeak': 0.36, 'S2_Fixed': 24.15,
-    'S3_Volumetric': 0.20, 'S3_Peak': 0.32, 'S3_OffPeak': 0.17
-}
+from household_bills import PROFILES, scenario_bills
+from tariffs import TARIFFS
+
+# 1. Define the rate structures (S1/S2/S3 tariffs, see tariffs.py)
+tariffs = TARIFFS
 
 peak_ratio = 0.20
-offpeak_ratio = 0.80
 
 # 2. Load Your Data
 df = pd.read_csv('/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/2024_personal_income_tax_statistics_by_zip_code.csv')
@@ -18,57 +16,32 @@ zip_col = 'ZipCode'
 df[zip_col] = df[zip_col].astype(str)
 df = df[df['Avg_AGI'] > 0].copy()
 
-# 3. Filter for target zip codes and REMOVE DUPLICATES
-target_zips = ['94025', '90011'] # Just keeping the mapped ones for these plots
-df_filtered = df[df[zip_col].isin(target_zips)].copy()
-df_filtered = df_filtered.drop_duplicates(subset=[zip_col])
-
-profiles = []
-for index, row in df_filtered.iterrows():
-    if row[zip_col] == '94025':
-        p1, p2 = row.copy(), row.copy()
-        p1['Profile_Name'], p1['Baseline_Usage_kWh'], p1['Is_EV'] = 'Silicon Valley\n(Has EV)', 800, True
-        p2['Profile_Name'], p2['Baseline_Usage_kWh'], p2['Is_EV'] = 'Silicon Valley\n(No EV)', 500, False
-        profiles.extend([p1, p2])
-    elif row[zip_col] == '90011':
-        p4, p5 = row.copy(), row.copy()
-        p4['Profile_Name'], p4['Baseline_Usage_kWh'], p4['Is_EV'] = 'South LA\n(Has EV)', 750, True
-        p5['Profile_Name'], p5['Baseline_Usage_kWh'], p5['Is_EV'] = 'South LA\n(No EV)', 450, False
-        profiles.extend([p4, p5])
-
-df_profiles = pd.DataFrame(profiles)
+# 3. Household profiles for the target ZIPs (the mapped ones for these plots)
+profiles = pd.DataFrame(PROFILES, columns=[zip_col, 'Profile_Name', 'Baseline_Usage_kWh', 'Is_EV'])
+
+df_filtered = df[df[zip_col].isin(profiles[zip_col])].drop_duplicates(subset=[zip_col])
+df_profiles = df_filtered.merge(profiles, on=zip_col)
 df_profiles = df_profiles.sort_values(by=['Avg_AGI', 'Is_EV'])
 
-# 4. CALIBRATED WOLAK IMPLEMENTATION
+# 4. CALIBRATED WOLAK IMPLEMENTATION + 5. Elasticity (see household_bills.scenario_bills)
 hours_in_month = 730
-df_profiles['Hourly_Mean_kW'] = df_profiles['Baseline_Usage_kWh'] / hours_in_month
-df_profiles['Hourly_Variance'] = np.where(
-    df_profiles['Is_EV'], 
-    (df_profiles['Hourly_Mean_kW'] * 1.5) + 0.8, 
-    (df_profiles['Hourly_Mean_kW'] * 1.5)        
-)
-df_profiles['Wolak_EEHWTP_Score'] = 0.5 * (df_profiles['Hourly_Variance'] + (df_profiles['Hourly_Mean_kW']**2))
-
 distribution_cost_multiplier = 65.0 
-df_profiles['S3_Capacity_Fixed'] = df_profiles['Wolak_EEHWTP_Score'] * distribution_cost_multiplier
-df_profiles['S3_Customer_Access_Fixed'] = np.where(df_profiles['Avg_AGI'] > 50000, 75.0, 25.0)
-df_profiles['S3_Applied_Fixed'] = df_profiles['S3_Customer_Access_Fixed'] + df_profiles['S3_Capacity_Fixed']
-
-# 5. Implement Elasticity
 elasticity = -0.2
-pct_change_price_S3 = (rates['S3_Volumetric'] - rates['S1_Volumetric']) / rates['S1_Volumetric']
 
-df_profiles['Usage_S1'] = df_profiles['Baseline_Usage_kWh']
-df_profiles['Usage_S3'] = df_profiles['Baseline_Usage_kWh'] * (1 + (elasticity * pct_change_price_S3))
+params = {'peak_ratio': peak_ratio, 'elasticity': elasticity, 'hours_in_month': hours_in_month,
+          'distribution_cost_multiplier': distribution_cost_multiplier}
+bills = scenario_bills({'usage_kwh': df_profiles['Baseline_Usage_kWh'], 'is_ev': df_profiles['Is_EV'],
+                        'agi': df_profiles['Avg_AGI']}, params, tariffs)
 
-df_profiles['S1_Peak_kWh'] = df_profiles['Usage_S1'] * peak_ratio
-df_profiles['S1_OffPeak_kWh'] = df_profiles['Usage_S1'] * offpeak_ratio
-df_profiles['S3_Peak_kWh'] = df_profiles['Usage_S3'] * peak_ratio
-df_profiles['S3_OffPeak_kWh'] = df_profiles['Usage_S3'] * offpeak_ratio
+df_profiles['Wolak_EEHWTP_Score'] = bills['wolak_score']
+df_profiles['S3_Capacity_Fixed'] = bills['capacity_fixed_S3']
+df_profiles['S3_Customer_Access_Fixed'] = bills['access_fixed_S3']
+df_profiles['S3_Applied_Fixed'] = bills['fixed_S3']
 
 # 6. Calculate Annual Bills
-df_profiles['Annual_Bill_S1'] = (rates['S1_Fixed'] + (rates['S1_Peak'] * df_profiles['S1_Peak_kWh']) + (rates['S1_OffPeak'] * df_profiles['S1_OffPeak_kWh'])) * 12
-df_profiles['Annual_Bill_S3'] = (df_profiles['S3_Applied_Fixed'] + (rates['S3_Peak'] * df_profiles['S3_Peak_kWh']) + (rates['S3_OffPeak'] * df_profiles['S3_OffPeak_kWh'])) * 12
+for s in ('S1', 'S2', 'S3'):
+    df_profiles[f'Usage_{s}'] = bills[f'usage_{s}']
+    df_profiles[f'Annual_Bill_{s}'] = bills[f'bill_{s}']
 
 # =====================================================================
 # VISUALIZATION 1: TOTAL ANNUAL BILLS
@@ -115,8 +88,8 @@ fig2, (ax_vol, ax_fix) = plt.subplots(1, 2, figsize=(14, 6))
 
 # --- PANEL 1: Volumetric Rates ---
 scenarios = ['Scenario 1\n(Status Quo)', 'Scenario 2\n(Current CPUC)', 'Scenario 3\n(Optimized)']
-peak_rates = [rates['S1_Peak'], rates['S2_Peak'], rates['S3_Peak']]
-offpeak_rates = [rates['S1_OffPeak'], rates['S2_OffPeak'], rates['S3_OffPeak']]
+peak_rates = [tariffs[s]['energy']['peak'] for s in ('S1', 'S2', 'S3')]
+offpeak_rates = [tariffs[s]['energy']['offpeak'] for s in ('S1', 'S2', 'S3')]
 
 x_scen = np.arange(len(scenarios))
 
@@ -139,8 +112,8 @@ for rect in rects_peak + rects_off:
                 ha='center', va='bottom', fontsize=10, fontweight='bold')
 
 # --- PANEL 2: Fixed Monthly Charges ---
-s1_fixed = [rates['S1_Fixed']] * 4
-s2_fixed = [rates['S2_Fixed']] * 4
+s1_fixed = [tariffs['S1'].get('fixed', 0.0)] * 4
+s2_fixed = [tariffs['S2'].get('fixed', 0.0)] * 4
 s3_fixed = df_profiles['S3_Applied_Fixed'].tolist()
 
 width2 = 0.25
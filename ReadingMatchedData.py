@@ -1,8 +1,10 @@
 import os
 import pandas as pd
-import geopandas as gpd
 import matplotlib.pyplot as plt
 
+from zip_codes import normalize_zips
+from zcta_store import load_zcta
+
 # ---------------- USER CONFIG ----------------
 MATCHED_CSV_PATH = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/CA_national_matched.csv'
 ZIP_SHP_PATH = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/tl_2025_us_zcta520/tl_2025_us_zcta520.shp'
@@ -10,18 +12,9 @@ AGG_OUTPUT_FOLDER = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Proje
 os.makedirs(AGG_OUTPUT_FOLDER, exist_ok=True)
 # --------------------------------------------
 
-def normalize_zip(z):
-    if pd.isna(z):
-        return None
-    s = str(int(z)) if isinstance(z, float) and z.is_integer() else str(z).strip()
-    s = ''.join(filter(str.isdigit, s))
-    if not s:
-        return None
-    return s[:5].zfill(5) if len(s) >= 5 else s.zfill(5)
-
 def aggregate_capacity_by_zip(df):
     # Normalize ZIP codes
-    df['zip'] = df['zip_code'].apply(normalize_zip)
+    df['zip'] = normalize_zips(df['zip_code'])
 
     # Drop rows with missing ZIPs
     df = df[df['zip'].notna()]
@@ -44,28 +37,23 @@ def aggregate_capacity_by_zip(df):
     return agg
 
 def plot_choropleth(agg_df, zip_shp_path, column='pv_capacity_ac', title="PV Capacity by ZIP"):
-    zips_gdf = gpd.read_file(zip_shp_path)
-    zip_col = next((c for c in zips_gdf.columns if 'zip' in c.lower() or 'zcta' in c.lower()), None)
-    if zip_col is None:
-        raise KeyError("Could not find ZIP column in shapefile.")
-    zips_gdf['zip5'] = zips_gdf[zip_col].astype(str).str.extract(r'(\d{5})')[0].str.zfill(5)
+    zips_gdf = load_zcta(shp_path=zip_shp_path, figsize=(10, 10))  # California ZCTAs, keyed by zip5
 
     merged = zips_gdf.merge(agg_df, left_on='zip5', right_on='zip', how='left')
     merged[column] = merged[column].fillna(0.0)
 
     fig, ax = plt.subplots(figsize=(10, 10))
-    merged_ca = merged.cx[-125:-113, 32:43]  # zoom to CA
     vmax = merged[column].quantile(0.95)
     vmax = max(vmax, merged[column].max())
 
-    merged_ca.plot(column=column,
-                   cmap='YlOrRd',
-                   linewidth=0.3,
-                   edgecolor='black',
-                   legend=True,
-                   legend_kwds={'label': column},
-                   ax=ax,
-                   vmax=vmax)
+    merged.plot(column=column,
+                cmap='YlOrRd',
+                linewidth=0.3,
+                edgecolor='black',
+                legend=True,
+                legend_kwds={'label': column},
+                ax=ax,
+                vmax=vmax)
     ax.set_title(title, fontsize=14)
     ax.axis('off')
     plt.tight_layout()
@@ -1,14 +1,24 @@
 import os
-import glob
-import re
 import pandas as pd
-import geopandas as gpd
 import matplotlib.pyplot as plt
 
+from interconnection_io import load_and_concat_csvs, load_projected_csvs, folder_signature, find_best_cols as resolve_columns
+from zip_codes import normalize_zips
+from zcta_store import load_zcta
+from pv_aggregates import aggregate_zip_metrics
+from pv_capacity_cube import build_cube, save_cube, load_cube, cube_signature, zip_aggregates
+from pv_incremental import update_aggregates, replay_matches
+
 # ---------------- USER CONFIG ----------------
 CSV_FOLDER = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/Interconnected_Project_Sites_2025-08-31 (2)'
 ZIP_SHP_PATH = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/tl_2025_us_zcta520/tl_2025_us_zcta520.shp'
 COUNTY_ZIP_CROSSWALK = None  # optional fallback CSV path, or None
+PROJECTED_INGEST = True  # parse only the WANTED_COL_PATTERNS columns, one file per core
+USE_CUBE = True  # answer ZIP aggregates from the persisted ZIP x year x sector x size cube
+CUBE_PATH = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Aggregated_Data_Solar/pv_capacity_cube.npz'
+INCREMENTAL = False  # fold only new/changed extracts into the stored aggregates (needs an application id column)
+INCREMENTAL_STATE_DIR = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Aggregated_Data_Solar/incremental_state'
+VERIFY_INCREMENTAL = False  # after an incremental update, compare its ledger with a from-scratch replay (re-reads every CSV)
 # ------------------------------------------------
 
 WANTED_COL_PATTERNS = {
@@ -16,54 +26,22 @@ WANTED_COL_PATTERNS = {
     "service_zip": [r"service\s*zip", r"service_zip", r"zip\s*code", r"zipcode", r"service\s*zipcode"],
     "app_approved_date": [r"app.*approved.*date", r"approved.*date", r"application.*approved", r"approval.*date", r"app_approved_date"],
     "technology_type": [r"technology.*type", r"technology", r"tech.*type"],
-    "service_county": [r"service.*county", r"county"]
+    "service_county": [r"service.*county", r"county"],
+    "customer_sector": [r"customer.*sector", r"customer.*class", r"service.*type", r"customer.*type"],
+    "application_id": [r"application\s*id", r"application_id", r"app.*\bid\b", r"project\s*id"]
+}
+
+# Explicit types for the projected ingest (anything not listed stays a string)
+INGEST_TYPES = {
+    "system_size_ac": "float",
+    "app_approved_date": "datetime",
+    "technology_type": "category",
+    "service_county": "category",
+    "customer_sector": "category",
 }
 
 def find_best_cols(df):
-    colmap = {}
-    cols = list(df.columns)
-    for key, patterns in WANTED_COL_PATTERNS.items():
-        found = None
-        for pat in patterns:
-            regex = re.compile(pat, flags=re.I)
-            for c in cols:
-                if regex.search(c):
-                    found = c
-                    break
-            if found:
-                break
-        colmap[key] = found
-    return colmap
-
-def load_and_concat_csvs(folder):
-    paths = glob.glob(os.path.join(folder, "*.csv"))
-    if not paths:
-        raise FileNotFoundError(f"No CSVs found in {folder}")
-    dfs = []
-    for p in paths:
-        try:
-            df = pd.read_csv(p, low_memory=False)
-            df["__source_file"] = os.path.basename(p)
-            dfs.append(df)
-        except Exception as e:
-            print(f"WARNING: failed to read {p}: {e}")
-    combined = pd.concat(dfs, ignore_index=True)
-    return combined
-
-def normalize_zip(z):
-    if pd.isna(z):
-        return None
-    s = None
-    if isinstance(z, float) and not pd.isna(z) and z.is_integer():
-        s = str(int(z))
-    else:
-        s = str(z).strip()
-    s = re.sub(r"\D", "", s)
-    if not s:
-        return None
-    if len(s) >= 5:
-        return s[:5]
-    return s.zfill(5)
+    return resolve_columns(df.columns, WANTED_COL_PATTERNS)
 
 def fill_zip_from_county(df, county_zip_crosswalk_path):
     if county_zip_crosswalk_path is None:
@@ -74,7 +52,7 @@ def fill_zip_from_county(df, county_zip_crosswalk_path):
         print("County-zip crosswalk provided but doesn't contain 'county' and 'zip' columns. Skipping fallback.")
         return df
     cw = cw[[cw_cols["county"], cw_cols["zip"]]].rename(columns={cw_cols["county"]: "county", cw_cols["zip"]: "zip"})
-    cw["zip"] = cw["zip"].apply(lambda z: normalize_zip(z))
+    cw["zip"] = normalize_zips(cw["zip"])
     modal = cw.groupby("county")["zip"].agg(lambda s: pd.Series(s).mode().iat[0] if not s.mode().empty else None).reset_index()
     modal.columns = ["service_county_key", "modal_zip"]
     df["service_county_key"] = df["service_county"].astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
@@ -93,40 +71,31 @@ def prepare_df(raw):
         else:
             clean[k] = pd.NA
 
-    cs_col = None
-    for pat in [r"customer.*sector", r"customer.*class", r"service.*type", r"customer.*type"]:
-        regex = re.compile(pat, flags=re.I)
-        for c in raw.columns:
-            if regex.search(c):
-                cs_col = c
-                break
-        if cs_col:
-            break
-    if cs_col:
-        clean["customer_sector"] = raw[cs_col]
-    else:
-        clean["customer_sector"] = pd.NA
-
     clean["system_size_ac"] = pd.to_numeric(clean["system_size_ac"], errors="coerce")
     clean["app_approved_date"] = pd.to_datetime(clean["app_approved_date"], errors="coerce", infer_datetime_format=True)
     clean["technology_type"] = clean["technology_type"].astype(str).str.strip()
-    clean["service_zip"] = clean["service_zip"].apply(lambda z: normalize_zip(z) if not pd.isna(z) else None)
+    clean["service_zip"] = normalize_zips(clean["service_zip"])
     clean["service_county"] = clean["service_county"].astype(str).where(~clean["service_county"].isna(), None)
 
     return clean
 
+def apply_county_fallback(df, county_zip_crosswalk_path):
+    if county_zip_crosswalk_path is None:
+        return df
+    if "service_county" not in df.columns:
+        df["service_county"] = None
+    if "service_zip" not in df.columns:
+        df["service_zip"] = None
+    df = fill_zip_from_county(df, county_zip_crosswalk_path)
+    df["service_zip"] = df["service_zip_filled"]
+    df.drop(columns=["service_zip_filled"], inplace=True)
+    return df
+
 def aggregate_capacity_by_zip(clean_df, year=2025, include_all_prior=False, include_missing_dates=False, county_zip_crosswalk_path=None):
     tmp = clean_df.copy()
     
     # --- Fill ZIPs from county crosswalk if provided ---
-    if county_zip_crosswalk_path is not None:
-        if "service_county" not in tmp.columns:
-            tmp["service_county"] = None
-        if "service_zip" not in tmp.columns:
-            tmp["service_zip"] = None
-        tmp = fill_zip_from_county(tmp, county_zip_crosswalk_path)
-        tmp["service_zip"] = tmp["service_zip_filled"]
-        tmp.drop(columns=["service_zip_filled"], inplace=True)
+    tmp = apply_county_fallback(tmp, county_zip_crosswalk_path)
 
     # --- Filter photovoltaic systems ---
     mask_tech = tmp["technology_type"].fillna("").str.contains(r"photovoltaic", case=False, na=False)
@@ -157,52 +126,13 @@ def aggregate_capacity_by_zip(clean_df, year=2025, include_all_prior=False, incl
     if dropped > 0:
         print(f"Dropped {dropped:,} rows with missing service_zip after fallbacks.")
 
-    # --- Aggregate total PV capacity ---
-    agg_total = df_year.groupby("service_zip", as_index=False)["system_size_ac"].sum()
-    agg_total = agg_total.rename(columns={"service_zip": "zip", "system_size_ac": "pv_capacity_ac"})
-    agg_total["zip"] = agg_total["zip"].astype(str).str.zfill(5)
-
-    # --- Aggregate residential PV capacity ---
-    df_res = df_year[df_year["customer_sector"].str.contains("residential", case=False, na=False)].copy()
-    agg_res = df_res.groupby("service_zip", as_index=False)["system_size_ac"].sum()
-    agg_res = agg_res.rename(columns={"service_zip": "zip", "system_size_ac": "pv_capacity_residential_ac"})
-    agg_res["zip"] = agg_res["zip"].astype(str).str.zfill(5)
-
-    # --- Aggregate residential PV capacity under 10 kW ---
-    df_res_under10 = df_res[df_res["system_size_ac"] < 10].copy()
-
-    # Capacity under 10 kW
-    agg_res_under10 = df_res_under10.groupby("service_zip", as_index=False)["system_size_ac"].sum()
-    agg_res_under10 = agg_res_under10.rename(columns={"service_zip": "zip", "system_size_ac": "pv_capacity_residential_ac_under10"})
-    agg_res_under10["zip"] = agg_res_under10["zip"].astype(str).str.zfill(5)
-
-    # ✅ NEW: count of systems under 10 kW
-    agg_res_under10_count = df_res_under10.groupby("service_zip", as_index=False).size()
-    agg_res_under10_count = agg_res_under10_count.rename(columns={"service_zip": "zip", "size": "pv_count_residential_ac_under10"})
-    agg_res_under10_count["zip"] = agg_res_under10_count["zip"].astype(str).str.zfill(5)
-
-    # ✅ Count of *all* residential PV systems (regardless of size)
-    agg_res_count = df_res.groupby("service_zip", as_index=False).size()
-    agg_res_count = agg_res_count.rename(columns={"service_zip": "zip", "size": "pv_count_residential_ac"})
-    agg_res_count["zip"] = agg_res_count["zip"].astype(str).str.zfill(5)
-
-
-
-    # --- Merge all aggregates ---
-    agg = agg_total.merge(agg_res, on="zip", how="left")
-    agg = agg.merge(agg_res_count, on="zip", how="left")                  # ✅ add total residential count
-    agg = agg.merge(agg_res_under10, on="zip", how="left")
-    agg = agg.merge(agg_res_under10_count, on="zip", how="left")
-
-
-    agg["pv_capacity_residential_ac"] = agg["pv_capacity_residential_ac"].fillna(0.0)
-    agg["pv_count_residential_ac"] = agg["pv_count_residential_ac"].fillna(0).astype(int)
-
-    agg["pv_capacity_residential_ac_under10"] = agg["pv_capacity_residential_ac_under10"].fillna(0.0)
-    agg["pv_count_residential_ac_under10"] = agg["pv_count_residential_ac_under10"].fillna(0).astype(int)
+    # --- Aggregate all ZIP metrics (total, residential, <10 kW) in one pass ---
+    agg = aggregate_zip_metrics(df_year)
 
+    return agg, df_year
 
 
+def print_capacity_stats(agg):
     # --- Print min/max stats for all ---
     min_row = agg.loc[agg["pv_capacity_ac"].idxmin()]
     max_row = agg.loc[agg["pv_capacity_ac"].idxmax()]
@@ -222,20 +152,10 @@ def aggregate_capacity_by_zip(clean_df, year=2025, include_all_prior=False, incl
     print(f"Min: ZIP {min_row_under10['zip']} — {min_row_under10['pv_capacity_residential_ac_under10']:.2f} kW")
     print(f"Max: ZIP {max_row_under10['zip']} — {max_row_under10['pv_capacity_residential_ac_under10']:.2f} kW")
 
-    return agg, df_year
-
-
 
 def plot_choropleth(agg_df, zip_shp_path, title="PV Capacity (AC) by ZIP - 2025", vmax_quantile=0.95):
-    zips_gdf = gpd.read_file(zip_shp_path)
-    zip_col = None
-    for c in zips_gdf.columns:
-        if re.search(r"zip|zcta|zip5|zcta5", c, flags=re.I):
-            zip_col = c
-            break
-    if zip_col is None:
-        raise KeyError("Could not find a ZIP column name in the shapefile. Columns: " + ", ".join(zips_gdf.columns.astype(str)))
-    zips_gdf["zip5"] = zips_gdf[zip_col].astype(str).str.extract(r"(\d{5})")[0].str.zfill(5)
+    # California ZCTAs from the prebuilt store (built from zip_shp_path on first use)
+    zips_gdf = load_zcta(shp_path=zip_shp_path, figsize=(10, 10))
     merged = zips_gdf.merge(agg_df, left_on="zip5", right_on="zip", how="left")
     merged["pv_capacity_residential_ac_under10"] = merged["pv_capacity_residential_ac_under10"].fillna(0.0)
 
@@ -243,17 +163,16 @@ def plot_choropleth(agg_df, zip_shp_path, title="PV Capacity (AC) by ZIP - 2025"
     vmax = max(vmax, merged["pv_capacity_residential_ac_under10"].max())
 
     fig, ax = plt.subplots(figsize=(10, 10))
-    merged_ca = merged.cx[-125:-113, 32:43]
 
     vmax = 20000
-    merged_ca.plot(column='pv_capacity_residential_ac_under10',
-                   cmap='YlOrRd',
-                   linewidth=0.3,
-                   edgecolor='black',
-                   legend=True,
-                   legend_kwds={'label': "Total Solar PV Capacity (kW AC)"},
-                   ax=ax,
-                   vmax=vmax)
+    merged.plot(column='pv_capacity_residential_ac_under10',
+                cmap='YlOrRd',
+                linewidth=0.3,
+                edgecolor='black',
+                legend=True,
+                legend_kwds={'label': "Total Solar PV Capacity (kW AC)"},
+                ax=ax,
+                vmax=vmax)
 
     ax.set_title(title, fontsize=14)
     ax.axis('off')
@@ -261,17 +180,53 @@ def plot_choropleth(agg_df, zip_shp_path, title="PV Capacity (AC) by ZIP - 2025"
     plt.show()
 
 
-def main():
-    raw = load_and_concat_csvs(CSV_FOLDER)
+def load_raw(paths=None):
+    if PROJECTED_INGEST:
+        return load_projected_csvs(CSV_FOLDER, WANTED_COL_PATTERNS, types=INGEST_TYPES, paths=paths)
+    return load_and_concat_csvs(CSV_FOLDER, paths=paths)
+
+def load_or_build_cube():
+    source = f"SolarPVData.prepare_df|{folder_signature(CSV_FOLDER)}"
+    if COUNTY_ZIP_CROSSWALK is not None:
+        source += f"|{COUNTY_ZIP_CROSSWALK}"
+    signature = cube_signature(source)
+    cube = load_cube(CUBE_PATH, signature)
+    if cube is not None:
+        print(f"Reusing capacity cube {CUBE_PATH}")
+        return cube
+
+    raw = load_raw()
     print(f"Loaded combined CSV rows: {len(raw):,}")
-    cleaned = prepare_df(raw)
+    cleaned = apply_county_fallback(prepare_df(raw), COUNTY_ZIP_CROSSWALK)
+    cube = build_cube(cleaned, signature=signature)
+    os.makedirs(os.path.dirname(CUBE_PATH), exist_ok=True)
+    save_cube(cube, CUBE_PATH)
+    print(f"Saved capacity cube to {CUBE_PATH}")
+    return cube
+
+
+def main():
+    if INCREMENTAL:
+        clean = lambda raw: apply_county_fallback(prepare_df(raw), COUNTY_ZIP_CROSSWALK)
+        cube = update_aggregates(CSV_FOLDER, INCREMENTAL_STATE_DIR, read_files=load_raw, clean=clean)
+        if VERIFY_INCREMENTAL and replay_matches(CSV_FOLDER, INCREMENTAL_STATE_DIR, load_raw, clean):
+            print("Incremental PV aggregates match a from-scratch replay.")
+        agg = zip_aggregates(cube, year=2025, include_all_prior=True, include_missing_dates=False)
+    elif USE_CUBE:
+        cube = load_or_build_cube()
+        agg = zip_aggregates(cube, year=2025, include_all_prior=True, include_missing_dates=False)
+    else:
+        raw = load_raw()
+        print(f"Loaded combined CSV rows: {len(raw):,}")
+        cleaned = prepare_df(raw)
 
-    agg, used_rows = aggregate_capacity_by_zip(cleaned,
-                                               year=2025,
-                                               include_all_prior=True,
-                                               include_missing_dates=False,
-                                               county_zip_crosswalk_path=COUNTY_ZIP_CROSSWALK)
+        agg, used_rows = aggregate_capacity_by_zip(cleaned,
+                                                   year=2025,
+                                                   include_all_prior=True,
+                                                   include_missing_dates=False,
+                                                   county_zip_crosswalk_path=COUNTY_ZIP_CROSSWALK)
 
+    print_capacity_stats(agg)
     print(f"\nAggregated {agg['pv_capacity_ac'].sum():,.0f} kW AC across {len(agg):,} ZIP codes (up to 2025).")
 
     # --- New folder for aggregated output ---
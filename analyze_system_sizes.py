@@ -1,11 +1,11 @@
-import os
-import glob
-import re
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from interconnection_io import load_and_concat_csvs, load_projected_csvs, find_best_cols as resolve_columns
+
 # ---------------- USER CONFIG ----------------
 CSV_FOLDER = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Interconnected_Project_Sites_2025-08-31 (2)'   # <- change if needed
+PROJECTED_INGEST = True  # parse only the WANTED_COL_PATTERNS columns, one file per core
 # ------------------------------------------------
 
 # Column patterns to automatically detect names across datasets
@@ -15,38 +15,16 @@ WANTED_COL_PATTERNS = {
     "service_county": [r"service.*county", r"county"]
 }
 
+# Explicit types for the projected ingest (anything not listed stays a string)
+INGEST_TYPES = {
+    "system_size_dc": "float",
+    "technology_type": "category",
+    "service_county": "category",
+}
+
 def find_best_cols(df):
     """Automatically find best-matching column names by regex pattern."""
-    colmap = {}
-    cols = list(df.columns)
-    for key, patterns in WANTED_COL_PATTERNS.items():
-        found = None
-        for pat in patterns:
-            regex = re.compile(pat, flags=re.I)
-            for c in cols:
-                if regex.search(c):
-                    found = c
-                    break
-            if found:
-                break
-        colmap[key] = found
-    return colmap
-
-def load_and_concat_csvs(folder):
-    """Combine all CSVs in a folder into one DataFrame."""
-    paths = glob.glob(os.path.join(folder, "*.csv"))
-    if not paths:
-        raise FileNotFoundError(f"No CSVs found in {folder}")
-    dfs = []
-    for p in paths:
-        try:
-            df = pd.read_csv(p, low_memory=False)
-            df["__source_file"] = os.path.basename(p)
-            dfs.append(df)
-        except Exception as e:
-            print(f"WARNING: failed to read {p}: {e}")
-    combined = pd.concat(dfs, ignore_index=True)
-    return combined
+    return resolve_columns(df.columns, WANTED_COL_PATTERNS)
 
 def prepare_df(raw):
     """Extract and clean relevant columns."""
@@ -110,7 +88,10 @@ def plot_histograms(df):
     plt.show()
 
 def main():
-    raw = load_and_concat_csvs(CSV_FOLDER)
+    if PROJECTED_INGEST:
+        raw = load_projected_csvs(CSV_FOLDER, WANTED_COL_PATTERNS, types=INGEST_TYPES)
+    else:
+        raw = load_and_concat_csvs(CSV_FOLDER)
     print(f"Loaded combined CSV rows: {len(raw):,}")
     cleaned = prepare_df(raw)
     plot_histograms(cleaned)
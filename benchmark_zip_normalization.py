@@ -0,0 +1,67 @@
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from zip_codes import normalize_zips
+
+# ---------------- USER CONFIG ----------------
+N_ROWS = 2_000_000
+REPEATS = 3
+# ------------------------------------------------
+
+
+# Row-wise helper the pipelines used before zip_codes.py (kept here as the baseline)
+def normalize_zip_rowwise(z):
+    if pd.isna(z):
+        return None
+    s = None
+    if isinstance(z, float) and not pd.isna(z) and z.is_integer():
+        s = str(int(z))
+    else:
+        s = str(z).strip()
+    s = re.sub(r"\D", "", s)
+    if not s:
+        return None
+    if len(s) >= 5:
+        return s[:5]
+    return s.zfill(5)
+
+
+def make_inputs(n, seed=0):
+    """Interconnection-like ZIP columns: clean text, ZIP+4, junk, floats and ints."""
+    rng = np.random.default_rng(seed)
+    zips = rng.integers(90001, 96162, n)
+    text = pd.Series(zips.astype(str), dtype=object)
+    plus4 = rng.random(n) < 0.1
+    text[plus4] = text[plus4] + "-" + pd.Series(rng.integers(1000, 9999, plus4.sum()).astype(str), index=text[plus4].index)
+    junk = rng.random(n) < 0.02
+    text[junk] = rng.choice(["", "N/A", " CA 9", "OOS"], junk.sum())
+    text[rng.random(n) < 0.02] = None
+
+    floats = pd.Series(zips.astype("float64"))
+    floats[rng.random(n) < 0.02] = np.nan
+    return {"text (ZIP+4, junk)": text, "float (NaN present)": floats, "int": pd.Series(zips)}
+
+
+def time_it(fn, s):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        out = fn(s)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    print(f"Benchmarking ZIP normalization on {N_ROWS:,} rows (best of {REPEATS})\n")
+    print(f"{'input':<22}{'row-wise rows/s':>18}{'vectorized rows/s':>20}{'speedup':>10}  same")
+    for name, s in make_inputs(N_ROWS).items():
+        t_old, old = time_it(lambda x: x.apply(normalize_zip_rowwise), s)
+        t_new, new = time_it(normalize_zips, s)
+        same = old.fillna("<NA>").astype(str).equals(new.fillna("<NA>").astype(str))
+        print(f"{name:<22}{N_ROWS / t_old:>18,.0f}{N_ROWS / t_new:>20,.0f}{t_old / t_new:>9.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
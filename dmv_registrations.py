@@ -0,0 +1,189 @@
+import os
+import re
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from interconnection_io import file_signature, find_best_cols, read_header, concat_typed
+from zip_codes import zip_index
+from fuel_taxonomy import fuel_categories
+
+# Typed loader for the yearly DMV "vehicle fuel type count by ZIP" files.
+#
+# Each CSV is parsed once, on a worker process, with explicit types: Fuel / Make / Duty /
+# Model Year as categoricals, the ZIP as an int32 (-1 where the file has no usable ZIP,
+# e.g. 'OOS' or fewer than 5 digits) and the vehicle count as int32. Its header is checked
+# against the expected schema first. The typed rows go to a parquet partition per year:
+#
+#   <cache_dir>/year=<year>/part-0.parquet
+#   <cache_dir>/meta.json     per year: source file, size / mtime, row and validation counts
+#
+# A later run only parses files that are new or changed, so adding a year costs one file.
+
+# ---------------- USER CONFIG ----------------
+DMV_ZIP_DIR = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/EVShareData(2019-2025)'
+CACHE_DIR = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/dmv_zip_cache'
+WORKERS = None   # None = one per core
+# ------------------------------------------------
+
+# Output column -> header patterns (first match wins; headers vary a little between years)
+COLUMN_PATTERNS = {
+    "Zip Code": [r"^zip"],
+    "Model Year": [r"^model\s*year"],
+    "Fuel": [r"^fuel"],
+    "Make": [r"^make"],
+    "Duty": [r"^duty"],
+    "Vehicles": [r"^vehicles"],
+}
+CATEGORY_COLUMNS = ("Model Year", "Fuel", "Make", "Duty")
+SCHEMA = {"Year": "int16", "zip": "int32", "Model Year": "category", "Fuel": "category",
+          "Make": "category", "Duty": "category", "Vehicles": "int32"}
+SCHEMA_VERSION = 2  # bump when the parse changes so every partition is rebuilt
+META_NAME = "meta.json"
+
+
+def file_year(path):
+    match = re.search(r'20\d{2}', os.path.basename(path))
+    return int(match.group()) if match else None
+
+
+def _partition_path(cache_dir, year):
+    return os.path.join(cache_dir, f"year={year}", "part-0.parquet")
+
+
+def _load_meta(cache_dir):
+    path = os.path.join(cache_dir, META_NAME)
+    if not os.path.exists(path):
+        return {"version": SCHEMA_VERSION, "years": {}}
+    with open(path, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != SCHEMA_VERSION:
+        return {"version": SCHEMA_VERSION, "years": {}}
+    return meta
+
+
+def _save_meta(cache_dir, meta):
+    path = os.path.join(cache_dir, META_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def resolve_columns(path):
+    """Map COLUMN_PATTERNS onto a file's header; ValueError if a column is missing."""
+    header = read_header(path)
+    colmap = find_best_cols(header, COLUMN_PATTERNS)
+    missing = [k for k, c in colmap.items() if c is None]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)}: no column for {missing} (header: {header})")
+    return colmap
+
+
+def parse_file(path, year):
+    """One DMV CSV as a typed frame in SCHEMA, plus its validation counts."""
+    colmap = resolve_columns(path)
+    dtypes = {colmap[c]: "category" for c in CATEGORY_COLUMNS}
+    dtypes[colmap["Zip Code"]] = "string"
+    raw = pd.read_csv(path, usecols=list(colmap.values()), dtype=dtypes)
+
+    vehicles = pd.to_numeric(raw[colmap["Vehicles"]], errors="coerce")
+    # Like the original EVMaps.py cleaning: short ZIPs (e.g. '9025') are dropped, not zero-padded
+    digits = raw[colmap["Zip Code"]].str.replace(r"\D", "", regex=True).str[:5]
+    zips = zip_index(digits.where(digits.str.len() == 5))
+    checks = {
+        "no_zip": int((zips < 0).sum()),
+        "bad_vehicles": int((vehicles.isna() & raw[colmap["Vehicles"]].notna()).sum()),
+        "negative_vehicles": int((vehicles < 0).sum()),
+    }
+    df = pd.DataFrame({
+        "Year": np.full(len(raw), year, dtype=np.int16),
+        "zip": zips.astype(np.int32),
+        "Model Year": raw[colmap["Model Year"]],
+        "Fuel": fuel_categories(raw[colmap["Fuel"]]),
+        "Make": raw[colmap["Make"]],
+        "Duty": raw[colmap["Duty"]],
+        "Vehicles": vehicles.fillna(0).astype(np.int32),
+    })
+    return df.astype(SCHEMA), checks
+
+
+def _cache_year(task):
+    path, year, cache_dir = task
+    df, checks = parse_file(path, year)
+    out = _partition_path(cache_dir, year)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    df.to_parquet(out + ".tmp", index=False)
+    os.replace(out + ".tmp", out)
+    return year, len(df), checks
+
+
+def year_files(folder):
+    """Year -> CSV path for every file in `folder` with a year in its name."""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        year = file_year(path)
+        if year is None:
+            print(f"⚠️ Could not find year in filename: {path}")
+            continue
+        if year in files:
+            raise ValueError(f"Two DMV files for {year}: {files[year]} and {path}")
+        files[year] = path
+    return files
+
+
+def update_cache(folder=DMV_ZIP_DIR, cache_dir=CACHE_DIR, workers=WORKERS, force=False):
+    """Parse new or changed yearly files into the cache; returns the meta."""
+    files = year_files(folder)
+    if not files:
+        raise FileNotFoundError(f"No DMV CSVs found in {folder}")
+    os.makedirs(cache_dir, exist_ok=True)
+    meta = _load_meta(cache_dir)
+
+    # Years whose file is gone from the folder
+    for key in [k for k in meta["years"] if int(k) not in files]:
+        del meta["years"][key]
+        if os.path.exists(_partition_path(cache_dir, int(key))):
+            os.remove(_partition_path(cache_dir, int(key)))
+
+    stale = []
+    for year, path in files.items():
+        entry = meta["years"].get(str(year))
+        fresh = (entry is not None and entry["path"] == os.path.abspath(path)
+                 and entry["signature"] == file_signature(path)
+                 and os.path.exists(_partition_path(cache_dir, year)))
+        if force or not fresh:
+            stale.append(year)
+
+    if stale:
+        tasks = [(files[y], y, cache_dir) for y in stale]
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(tasks))) as pool:
+            futures = [pool.submit(_cache_year, t) for t in tasks]
+            for future in as_completed(futures):
+                year, rows, checks = future.result()
+                meta["years"][str(year)] = {"path": os.path.abspath(files[year]),
+                                            "signature": file_signature(files[year]),
+                                            "rows": rows, **checks}
+                _save_meta(cache_dir, meta)
+                print(f"  {year}: {rows:,} rows, {checks['no_zip']:,} without a ZIP, "
+                      f"{checks['bad_vehicles']:,} unreadable counts")
+    _save_meta(cache_dir, meta)
+    print(f"DMV ZIP cache: {len(files) - len(stale)} year(s) reused, {len(stale)} parsed from CSV.")
+    return meta
+
+
+def load_registrations(folder=DMV_ZIP_DIR, cache_dir=CACHE_DIR, years=None, workers=WORKERS, force=False):
+    """Typed registrations for every year in `folder` (or just `years`), via the cache."""
+    meta = update_cache(folder, cache_dir, workers, force)
+    wanted = sorted(int(y) for y in meta["years"] if years is None or int(y) in years)
+    if not wanted:
+        raise ValueError(f"No cached DMV years match {years}")
+    dfs = [pd.read_parquet(_partition_path(cache_dir, y)) for y in wanted]
+    return concat_typed(dfs).astype(SCHEMA)
+
+
+if __name__ == "__main__":
+    data = load_registrations()
+    print(data.dtypes)
+    print(data.groupby("Year")["Vehicles"].sum())
@@ -1,25 +1,17 @@
-import pandas as pd
+from zip_panel import load_panel
 
-# === Step 1: Load both datasets ===
-ev_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/ev_share_long.csv'
-income_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/CA_income_population.csv'
-
-ev_df = pd.read_csv(ev_path)
-income_df = pd.read_csv(income_path)
-
-# === Step 2: Standardize ZIP code column names and formats ===
-ev_df['Zip Code'] = ev_df['Zip Code'].astype(str).str.zfill(5)
-income_df['ZipCode'] = income_df['ZipCode'].astype(str).str.zfill(5)
-
-# === Step 3: Merge on ZIP code ===
-merged = pd.merge(ev_df, income_df, left_on='Zip Code', right_on='ZipCode', how='inner')
+# === Steps 1-3: EV data joined with income/population by ZIP (cached ZIP-year panel) ===
+ev_cols = ['Total', 'BEVs', 'PHEVs', 'EV_Share', 'EV_PHEV_Total', 'EV_PHEV_Share']
+income_cols = ['CAAGI', 'Population', 'CAAGI_per_capita']
+panel = load_panel()
+merged = panel.loc[panel['has_ev'] & panel['has_income'], ['Year', 'Zip Code'] + ev_cols + income_cols].copy()
 
 print(f"Merged dataset shape: {merged.shape}")
 print(merged.head())
 
 # === Step 4: Compute EVs per capita income ===
 # Scale by 1e6 to make numbers more interpretable (EVs per $1M income per capita)
-merged['EVs_per_income_scaled'] = merged['EVs'] / merged['CAAGI_per_capita'] * 1e6
+merged['EVs_per_income_scaled'] = merged['BEVs'] / merged['CAAGI_per_capita'] * 1e6
 
 # === Step 5: Save output ===
 merged.to_csv('/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/evs_income_normalized.csv', index=False)
@@ -39,16 +31,11 @@ pivot = merged.pivot_table(
 pivot.to_csv('/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/evs_per_income_pivot.csv')
 print("✅ Saved pivot table to 'evs_per_income_pivot.csv'")
 
-import geopandas as gpd
 import matplotlib.pyplot as plt
+from zcta_store import load_zcta
 
-# === Step 7: Load California ZCTA shapefile ===
-# Replace this with the actual path to your shapefile
-shapefile_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/tl_2025_us_zcta520/tl_2025_us_zcta520.shp'
-zcta_gdf = gpd.read_file(shapefile_path)
-
-# Standardize ZIP code formatting
-zcta_gdf['ZCTA5CE20'] = zcta_gdf['ZCTA5CE20'].astype(str).str.zfill(5)
+# === Step 7: Load California ZCTAs from the prebuilt store (normalized zip5 keys) ===
+zcta_gdf = load_zcta(figsize=(10, 10))
 
 # === Step 8: Choose a year to visualize ===
 # You can change the year here to 2021, 2022, etc.
@@ -56,7 +43,7 @@ year_to_plot = 2025
 map_df = merged[merged['Year'] == year_to_plot].copy()
 
 # === Step 9: Merge shapefile with EV/income data ===
-geo_merged = zcta_gdf.merge(map_df, left_on='ZCTA5CE20', right_on='Zip Code', how='inner')
+geo_merged = zcta_gdf.merge(map_df, left_on='zip5', right_on='Zip Code', how='inner')
 
 print(f"Geo merged shapefile has {len(geo_merged)} ZCTAs for year {year_to_plot}")
 
@@ -0,0 +1,224 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from interconnection_io import file_signature
+from fuel_taxonomy import FUEL_TAXONOMY, OTHER_CLASS, PLUGIN_CLASSES, classify_fuel, fuel_classes
+
+# Fleet-composition cube from the DMV "Count Expanded Years" file: registered vehicles at
+# snapshot year x model year x fuel class x make x duty. The file is parsed once; every
+# snapshot's cumulative curve, turnover or make share is then a sum over array axes.
+#
+# Axes
+#   snapshots   : registration snapshot years in the file ('Year')
+#   model_years : every model year from min to max; the extra last slot holds 'Unk'
+#   classes     : fuel_classes(taxonomy), see fuel_taxonomy.py
+#   makes       : sorted makes ('Unk' where missing)
+#   duties      : sorted duty classes ('Unk' where missing)
+#
+# Each snapshot lumps its oldest vehicles into a '<YYYY' bucket, and the cutoff moves
+# with the snapshot ('<1992' in 2018, '<1997' in 2023). The bucket is stored at model
+# year YYYY - 1, and floors[snapshot] records that year: the slot means "that model year
+# and older" for that snapshot.
+
+UNKNOWN = "Unk"
+
+
+def parse_model_years(values):
+    """Model-year labels as float years (NaN for 'Unk'), plus a mask of '<YYYY' buckets.
+
+    Buckets map to YYYY - 1, as the old row-wise parser did. Each distinct label is parsed
+    once and broadcast through category codes.
+    """
+    cat = (values if isinstance(values, pd.Series) else pd.Series(values)).astype("category")
+    labels = cat.cat.categories.astype(str).str.strip()
+    bucket = labels.str.startswith("<")
+    years = pd.to_numeric(labels.str.lstrip("<"), errors="coerce").to_numpy(dtype="float64")
+    years = np.where(bucket, years - 1, years)
+    codes = cat.cat.codes.to_numpy()
+    return np.append(years, np.nan)[codes], np.append(bucket, False)[codes]
+
+
+def _labels(values):
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    s = s.astype(object)
+    return s.where(s.notna(), UNKNOWN).astype(str).str.strip()
+
+
+def build_fleet_cube(df, taxonomy=FUEL_TAXONOMY, signature=None):
+    """Fold the rows of the expanded-years file into the cube."""
+    snap_idx, snapshots = pd.factorize(df["Year"].to_numpy(dtype=np.int64), sort=True)
+    model_year, bucket = parse_model_years(df["Model Year"])
+
+    known = np.isfinite(model_year)
+    y0 = int(model_year[known].min()) if known.any() else 0
+    y1 = int(model_year[known].max()) if known.any() else -1
+    model_years = np.arange(y0, y1 + 1)
+    year_idx = np.where(known, np.nan_to_num(model_year) - y0, len(model_years)).astype(np.int64)
+
+    floors = {}
+    for i, snapshot in enumerate(snapshots):
+        in_bucket = bucket & (snap_idx == i)
+        if in_bucket.any():
+            floors[int(snapshot)] = int(model_year[in_bucket].max())
+
+    classes = fuel_classes(taxonomy)
+    class_idx = classify_fuel(df["Fuel"], taxonomy).cat.codes.to_numpy().astype(np.int64)
+    class_idx[class_idx < 0] = classes.index(OTHER_CLASS)  # no fuel label at all
+    make_idx, makes = pd.factorize(_labels(df["Make"]), sort=True)
+    duty_idx, duties = pd.factorize(_labels(df["Duty"]), sort=True)
+
+    shape = (len(snapshots), len(model_years) + 1, len(classes), len(makes), len(duties))
+    flat = np.ravel_multi_index((snap_idx, year_idx, class_idx, make_idx, duty_idx), shape)
+    vehicles = pd.to_numeric(df["Vehicles"], errors="coerce").fillna(0).to_numpy(dtype="float64")
+    counts = np.bincount(flat, weights=vehicles, minlength=int(np.prod(shape)))
+
+    return {
+        "snapshots": np.asarray(snapshots, dtype=np.int64),
+        "model_years": model_years,
+        "classes": classes,
+        "makes": list(makes),
+        "duties": list(duties),
+        "floors": floors,
+        "vehicles": np.rint(counts).astype(np.int64).reshape(shape),
+        "signature": signature,
+    }
+
+
+def save_fleet_cube(cube, path):
+    meta = {k: cube[k] for k in ("classes", "makes", "duties", "floors", "signature")}
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, snapshots=cube["snapshots"], model_years=cube["model_years"],
+                        vehicles=cube["vehicles"], meta=np.array(json.dumps(meta)))
+    os.replace(tmp_path, path)
+
+
+def _load_saved(path, signature):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta["signature"] != signature:
+            return None
+        cube = {k: data[k] for k in ("snapshots", "model_years", "vehicles")}
+    meta["floors"] = {int(k): v for k, v in meta["floors"].items()}
+    cube.update(meta)
+    return cube
+
+
+def load_fleet_cube(csv_path, cube_path=None, taxonomy=FUEL_TAXONOMY, rebuild=False):
+    """The cube for `csv_path`, rebuilt only when the file or the taxonomy changed."""
+    cube_path = cube_path or os.path.splitext(csv_path)[0] + "_cube.npz"
+    signature = json.loads(json.dumps([file_signature(csv_path), taxonomy]))
+    cube = None if rebuild else _load_saved(cube_path, signature)
+    if cube is not None:
+        return cube
+
+    print(f"Building fleet cube from {csv_path} ...")
+    df = pd.read_csv(csv_path, dtype={"Model Year": "category", "Fuel": "category",
+                                      "Make": "category", "Duty": "category"})
+    cube = build_fleet_cube(df, taxonomy, signature)
+    save_fleet_cube(cube, cube_path)
+    return cube
+
+
+def _axis_mask(labels, chosen):
+    if chosen is None:
+        return np.ones(len(labels), dtype=bool)
+    chosen = [chosen] if isinstance(chosen, str) else list(chosen)
+    unknown = sorted(set(chosen) - set(labels))
+    if unknown:
+        raise KeyError(f"{unknown} not in the fleet cube. Available: {list(labels)}")
+    return np.isin(np.asarray(labels, dtype=object), chosen)
+
+
+def select(cube, classes=None, makes=None, duties=None, keep=()):
+    """Vehicles summed over the unselected class / make / duty entries.
+
+    Returns [snapshot, model year (+ 'Unk' slot)] plus any axes named in `keep`
+    ('classes', 'makes', 'duties'), in that order.
+    """
+    arr = cube["vehicles"]
+    for axis, name, chosen in ((2, "classes", classes), (3, "makes", makes), (4, "duties", duties)):
+        arr = np.compress(_axis_mask(cube[name], chosen), arr, axis=axis)
+    drop = tuple(a for a, name in ((2, "classes"), (3, "makes"), (4, "duties")) if name not in keep)
+    return arr.sum(axis=drop)
+
+
+def cumulative_curves(cube, classes=PLUGIN_CLASSES, start_year=None, **filters):
+    """Vehicles and running total by model year, for every snapshot (long frame).
+
+    Each snapshot spans its first to last model year with vehicles; 'Unk' model years
+    are left out.
+    """
+    arr = select(cube, classes, **filters)[:, :-1]
+    cum = np.cumsum(arr, axis=1)
+    frames = []
+    for i, snapshot in enumerate(cube["snapshots"]):
+        nonzero = np.flatnonzero(arr[i])
+        if len(nonzero) == 0:
+            continue
+        span = slice(nonzero[0], nonzero[-1] + 1)
+        frames.append(pd.DataFrame({
+            "Year": int(snapshot),
+            "Model_Year": cube["model_years"][span],
+            "Vehicles": arr[i, span],
+            "Cumulative_Vehicles": cum[i, span],
+        }))
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=["Year", "Model_Year", "Vehicles", "Cumulative_Vehicles"])
+    if start_year is not None:
+        out = out[out["Model_Year"] >= start_year].reset_index(drop=True)
+    return out
+
+
+def fleet_composition(cube, **filters):
+    """Registered vehicles per snapshot (rows) and fuel class (columns)."""
+    arr = select(cube, keep=("classes",), **filters).sum(axis=1)
+    return pd.DataFrame(arr, index=pd.Index(cube["snapshots"], name="Year"), columns=cube["classes"])
+
+
+def fleet_turnover(cube, classes=None, **filters):
+    """Vehicles entering and leaving between consecutive snapshots.
+
+    Model-year cohorts are compared: a cohort that grew counts toward Entered, one that
+    shrank toward Exited. Years at or below either snapshot's bucket floor are pooled
+    into one cohort first, and 'Unk' model years are a cohort of their own.
+    """
+    arr = select(cube, classes, **filters)
+    model_years = cube["model_years"]
+    rows = []
+    for i in range(1, len(cube["snapshots"])):
+        prev_year, year = int(cube["snapshots"][i - 1]), int(cube["snapshots"][i])
+        floors = [cube["floors"].get(s) for s in (prev_year, year) if cube["floors"].get(s) is not None]
+        pooled = np.searchsorted(model_years, max(floors), side="right") if floors else 0
+
+        def cohorts(a):
+            return np.concatenate([[a[:pooled].sum()], a[pooled:]])
+
+        prev, cur = cohorts(arr[i - 1]), cohorts(arr[i])
+        rows.append({
+            "Year": year,
+            "Previous_Year": prev_year,
+            "Fleet": int(cur.sum()),
+            "Entered": int(np.maximum(cur - prev, 0).sum()),
+            "Exited": int(np.maximum(prev - cur, 0).sum()),
+        })
+    out = pd.DataFrame(rows, columns=["Year", "Previous_Year", "Fleet", "Entered", "Exited"])
+    out["Net"] = out["Entered"] - out["Exited"]
+    return out
+
+
+def make_shares(cube, classes=PLUGIN_CLASSES, **filters):
+    """Each make's share of the selected vehicles, per snapshot (long frame, makes with vehicles)."""
+    arr = select(cube, classes, keep=("makes",), **filters).sum(axis=1)
+    totals = arr.sum(axis=1, keepdims=True)
+    share = np.divide(arr, totals, out=np.zeros(arr.shape), where=totals > 0)
+    out = pd.DataFrame({
+        "Year": np.repeat(cube["snapshots"], len(cube["makes"])),
+        "Make": np.tile(np.asarray(cube["makes"], dtype=object), len(cube["snapshots"])),
+        "Vehicles": arr.ravel(),
+        "Share": share.ravel(),
+    })
+    return out[out["Vehicles"] > 0].sort_values(["Year", "Vehicles"], ascending=[True, False]).reset_index(drop=True)
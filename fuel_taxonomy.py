@@ -0,0 +1,55 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Fuel classes for the DMV registration files. Fuel is held as a pandas categorical, so
+# each distinct label is classified once and the class is broadcast to every row through
+# the category codes. A new DMV label only needs a pattern below, not another data pass.
+
+# ---------------- USER CONFIG ----------------
+# Ordered: a label gets the first class with a matching pattern (case-insensitive regex)
+FUEL_TAXONOMY = [
+    ("BEV", [r"battery electric"]),
+    ("PHEV", [r"plug-in hybrid", r"phev"]),
+    ("hybrid", [r"hybrid gasoline", r"gasoline hybrid"]),
+    ("ICE", [r"gasoline", r"diesel", r"natural gas", r"flex-fuel", r"propane"]),
+]
+OTHER_CLASS = "other"  # labels no pattern matches (hydrogen, 'Other', 'Unk', ...)
+# ------------------------------------------------
+
+PLUGIN_CLASSES = ("BEV", "PHEV")
+
+
+def fuel_classes(taxonomy=FUEL_TAXONOMY):
+    """Class names in taxonomy order, ending with OTHER_CLASS."""
+    return list(dict.fromkeys([cls for cls, _ in taxonomy] + [OTHER_CLASS]))
+
+
+def class_of(label, taxonomy=FUEL_TAXONOMY):
+    for cls, patterns in taxonomy:
+        if any(re.search(p, label, flags=re.IGNORECASE) for p in patterns):
+            return cls
+    return OTHER_CLASS
+
+
+def fuel_categories(values):
+    """Fuel labels as a categorical with surrounding whitespace stripped."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    cat = s.astype("category")
+    labels = cat.cat.categories.astype(str).str.strip()
+    stripped = pd.Index(labels.unique())
+    # Labels that differ only by whitespace collapse onto one category; -1 (missing) stays -1
+    remap = np.append(stripped.get_indexer(labels), -1)
+    codes = remap[cat.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, stripped), index=s.index, name=s.name)
+
+
+def classify_fuel(values, taxonomy=FUEL_TAXONOMY):
+    """Fuel class per row as a categorical over fuel_classes(); missing fuel stays missing."""
+    fuel = fuel_categories(values)
+    classes = fuel_classes(taxonomy)
+    per_category = [classes.index(class_of(label, taxonomy)) for label in fuel.cat.categories]
+    lookup = np.array(per_category + [-1], dtype=np.int64)
+    codes = lookup[fuel.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, classes), index=fuel.index, name="Fuel_Class")
+
@@ -0,0 +1,344 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from zip_codes import normalize_zips
+from tariffs import REFERENCE_TARIFF, TARIFFS, compile_tariffs, price_response, tou_usage
+
+# Population-scale version of the ModelingFixedCharge.py bill model.
+#
+# Every ZIP in the income-tax file gets synthetic households (one per SAMPLE_FRACTION⁻¹ tax
+# returns, weighted back up to the return count). Each household draws an AGI around its
+# ZIP's average, EV ownership from the ZIP's EVs per household, and a monthly usage that
+# grows with income plus a fixed EV charging load. Scenario 1/2/3 bills are then computed
+# for all of them as flat NumPy arrays, one chunk of whole ZIPs at a time, and reduced to:
+#
+#   by ZIP                 mean bills, mean and p10/p50/p90 COMPARE_TARIFF change vs the reference
+#   by income bracket x EV weighted mean changes and quantiles (from fixed-width histograms,
+#                          so memory stays bounded however many chunks there are)
+
+# ---------------- USER CONFIG ----------------
+TAX_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/2024_personal_income_tax_statistics_by_zip_code.csv'
+EV_SHARE_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/ev_share_long.csv'
+TAX_YEAR = None         # None = latest TaxYear in the file
+EV_YEAR = None          # None = latest year in ev_share_long.csv
+SAMPLE_FRACTION = 0.25  # synthetic households per tax return
+MIN_HOUSEHOLDS_PER_ZIP = 50
+CHUNK_HOUSEHOLDS = 1_000_000
+SEED = 0
+INCOME_BRACKETS = [0, 25_000, 50_000, 75_000, 100_000, 150_000, 200_000, 500_000, np.inf]
+COMPARE_TARIFF = 'S3'   # scenario whose change vs tariffs.REFERENCE_TARIFF gets quantiles and the plot
+# ------------------------------------------------
+
+# Model assumptions, as in ModelingFixedCharge.py (tariffs live in tariffs.py)
+DEFAULT_PARAMS = {
+    'peak_ratio': 0.20,
+    'elasticity': -0.2,
+    'distribution_cost_multiplier': 65.0,
+    'variance_per_kw': 1.5,       # hourly variance per kW of mean load
+    'ev_variance_adder': 0.8,
+    'igfc_threshold': 50_000,     # AGI above this pays the high customer access charge
+    'igfc_low': 25.0,
+    'igfc_high': 75.0,
+    'hours_in_month': 730,
+}
+# Synthetic household assumptions (monthly kWh), set so the ModelingFixedCharge.py
+# profiles come out near 500 kWh in 94025 and 450 kWh in 90011 without an EV
+USAGE = {
+    'base_kwh': 475.0,            # non-EV usage at reference_agi
+    'reference_agi': 75_000,
+    'income_elasticity': 0.08,    # usage ~ AGI ** income_elasticity
+    'usage_sigma': 0.25,          # lognormal spread of usage between households
+    'agi_sigma': 0.8,             # lognormal spread of household AGI around the ZIP average
+    'ev_kwh': 300.0,              # monthly EV charging
+    'max_ev_probability': 0.9,
+}
+# The profiles charted in ModelingFixedCharge.py: (ZIP, label, monthly kWh, has EV)
+PROFILES = [
+    ('94025', 'Silicon Valley\n(Has EV)', 800, True),
+    ('94025', 'Silicon Valley\n(No EV)', 500, False),
+    ('90011', 'South LA\n(Has EV)', 750, True),
+    ('90011', 'South LA\n(No EV)', 450, False),
+]
+SCENARIOS = tuple(TARIFFS)
+CHANGE_BINS = np.arange(-5000.0, 5000.0 + 5.0, 5.0)  # $/year histogram for bracket quantiles
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def billing_inputs(households, params=None):
+    """(TOU usage matrix, arrays the tariffs bill on, resolved params) for `households`.
+
+    Households may carry 'wolak_score' and 'peak_share' measured from hourly profiles
+    (load_profiles.py); those replace the closed-form variance and peak_ratio.
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    usage = np.asarray(households['usage_kwh'], dtype='float64')
+    is_ev = np.asarray(households['is_ev'], dtype=bool)
+    peak_ratio = np.asarray(households['peak_share'], dtype='float64') if 'peak_share' in households else p['peak_ratio']
+
+    if 'wolak_score' in households:
+        score = np.asarray(households['wolak_score'], dtype='float64')
+    else:
+        # Calibrated Wolak capacity charge from a closed-form hourly variance
+        mean_kw = usage / p['hours_in_month']
+        variance = mean_kw * p['variance_per_kw'] + np.where(is_ev, p['ev_variance_adder'], 0.0)
+        score = 0.5 * (variance + mean_kw ** 2)
+    return tou_usage(usage, peak_ratio), {'agi': households['agi'], 'wolak_score': score}, p
+
+
+def scenario_bills(households, params=None, tariffs=TARIFFS):
+    """Annual bills under every tariff, plus each tariff's fixed-charge pieces.
+
+    `households` holds arrays 'usage_kwh' (monthly, before any price response), 'is_ev'
+    and 'agi' (see billing_inputs for the optional measured-profile arrays). Any value in
+    `params` may be an array that broadcasts against them (e.g. shape (draws, 1)), which
+    evaluates many parameter sets at once.
+    """
+    periods, billed, p = billing_inputs(households, params)
+    usage = np.asarray(households['usage_kwh'], dtype='float64')
+    response = price_response(tariffs, p)
+    out = {'wolak_score': billed['wolak_score']}
+    for s, bill in compile_tariffs(tariffs).items():
+        factor = np.asarray(response[s], dtype='float64')
+        result = bill(periods * factor[..., None], billed, p)
+        for piece in ('capacity', 'access'):
+            if piece in result:
+                out[f'{piece}_fixed_{s}'] = result[piece]
+        out[f'fixed_{s}'] = result['fixed']
+        out[f'usage_{s}'] = usage * factor
+        out[f'bill_{s}'] = result['bill'] * 12
+    return out
+
+
+def _to_number(series):
+    return pd.to_numeric(series.astype(str).str.replace(',', ''), errors='coerce')
+
+
+def load_zip_inputs(tax_path=TAX_PATH, ev_path=EV_SHARE_PATH, tax_year=TAX_YEAR, ev_year=EV_YEAR,
+                    usage=USAGE):
+    """One row per ZIP: tax returns (households), average AGI and chance a household has an EV."""
+    tax = pd.read_csv(tax_path, dtype={'ZipCode': str})
+    if 'TaxYear' in tax.columns:
+        tax = tax[tax['TaxYear'] == (tax['TaxYear'].max() if tax_year is None else tax_year)].copy()
+    tax['ZipCode'] = normalize_zips(tax['ZipCode'])
+    for c in ('Avg_AGI', 'Returns', 'CAAGI'):
+        if c in tax.columns:
+            tax[c] = _to_number(tax[c])
+    if 'Avg_AGI' not in tax.columns:
+        tax['Avg_AGI'] = tax['CAAGI'] / tax['Returns']
+    if 'Returns' not in tax.columns:
+        tax['Returns'] = tax['CAAGI'] / tax['Avg_AGI']
+    tax = tax[tax['ZipCode'].notna() & (tax['Avg_AGI'] > 0) & (tax['Returns'] > 0)]
+    zips = tax.drop_duplicates(subset=['ZipCode'])[['ZipCode', 'Returns', 'Avg_AGI']].reset_index(drop=True)
+
+    if ev_path is not None and os.path.exists(ev_path):
+        ev = pd.read_csv(ev_path, dtype={'Zip Code': str})
+        ev = ev[ev['Year'] == (ev['Year'].max() if ev_year is None else ev_year)]
+        evs = zips['ZipCode'].map(ev.set_index('Zip Code')['EV_PHEV_Total'])
+        # ZIPs without DMV data get the statewide EVs per household
+        statewide = evs.sum() / zips.loc[evs.notna(), 'Returns'].sum() if evs.notna().any() else 0.0
+        p_ev = (evs / zips['Returns']).fillna(statewide)
+    else:
+        print(f"⚠️ No EV shares at {ev_path}; every synthetic household is non-EV.")
+        p_ev = pd.Series(0.0, index=zips.index)
+    zips['EV_Probability'] = p_ev.clip(0, usage['max_ev_probability'])
+    return zips
+
+
+def households_per_zip(returns, sample_fraction=SAMPLE_FRACTION, minimum=MIN_HOUSEHOLDS_PER_ZIP):
+    return np.maximum(np.rint(np.asarray(returns) * sample_fraction), minimum).astype(np.int64)
+
+
+def synthesize_households(zip_inputs, rng, usage=USAGE, sample_fraction=SAMPLE_FRACTION,
+                          minimum=MIN_HOUSEHOLDS_PER_ZIP):
+    """Synthetic households for every ZIP in `zip_inputs` (arrays; 'zip' indexes its rows)."""
+    returns = zip_inputs['Returns'].to_numpy(dtype='float64')
+    n = households_per_zip(returns, sample_fraction, minimum)
+    zip_idx = np.repeat(np.arange(len(zip_inputs)), n)
+    size = len(zip_idx)
+
+    # Lognormal AGI with the ZIP's average as its mean
+    sigma = usage['agi_sigma']
+    mu = np.log(zip_inputs['Avg_AGI'].to_numpy(dtype='float64')) - sigma ** 2 / 2
+    agi = np.exp(mu[zip_idx] + sigma * rng.standard_normal(size))
+    is_ev = rng.random(size) < zip_inputs['EV_Probability'].to_numpy(dtype='float64')[zip_idx]
+
+    spread = np.exp(usage['usage_sigma'] * rng.standard_normal(size) - usage['usage_sigma'] ** 2 / 2)
+    base = usage['base_kwh'] * (agi / usage['reference_agi']) ** usage['income_elasticity'] * spread
+    return {
+        'zip': zip_idx,
+        'weight': (returns / n)[zip_idx],
+        'agi': agi,
+        'is_ev': is_ev,
+        'usage_kwh': base + usage['ev_kwh'] * is_ev,
+    }
+
+
+def population_sample(zip_inputs, n_households, rng, usage=USAGE):
+    """About n_households synthetic households spread over all ZIPs by return count."""
+    fraction = n_households / zip_inputs['Returns'].sum()
+    return synthesize_households(zip_inputs, rng, usage, fraction, minimum=1)
+
+
+def profile_households(zip_inputs, profiles=PROFILES):
+    """The PROFILES households (AGI = their ZIP's average), as arrays plus their labels."""
+    table = pd.DataFrame(profiles, columns=['ZipCode', 'Profile_Name', 'Baseline_Usage_kWh', 'Is_EV'])
+    table = table.merge(zip_inputs[['ZipCode', 'Avg_AGI']], on='ZipCode')
+    households = {
+        'weight': np.ones(len(table)),
+        'agi': table['Avg_AGI'].to_numpy(dtype='float64'),
+        'is_ev': table['Is_EV'].to_numpy(dtype=bool),
+        'usage_kwh': table['Baseline_Usage_kWh'].to_numpy(dtype='float64'),
+    }
+    return table['Profile_Name'].tolist(), households
+
+
+def zip_chunks(zip_inputs, chunk_households=CHUNK_HOUSEHOLDS, sample_fraction=SAMPLE_FRACTION):
+    """Row slices of `zip_inputs` holding about chunk_households synthetic households each."""
+    n = households_per_zip(zip_inputs['Returns'], sample_fraction)
+    ends = np.cumsum(n)
+    bounds = np.searchsorted(ends, np.arange(chunk_households, ends[-1], chunk_households), side='left') + 1
+    bounds = np.unique(np.concatenate([[0], bounds, [len(n)]]))
+    return [slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def group_quantiles(group, values, n_groups, qs=QUANTILES):
+    """Per-group quantiles (linear interpolation, like np.quantile) via one sort."""
+    order = np.lexsort((values, group))
+    counts = np.bincount(group, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    ordered = values[order]
+    out = np.full((n_groups, len(qs)), np.nan)
+    has = counts > 0
+    for j, q in enumerate(qs):
+        pos = starts[has] + q * (counts[has] - 1)
+        lo = np.floor(pos).astype(np.int64)
+        frac = pos - lo
+        out[has, j] = ordered[lo] * (1 - frac) + ordered[np.minimum(lo + 1, starts[has] + counts[has] - 1)] * frac
+    return out
+
+
+def histogram_quantiles(hist, edges=CHANGE_BINS, qs=QUANTILES):
+    """Quantiles per row of weighted histograms over `edges` (bin midpoints)."""
+    mids = np.concatenate([[edges[0]], (edges[:-1] + edges[1:]) / 2, [edges[-1]]])
+    cum = np.cumsum(hist, axis=1)
+    total = cum[:, -1:]
+    out = np.full((len(hist), len(qs)), np.nan)
+    for j, q in enumerate(qs):
+        idx = (cum < q * total).sum(axis=1)
+        out[:, j] = np.where(total[:, 0] > 0, mids[np.minimum(idx, len(mids) - 1)], np.nan)
+    return out
+
+
+def _zip_summary(zip_inputs, hh, bills, scenarios=SCENARIOS, reference=REFERENCE_TARIFF, compare=COMPARE_TARIFF):
+    n_zips = len(zip_inputs)
+    counts = np.bincount(hh['zip'], minlength=n_zips)
+    out = zip_inputs.reset_index(drop=True).copy()
+    for s in scenarios:
+        out[f'Mean_Bill_{s}'] = np.bincount(hh['zip'], weights=bills[f'bill_{s}'], minlength=n_zips) / counts
+    for s in scenarios:
+        if s != reference:
+            out[f'Mean_Change_{s}'] = out[f'Mean_Bill_{s}'] - out[f'Mean_Bill_{reference}']
+    change = bills[f'bill_{compare}'] - bills[f'bill_{reference}']
+    for q, values in zip(QUANTILES, group_quantiles(hh['zip'], change, n_zips).T):
+        out[f'P{int(q * 100)}_Change_{compare}'] = values
+    out[f'Share_Paying_More_{compare}'] = np.bincount(hh['zip'], weights=change > 0, minlength=n_zips) / counts
+    return out
+
+
+def run_population(zip_inputs, params=None, tariffs=TARIFFS, usage=USAGE, sample_fraction=SAMPLE_FRACTION,
+                   chunk_households=CHUNK_HOUSEHOLDS, seed=SEED, brackets=INCOME_BRACKETS,
+                   reference=REFERENCE_TARIFF, compare=COMPARE_TARIFF):
+    """Bill-change distributions for the synthetic population, by ZIP and by income bracket x EV.
+
+    Changes are against `reference`; quantiles are kept for the `compare` scenario only.
+    """
+    scenarios = tuple(tariffs)
+    for name in (reference, compare):
+        if name not in tariffs:
+            raise KeyError(f"'{name}' is not one of the tariffs {list(scenarios)}")
+    others = [s for s in scenarios if s != reference]
+    edges = np.asarray(brackets, dtype='float64')
+    n_groups = 2 * (len(edges) - 1)
+    n_bins = len(CHANGE_BINS) + 1
+    weights = np.zeros(n_groups)
+    sums = {s: np.zeros(n_groups) for s in others}
+    hist = np.zeros((n_groups, n_bins))
+
+    by_zip = []
+    total = 0
+    for chunk_no, rows in enumerate(zip_chunks(zip_inputs, chunk_households, sample_fraction)):
+        chunk = zip_inputs.iloc[rows]
+        hh = synthesize_households(chunk, np.random.default_rng([seed, chunk_no]), usage, sample_fraction)
+        bills = scenario_bills(hh, params, tariffs)
+        by_zip.append(_zip_summary(chunk, hh, bills, scenarios, reference, compare))
+        total += len(hh['zip'])
+
+        bracket = np.clip(np.searchsorted(edges, hh['agi'], side='right') - 1, 0, len(edges) - 2)
+        group = bracket * 2 + hh['is_ev']
+        weights += np.bincount(group, weights=hh['weight'], minlength=n_groups)
+        for s in others:
+            change = bills[f'bill_{s}'] - bills[f'bill_{reference}']
+            sums[s] += np.bincount(group, weights=hh['weight'] * change, minlength=n_groups)
+        change = bills[f'bill_{compare}'] - bills[f'bill_{reference}']
+        flat = group * n_bins + np.searchsorted(CHANGE_BINS, change)
+        hist += np.bincount(flat, weights=hh['weight'], minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+    print(f"Billed {total:,} synthetic households in {len(by_zip)} chunk(s).")
+
+    labels = [f"${lo:,.0f}+" if np.isinf(hi) else f"${lo:,.0f}-{hi:,.0f}" for lo, hi in zip(edges[:-1], edges[1:])]
+    by_bracket = pd.DataFrame({
+        'Income_Bracket': np.repeat(labels, 2),
+        'Is_EV': np.tile([False, True], len(labels)),
+        'Households': weights,
+    })
+    for s in others:
+        by_bracket[f'Mean_Change_{s}'] = np.divide(sums[s], weights, out=np.full(n_groups, np.nan), where=weights > 0)
+    for q, values in zip(QUANTILES, histogram_quantiles(hist).T):
+        by_bracket[f'P{int(q * 100)}_Change_{compare}'] = values
+    return pd.concat(by_zip, ignore_index=True), by_bracket
+
+
+def plot_brackets(by_bracket, path='Bill_Change_by_Income_Bracket.png', reference=REFERENCE_TARIFF,
+                  compare=COMPARE_TARIFF):
+    fig, ax = plt.subplots(figsize=(12, 6.5))
+    x = np.arange(by_bracket['Income_Bracket'].nunique())
+    width = 0.35
+    for offset, is_ev, color, label in ((-width / 2, False, '#7f8c8d', 'No EV'), (width / 2, True, '#2980b9', 'Has EV')):
+        rows = by_bracket[by_bracket['Is_EV'] == is_ev]
+        p10, p50, p90 = (rows[f'P{q}_Change_{compare}'] for q in (10, 50, 90))
+        ax.bar(x + offset, rows[f'Mean_Change_{compare}'], width, color=color, label=f'{label}: mean change')
+        ax.errorbar(x + offset, p50, yerr=[p50 - p10, p90 - p50],
+                    fmt='o', color='black', capsize=4)
+    ax.axhline(0, color='black', linewidth=0.8)
+    ax.set_xticks(x)
+    ax.set_xticklabels(by_bracket['Income_Bracket'].unique(), fontsize=10)
+    ax.set_ylabel(f'Annual Bill Change, {compare} vs {reference} ($)', fontsize=12, fontweight='bold')
+    ax.set_title(f'{compare} Bill Impacts by Income Bracket\n(bars: mean; points: median with p10-p90)',
+                 fontsize=14, fontweight='bold', pad=15)
+    ax.legend(fontsize=11)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(path, dpi=300)
+    return fig
+
+
+def main():
+    # === Step 1: ZIP-level inputs ===
+    zip_inputs = load_zip_inputs()
+    print(f"{len(zip_inputs):,} ZIPs, {zip_inputs['Returns'].sum():,.0f} tax returns")
+
+    # === Step 2: synthesize and bill the population ===
+    by_zip, by_bracket = run_population(zip_inputs)
+
+    # === Step 3: save and plot ===
+    by_zip.to_csv('bill_change_by_zip.csv', index=False)
+    by_bracket.to_csv('bill_change_by_income_bracket.csv', index=False)
+    print(by_bracket.to_string(index=False))
+    plot_brackets(by_bracket)
+    print("✅ Saved bill_change_by_zip.csv, bill_change_by_income_bracket.csv and Bill_Change_by_Income_Bracket.png")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import re
+import glob
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+# ---------------- USER CONFIG ----------------
+CACHE_DIRNAME = ".columnar_cache"   # created inside the CSV folder unless cache_dir is given
+MANIFEST_NAME = "manifest.json"
+# ------------------------------------------------
+
+
+def file_signature(path):
+    """(size, mtime) pair used to decide whether a cached copy is still valid."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def folder_signature(folder):
+    """Stable hash of every CSV's path, size and mtime in a folder."""
+    h = hashlib.sha1()
+    for p in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        sig = file_signature(p)
+        h.update(f"{os.path.abspath(p)}|{sig['size']}|{sig['mtime_ns']}\n".encode())
+    return h.hexdigest()
+
+
+def _cache_name(path):
+    return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16] + ".parquet"
+
+
+def _load_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: ignoring unreadable cache manifest {manifest_path}: {e}")
+        return {}
+
+
+def _save_manifest(cache_dir, manifest):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _to_columnar(df):
+    # low_memory=False leaves mixed str/number object columns that Arrow can't type;
+    # store them as strings (missing values stay missing).
+    out = df.copy()
+    for c in out.columns:
+        if out[c].dtype == object:
+            out[c] = out[c].where(out[c].isna(), out[c].astype(str))
+    return out
+
+
+def cached_entry(path, cache_dir, manifest):
+    """Return the parquet path for `path` if the cached copy is fresh, else None."""
+    key = os.path.abspath(path)
+    entry = manifest.get(key)
+    if entry is None or entry.get("signature") != file_signature(path):
+        return None
+    parquet_path = os.path.join(cache_dir, entry["parquet"])
+    return parquet_path if os.path.exists(parquet_path) else None
+
+
+def read_csv_cached(path, cache_dir, manifest):
+    """Read one CSV, going through the columnar cache. Updates `manifest` in place."""
+    parquet_path = cached_entry(path, cache_dir, manifest)
+    if parquet_path is not None:
+        return pd.read_parquet(parquet_path), False
+
+    df = pd.read_csv(path, low_memory=False)
+    name = _cache_name(path)
+    tmp_path = os.path.join(cache_dir, name + ".tmp")
+    _to_columnar(df).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(cache_dir, name))
+    manifest[os.path.abspath(path)] = {"signature": file_signature(path), "parquet": name}
+    return pd.read_parquet(os.path.join(cache_dir, name)), True
+
+
+def load_and_concat_csvs(folder, cache_dir=None, use_cache=True, paths=None):
+    """Combine all CSVs in a folder into one DataFrame, re-parsing only new or modified files.
+
+    Pass `paths` to read a subset of the folder.
+    """
+    full_scan = paths is None
+    if full_scan:
+        paths = sorted(glob.glob(os.path.join(folder, "*.csv")))
+    if not paths:
+        raise FileNotFoundError(f"No CSVs found in {folder}")
+
+    if use_cache:
+        cache_dir = cache_dir or os.path.join(folder, CACHE_DIRNAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = _load_manifest(cache_dir)
+
+    dfs = []
+    parsed = 0
+    for p in paths:
+        try:
+            if use_cache:
+                df, was_parsed = read_csv_cached(p, cache_dir, manifest)
+                parsed += was_parsed
+            else:
+                df = pd.read_csv(p, low_memory=False)
+            df["__source_file"] = os.path.basename(p)
+            dfs.append(df)
+        except Exception as e:
+            print(f"WARNING: failed to read {p}: {e}")
+
+    if use_cache and full_scan:
+        # Drop entries for CSVs that no longer exist so the cache doesn't grow forever
+        live = {os.path.abspath(p) for p in paths}
+        here = os.path.abspath(folder)
+        for key in [k for k in manifest if os.path.dirname(k) == here and k not in live]:
+            stale = os.path.join(cache_dir, manifest.pop(key)["parquet"])
+            if os.path.exists(stale):
+                os.remove(stale)
+    if use_cache:
+        _save_manifest(cache_dir, manifest)
+        print(f"Columnar cache: {len(paths) - parsed} file(s) reused, {parsed} parsed from CSV.")
+
+    combined = pd.concat(dfs, ignore_index=True)
+    return combined
+
+
+# ---------------- PROJECTED INGEST ----------------
+# Resolve each file's schema from its header, then parse only the columns we need
+# with explicit types. Kinds: "float", "datetime", "category", "string" (default).
+
+def find_best_cols(columns, patterns):
+    """Map each wanted key to the first column name matching one of its regex patterns."""
+    colmap = {}
+    cols = list(columns)
+    for key, pats in patterns.items():
+        found = None
+        for pat in pats:
+            regex = re.compile(pat, flags=re.I)
+            for c in cols:
+                if regex.search(c):
+                    found = c
+                    break
+            if found:
+                break
+        colmap[key] = found
+    return colmap
+
+
+def read_header(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _cast(series, kind):
+    if kind == "float":
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if kind == "datetime":
+        return pd.to_datetime(series, errors="coerce")
+    if kind == "category":
+        return series.str.strip().astype("category")
+    return series
+
+
+def _read_projected(task):
+    path, parquet_path, patterns, types = task
+    if parquet_path is not None:
+        header = pq.read_schema(parquet_path).names
+    else:
+        header = read_header(path)
+    colmap = find_best_cols(header, patterns)
+    usecols = sorted({c for c in colmap.values() if c is not None})
+
+    if parquet_path is not None:
+        raw = pd.read_parquet(parquet_path, columns=usecols)
+    else:
+        raw = pd.read_csv(path, usecols=usecols, dtype={c: "string" for c in usecols})
+
+    out = pd.DataFrame(index=raw.index)
+    for key, c in colmap.items():
+        col = raw[c].astype("string") if c is not None else pd.Series(pd.NA, index=raw.index, dtype="string")
+        out[key] = _cast(col, types.get(key, "string"))
+    return out, colmap
+
+
+def concat_typed(dfs):
+    """pd.concat of typed frames that keeps categorical columns categorical."""
+    # Give categoricals a shared category set so concat keeps them categorical
+    for c in dfs[0].columns:
+        if isinstance(dfs[0][c].dtype, pd.CategoricalDtype):
+            cats = union_categoricals([d[c] for d in dfs]).categories
+            for d in dfs:
+                d[c] = d[c].cat.set_categories(cats)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def load_projected_csvs(folder, patterns, types=None, workers=None, cache_dir=None, paths=None):
+    """Parallel ingest of only the columns resolved from `patterns`, renamed to its keys.
+
+    Fresh entries in the columnar cache are read with Parquet column projection;
+    everything else is parsed from CSV with `usecols`. Files are read on a process pool.
+    Pass `paths` to read a subset of the folder.
+    """
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(folder, "*.csv")))
+    if not paths:
+        raise FileNotFoundError(f"No CSVs found in {folder}")
+    types = types or {}
+
+    cache_dir = cache_dir or os.path.join(folder, CACHE_DIRNAME)
+    manifest = _load_manifest(cache_dir) if os.path.isdir(cache_dir) else {}
+    tasks = [(p, cached_entry(p, cache_dir, manifest), patterns, types) for p in paths]
+
+    dfs = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for (p, *_), fut in zip(tasks, [pool.submit(_read_projected, t) for t in tasks]):
+            try:
+                df, colmap = fut.result()
+            except Exception as e:
+                print(f"WARNING: failed to read {p}: {e}")
+                continue
+            missing = [k for k, c in colmap.items() if c is None]
+            if missing:
+                print(f"WARNING: {os.path.basename(p)} has no column for {missing}")
+            df["__source_file"] = pd.Categorical([os.path.basename(p)] * len(df))
+            dfs.append(df)
+
+    if not dfs:
+        raise ValueError(f"None of the CSVs in {folder} could be read")
+    return concat_typed(dfs)
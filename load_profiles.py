@@ -0,0 +1,256 @@
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from household_bills import scenario_bills
+
+# Synthetic 8760-hour household load profiles, for the Wolak capacity charge.
+#
+# ModelingFixedCharge.py approximates each household's hourly variance in closed form. Here
+# every household gets an actual hourly grid-import series (kW) built from:
+#   base load   a 24-hour residential shape x monthly seasonality, with daily and hourly
+#               lognormal noise, scaled to the household's monthly kWh
+#   EV charging sessions on random days, arriving around the evening, drawing the charger's
+#               kW until the session's energy is delivered
+#   PV          a clear-sky day shape x daily clearness; only self-consumption is modeled
+#               (generation offsets load, exports are not counted as negative load)
+#
+# From the arrays: EEHWTP score 0.5 * (variance + mean^2), TOU peak / off-peak kWh and the
+# household's mean load over the system's highest hours (coincident-peak contribution).
+# Profiles are float32 and generated BATCH_HOUSEHOLDS at a time from a per-batch seed, so
+# 100k households never sit in memory at once and a second pass regenerates the same
+# profiles (the first pass finds the system peak hours).
+
+# ---------------- USER CONFIG ----------------
+BATCH_HOUSEHOLDS = 2_000
+SEED = 0
+PEAK_HOURS = range(16, 21)       # TOU peak, 4-9pm every day
+SYSTEM_PEAK_COUNT = 100          # system hours averaged for the coincident-peak contribution
+
+# Archetype -> monthly base kWh (before EV charging and PV), EV?, PV kW, and households to simulate
+ARCHETYPES = {
+    'No EV':      {'base_kwh': 475.0, 'ev': False, 'pv_kw': 0.0, 'count': 50_000},
+    'EV':         {'base_kwh': 475.0, 'ev': True,  'pv_kw': 0.0, 'count': 25_000},
+    'PV':         {'base_kwh': 475.0, 'ev': False, 'pv_kw': 5.0, 'count': 15_000},
+    'EV + PV':    {'base_kwh': 475.0, 'ev': True,  'pv_kw': 6.0, 'count': 10_000},
+}
+EV_CHARGING = {
+    'kwh_per_month': 300.0,
+    'sessions_per_week': 5.0,
+    'charger_kw': 7.2,
+    'arrival_hour': 18.5,        # mean arrival, hours after midnight
+    'arrival_sd': 1.5,
+    'energy_sigma': 0.3,         # lognormal spread of energy per session
+}
+PV_KWH_PER_KW_YEAR = 1_600.0
+# ------------------------------------------------
+
+HOURS = 8760
+DAYS = 365
+# Typical residential hour-of-day shape (relative), and month factors (summer cooling)
+BASE_SHAPE_24 = np.array([0.62, 0.56, 0.53, 0.52, 0.53, 0.60, 0.78, 0.92, 0.90, 0.85, 0.83, 0.84,
+                          0.86, 0.88, 0.92, 1.00, 1.15, 1.35, 1.50, 1.52, 1.45, 1.28, 1.02, 0.78])
+MONTH_FACTORS = np.array([1.02, 0.95, 0.90, 0.85, 0.88, 1.00, 1.20, 1.25, 1.12, 0.95, 0.90, 1.00])
+BASE_DAILY_SIGMA = 0.20
+BASE_HOURLY_SIGMA = 0.30
+CLEARNESS = (6.0, 1.5)           # beta(a, b) daily clearness for PV
+
+_CALENDAR = pd.date_range('2023-01-01', periods=HOURS, freq='h')
+HOUR_OF_DAY = _CALENDAR.hour.to_numpy()
+MONTH = _CALENDAR.month.to_numpy() - 1
+DAY = np.arange(HOURS) // 24
+
+
+def base_template():
+    """Hourly base shape with mean 1."""
+    t = BASE_SHAPE_24[HOUR_OF_DAY] * MONTH_FACTORS[MONTH]
+    return (t / t.mean()).astype(np.float32)
+
+
+def solar_template():
+    """Clear-sky PV output per kW of panels (kW), scaled to PV_KWH_PER_KW_YEAR."""
+    doy = DAY.astype(np.float64)
+    day_length = 12.0 + 2.4 * np.cos(2 * np.pi * (doy - 172) / 365)
+    sunrise = 12.5 - day_length / 2
+    t = np.clip(np.sin(np.pi * (HOUR_OF_DAY + 0.5 - sunrise) / day_length), 0, None)
+    t = np.where((HOUR_OF_DAY + 0.5 > sunrise) & (HOUR_OF_DAY + 0.5 < sunrise + day_length), t, 0.0)
+    clearness_mean = CLEARNESS[0] / (CLEARNESS[0] + CLEARNESS[1])
+    return (t * PV_KWH_PER_KW_YEAR / (t.sum() * clearness_mean)).astype(np.float32)
+
+
+def archetype_households(archetypes=ARCHETYPES):
+    """One row per simulated household: archetype, monthly base kWh, EV, PV kW."""
+    names = list(archetypes)
+    counts = [archetypes[a]['count'] for a in names]
+    idx = np.repeat(np.arange(len(names)), counts)
+    return pd.DataFrame({
+        'archetype': pd.Categorical.from_codes(idx, names),
+        'base_kwh': np.array([archetypes[a]['base_kwh'] for a in names])[idx],
+        'is_ev': np.array([archetypes[a]['ev'] for a in names])[idx],
+        'pv_kw': np.array([archetypes[a]['pv_kw'] for a in names])[idx],
+    })
+
+
+def _add_ev_sessions(loads, is_ev, rng, ev=EV_CHARGING):
+    n = len(loads)
+    p_day = ev['sessions_per_week'] / 7
+    active = (rng.random((n, DAYS), dtype=np.float32) < p_day) & is_ev[:, None]
+    hh, day = np.nonzero(active)
+    if len(hh) == 0:
+        return np.zeros(n)
+    mean_energy = ev['kwh_per_month'] * 12 / (DAYS * p_day)
+    sigma = ev['energy_sigma']
+    energy = mean_energy * np.exp(sigma * rng.standard_normal(len(hh)) - sigma ** 2 / 2)
+    arrival = np.rint(rng.normal(ev['arrival_hour'], ev['arrival_sd'], len(hh))).astype(np.int64) % 24
+    start = day * 24 + arrival
+
+    flat = loads.reshape(-1)
+    kw = ev['charger_kw']
+    for k in range(int(np.ceil(energy.max() / kw))):
+        amount = np.clip(energy - k * kw, 0, kw)
+        # Sessions running past Dec 31 wrap to Jan 1 of the same profile year
+        np.add.at(flat, hh * HOURS + (start + k) % HOURS, amount.astype(np.float32))
+    return np.bincount(hh, weights=energy, minlength=n)
+
+
+def simulate_batch(households, rng, templates=None, ev=EV_CHARGING):
+    """float32 (households, 8760) grid-import kW, plus annual EV and PV self-consumed kWh."""
+    base_t, solar_t = templates or (base_template(), solar_template())
+    n = len(households)
+    base_kw = (households['base_kwh'].to_numpy(dtype=np.float32) * 12 / HOURS)[:, None]
+
+    daily = np.exp(BASE_DAILY_SIGMA * rng.standard_normal((n, DAYS), dtype=np.float32) - BASE_DAILY_SIGMA ** 2 / 2)
+    loads = rng.standard_normal((n, HOURS), dtype=np.float32)
+    loads *= BASE_HOURLY_SIGMA
+    loads -= BASE_HOURLY_SIGMA ** 2 / 2
+    np.exp(loads, out=loads)
+    loads *= np.repeat(daily, 24, axis=1)
+    loads *= base_t
+    loads *= base_kw
+
+    ev_kwh = _add_ev_sessions(loads, households['is_ev'].to_numpy(dtype=bool), rng, ev)
+
+    pv_kw = households['pv_kw'].to_numpy(dtype=np.float32)
+    self_consumed = np.zeros(n)
+    has_pv = np.flatnonzero(pv_kw > 0)
+    if len(has_pv):
+        clearness = rng.beta(*CLEARNESS, (len(has_pv), DAYS)).astype(np.float32)
+        generation = np.repeat(clearness, 24, axis=1) * solar_t * pv_kw[has_pv, None]
+        used = np.minimum(loads[has_pv], generation)
+        loads[has_pv] -= used
+        self_consumed[has_pv] = used.sum(axis=1, dtype=np.float64)
+    return loads, ev_kwh, self_consumed
+
+
+def profile_batches(households, batch=BATCH_HOUSEHOLDS, seed=SEED, ev=EV_CHARGING):
+    """Yield (row slice, loads, ev_kwh, pv_self_kwh) per batch; the same seed gives the same profiles."""
+    templates = (base_template(), solar_template())
+    for batch_no, start in enumerate(range(0, len(households), batch)):
+        rows = slice(start, min(start + batch, len(households)))
+        rng = np.random.default_rng([seed, batch_no])
+        yield (rows, *simulate_batch(households.iloc[rows], rng, templates, ev))
+
+
+def system_peak_hours(households, count=SYSTEM_PEAK_COUNT, batch=BATCH_HOUSEHOLDS, seed=SEED, ev=EV_CHARGING):
+    """The `count` highest hours of the simulated households' summed load."""
+    system = np.zeros(HOURS)
+    for _, loads, _, _ in profile_batches(households, batch, seed, ev):
+        system += loads.sum(axis=0, dtype=np.float64)
+    return np.sort(np.argsort(system)[-count:])
+
+
+def profile_metrics(loads, peak_hours=None, peak_mask=None):
+    """Per-household metrics from a (households, 8760) kW array."""
+    if peak_mask is None:
+        peak_mask = np.isin(HOUR_OF_DAY, list(PEAK_HOURS))
+    annual = loads.sum(axis=1, dtype=np.float64)
+    mean_kw = annual / HOURS
+    mean_sq = np.einsum('ij,ij->i', loads, loads, dtype=np.float64) / HOURS
+    peak_kwh = loads[:, peak_mask].sum(axis=1, dtype=np.float64)
+    out = {
+        'annual_kwh': annual,
+        'usage_kwh': annual / 12,
+        'mean_kw': mean_kw,
+        'variance_kw2': mean_sq - mean_kw ** 2,
+        'wolak_score': 0.5 * mean_sq,        # 0.5 * (variance + mean^2)
+        'max_kw': loads.max(axis=1).astype(np.float64),
+        'peak_kwh': peak_kwh,
+        'offpeak_kwh': annual - peak_kwh,
+        'peak_share': np.divide(peak_kwh, annual, out=np.zeros_like(annual), where=annual > 0),
+    }
+    if peak_hours is not None:
+        out['coincident_peak_kw'] = loads[:, peak_hours].mean(axis=1, dtype=np.float64)
+    return out
+
+
+def simulate_households(households, batch=BATCH_HOUSEHOLDS, seed=SEED, peak_hours=None, ev=EV_CHARGING):
+    """Metrics for every household (one row each) and the system peak hours used.
+
+    Without `peak_hours` the profiles are generated twice: once to find the system peak,
+    once for the metrics.
+    """
+    if peak_hours is None:
+        peak_hours = system_peak_hours(households, batch=batch, seed=seed, ev=ev)
+    peak_mask = np.isin(HOUR_OF_DAY, list(PEAK_HOURS))
+    frames = []
+    for rows, loads, ev_kwh, pv_self in profile_batches(households, batch, seed, ev):
+        metrics = profile_metrics(loads, peak_hours, peak_mask)
+        metrics['ev_kwh'] = ev_kwh
+        metrics['pv_self_consumed_kwh'] = pv_self
+        frames.append(pd.DataFrame(metrics, index=households.index[rows]))
+    return households.join(pd.concat(frames)), peak_hours
+
+
+def mean_daily_shapes(households, n=500, seed=SEED, ev=EV_CHARGING):
+    """Average hour-of-day load (kW) per archetype, from the first `n` households of each."""
+    shapes = {}
+    for name, group in households.groupby('archetype', observed=True):
+        _, loads, _, _ = next(profile_batches(group.head(n), batch=n, seed=seed, ev=ev))
+        shapes[name] = loads.reshape(len(loads), DAYS, 24).mean(axis=(0, 1))
+    return pd.DataFrame(shapes, index=pd.RangeIndex(24, name='Hour'))
+
+
+def main():
+    # === Step 1: simulate every archetype household ===
+    households = archetype_households()
+    start = time.time()
+    metrics, peak_hours = simulate_households(households)
+    print(f"Simulated {len(households):,} households x {HOURS} hours in {time.time() - start:.1f}s")
+    print("System peak hours (hour of day):", np.bincount(HOUR_OF_DAY[peak_hours], minlength=24).nonzero()[0])
+
+    # === Step 2: bills with the simulated EEHWTP score and peak share ===
+    hh = {'usage_kwh': metrics['usage_kwh'], 'is_ev': metrics['is_ev'], 'agi': np.full(len(metrics), 75_000.0)}
+    closed_form = scenario_bills(hh)
+    simulated = scenario_bills({**hh, 'wolak_score': metrics['wolak_score'], 'peak_share': metrics['peak_share']})
+    metrics['closed_form_score'] = closed_form['wolak_score']
+    metrics['S3_Capacity_Fixed'] = simulated['capacity_fixed_S3']
+    metrics['Annual_Bill_S1'] = simulated['bill_S1']
+    metrics['Annual_Bill_S3'] = simulated['bill_S3']
+
+    summary = metrics.groupby('archetype', observed=True)[[
+        'usage_kwh', 'ev_kwh', 'pv_self_consumed_kwh', 'peak_share', 'mean_kw', 'max_kw',
+        'coincident_peak_kw', 'wolak_score', 'closed_form_score', 'S3_Capacity_Fixed',
+        'Annual_Bill_S1', 'Annual_Bill_S3']].mean()
+    print(summary.round(3).T.to_string())
+    summary.to_csv('load_profile_metrics_by_archetype.csv')
+
+    # === Step 3: average daily shapes ===
+    shapes = mean_daily_shapes(households)
+    fig, ax = plt.subplots(figsize=(11, 6))
+    for name in shapes.columns:
+        ax.plot(shapes.index, shapes[name], marker='o', linewidth=2, label=name)
+    ax.axvspan(min(PEAK_HOURS), max(PEAK_HOURS) + 1, color='#e74c3c', alpha=0.1, label='TOU peak')
+    ax.set_xlabel('Hour of Day', fontsize=12)
+    ax.set_ylabel('Average Grid Import (kW)', fontsize=12)
+    ax.set_title('Simulated Household Load Shapes by Archetype', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig('Archetype_Load_Shapes.png', dpi=300)
+    print("✅ Saved load_profile_metrics_by_archetype.csv and Archetype_Load_Shapes.png")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
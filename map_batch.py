@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import shapely
+import matplotlib.pyplot as plt
+
+# Batch choropleth rendering. The caller merges every metric onto the geometry once
+# (one wide GeoDataFrame, one column per map), then each map renders on a process pool.
+#
+# A manifest next to the PNGs records a fingerprint per map: the hashed column values,
+# the geometry and the style. Maps whose fingerprint hasn't changed are skipped.
+
+MANIFEST_NAME = ".map_manifest.json"
+
+_GDF = None  # per-worker copy of the wide GeoDataFrame, set by _init_worker
+
+
+def _init_worker(gdf):
+    global _GDF
+    _GDF = gdf
+    plt.switch_backend("Agg")
+
+
+def geometry_fingerprint(gdf):
+    return hashlib.sha1(b"".join(shapely.to_wkb(gdf.geometry.values))).hexdigest()
+
+
+def map_fingerprint(gdf, job, geometry_key):
+    """Hash of one map's inputs: its data column (in geometry order), geometry and style."""
+    h = hashlib.sha1(geometry_key.encode())
+    h.update(pd.util.hash_pandas_object(gdf[job["column"]], index=False).to_numpy().tobytes())
+    h.update(json.dumps(job, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _render(job, out_dir):
+    fig, ax = plt.subplots(figsize=job["figsize"])
+    _GDF.plot(column=job["column"], ax=ax, **job["plot_kwds"])
+    ax.set_title(job["title"], fontsize=job.get("title_fontsize", 16))
+    ax.axis("off")
+    fig.tight_layout()
+
+    # Write beside the target and swap in, so an interrupted run never leaves a half-written PNG
+    path = os.path.join(out_dir, job["filename"])
+    tmp_path = path + ".tmp.png"
+    fig.savefig(tmp_path, dpi=job["dpi"])
+    plt.close(fig)
+    os.replace(tmp_path, path)
+    return job["filename"]
+
+
+def render_maps(gdf, jobs, out_dir=".", workers=None, force=False):
+    """Render each job's choropleth from `gdf`, skipping maps whose inputs are unchanged.
+
+    jobs: dicts with column, filename, title, figsize, dpi and plot_kwds (passed to
+    GeoDataFrame.plot); any extra keys are part of the style fingerprint.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+    geometry_key = geometry_fingerprint(gdf)
+
+    pending = []
+    for job in jobs:
+        fp = map_fingerprint(gdf, job, geometry_key)
+        up_to_date = manifest.get(job["filename"]) == fp and os.path.exists(os.path.join(out_dir, job["filename"]))
+        if force or not up_to_date:
+            pending.append((job, fp))
+    print(f"{len(jobs) - len(pending)} of {len(jobs)} maps unchanged; rendering {len(pending)}.")
+    if not pending:
+        return []
+
+    # Workers only need the geometry and the columns being drawn
+    columns = sorted({job["column"] for job, _ in pending})
+    subset = gdf[columns + [gdf.geometry.name]]
+
+    rendered = []
+    n_workers = min(workers or os.cpu_count(), len(pending))
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(subset,)) as pool:
+        futures = {pool.submit(_render, job, out_dir): (job, fp) for job, fp in pending}
+        for future in as_completed(futures):
+            job, fp = futures[future]
+            rendered.append(future.result())
+            manifest[job["filename"]] = fp
+            _save_manifest(out_dir, manifest)
+            print(f"  saved {job['filename']}")
+    return rendered
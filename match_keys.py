@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# (ZIP, install date, system size) packed into one uint64 so record matching is an integer
+# join instead of formatting and hashing 'zip_date_size' strings.
+#
+#   bits 63..47  ZIP as an integer (0-99999 fits in 17 bits)
+#   bits 46..32  days since 1970-01-01 (15 bits: 1970 through 2059)
+#   bits 31..0   system size as float32 bits, the same precision the string keys used
+#
+# A missing size keys as one canonical NaN, so (like the old '..._nan' strings) it matches
+# other missing sizes at the same ZIP and date. Rows with a missing or out-of-range ZIP or
+# date get MISSING_KEY and never match.
+
+ZIP_BITS = 17
+DAY_BITS = 15
+SIZE_BITS = 32
+MISSING_KEY = np.uint64(np.iinfo(np.uint64).max)
+
+
+def _zip_days(zips, dates):
+    zip_num = pd.to_numeric(pd.Series(zips), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    days = dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    ok = (np.isfinite(zip_num) & (zip_num >= 0) & (zip_num < 2 ** ZIP_BITS)
+          & dates.notna().to_numpy() & (days >= 0) & (days < 2 ** DAY_BITS))
+    return np.where(ok, zip_num, 0).astype(np.int64), np.where(ok, days, 0), ok
+
+
+def zip_day_keys(zips, dates):
+    """int64 ZIP * 2**15 + day: sorts by ZIP, then date, so a date window never crosses ZIPs.
+
+    -1 where the ZIP or date is missing or out of range.
+    """
+    zip_num, days, ok = _zip_days(zips, dates)
+    return np.where(ok, (zip_num << DAY_BITS) | days, -1)
+
+
+def pack_keys(zips, dates, sizes):
+    """uint64 keys from normalized 5-digit ZIP strings, datetimes and system sizes."""
+    zip_num, days, ok = _zip_days(zips, dates)
+    size = pd.to_numeric(pd.Series(sizes), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    # -0.0 and 0.0 are the same size; give them the same bits, and every NaN one pattern
+    size32 = size.astype(np.float32) + np.float32(0)
+    size32[np.isnan(size32)] = np.float32(np.nan)
+    size_bits = size32.view(np.uint32).astype(np.uint64)
+    keys = ((zip_num.astype(np.uint64) << np.uint64(DAY_BITS + SIZE_BITS))
+            | (days.astype(np.uint64) << np.uint64(SIZE_BITS))
+            | size_bits)
+    return np.where(ok, keys, MISSING_KEY)
+
+
+def unpack_keys(keys):
+    """(zip str, date, float32 size) arrays back from packed keys."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    zip_num = (keys >> np.uint64(DAY_BITS + SIZE_BITS)).astype(np.int64)
+    days = ((keys >> np.uint64(SIZE_BITS)) & np.uint64(2 ** DAY_BITS - 1)).astype(np.int64)
+    size = (keys & np.uint64(2 ** SIZE_BITS - 1)).astype(np.uint32).view(np.float32)
+    zips = np.char.zfill(zip_num.astype(str), 5)
+    return zips, days.astype("datetime64[D]"), size
+
+
+def key_index(keys):
+    """Sorted unique valid keys: the build side of the join."""
+    keys = np.unique(keys)
+    return keys[keys != MISSING_KEY]
+
+
+def match_mask(keys, index):
+    """True where a probe key is present in a key_index (binary search, no hashing)."""
+    if len(index) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.searchsorted(index, keys)
+    pos[pos == len(index)] = 0
+    return (index[pos] == keys) & (keys != MISSING_KEY)
@@ -0,0 +1,145 @@
+import os
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+from interconnection_io import file_signature
+from match_keys import pack_keys, key_index, match_mask
+from record_linkage import build_index, chunk_candidates, resolve_links, print_match_quality
+from tts_reader import byte_ranges, tts_chunks
+
+# Checkpointed CA <-> TTS matching over the national file.
+#
+# The national CSV is cut into byte-range partitions on line boundaries. Each partition is
+# matched on a worker process and written to its own parquet file (temp file + rename, so
+# a part either exists complete or not at all). manifest.json in the job directory records
+# the inputs and which partitions are done; a rerun with the same inputs only processes the
+# rest, then the parts are merged in partition order into the output CSV (also atomically).
+#
+# Exact mode writes each part's matched TTS rows. Fuzzy mode writes each part's candidate
+# pairs; the one-to-one assignment runs over all of them at merge time.
+
+MANIFEST_NAME = "manifest.json"
+PROBE_ID_SHIFT = 40  # fuzzy probe id = partition << 40 | row within the partition
+
+_INDEX = None  # per-worker build side of the join, set by _init_worker
+
+
+def _init_worker(index):
+    global _INDEX
+    _INDEX = index
+
+
+def _part_path(job_dir, part_id):
+    return os.path.join(job_dir, f"part_{part_id:05d}.parquet")
+
+
+def _load_manifest(job_dir):
+    path = os.path.join(job_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(job_dir, manifest):
+    path = os.path.join(job_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _new_manifest(job_dir, inputs, national_path, partition_bytes):
+    # Starting over: anything left from a run with other inputs is stale
+    for path in glob.glob(os.path.join(job_dir, "part_*.parquet*")):
+        os.remove(path)
+    n_parts = max(1, -(-os.path.getsize(national_path) // partition_bytes))
+    parts = [{"id": i, "start": start, "end": end, "status": "pending"}
+             for i, (start, end) in enumerate(byte_ranges(national_path, n_parts))]
+    return {"inputs": inputs, "parts": parts}
+
+
+def _match_partition(task):
+    mode, national_path, columns, part, job_dir = task
+    frames, n_rows = [], 0
+    for chunk in tts_chunks(national_path, columns, byte_range=(part["start"], part["end"])):
+        if mode == "fuzzy":
+            frames.append(chunk_candidates(_INDEX, chunk, offset=(part["id"] << PROBE_ID_SHIFT) + n_rows))
+        else:
+            keys = pack_keys(chunk["zip_code"], chunk["installation_date"], chunk["PV_system_size_DC"])
+            frames.append(chunk[match_mask(keys, _INDEX)])
+        n_rows += len(chunk)
+
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    path = _part_path(job_dir, part["id"])
+    out.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return part["id"], n_rows, len(out)
+
+
+def _merge_csv(job_dir, parts, out_csv):
+    tmp_path = out_csv + ".tmp"
+    first = True
+    for part in parts:
+        df = pd.read_parquet(_part_path(job_dir, part["id"]))
+        df.to_csv(tmp_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+    os.replace(tmp_path, out_csv)
+
+
+def run_matching(ca_df, national_path, out_csv, job_dir, mode="exact", ca_signature=None,
+                 columns=("zip_code", "installation_date", "PV_system_size_DC", "third_party_owned"),
+                 partition_bytes=256 << 20, workers=None):
+    """Match the national file against `ca_df`, resuming any unfinished run in `job_dir`.
+
+    ca_df needs zip_code, installation_date and system_size_dc. ca_signature identifies the
+    CA inputs (e.g. interconnection_io.folder_signature); without it the CA side is hashed.
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    columns = list(columns)
+    if ca_signature is None:
+        ca_signature = int(pd.util.hash_pandas_object(ca_df, index=False).sum())
+    inputs = {"national": {"path": os.path.abspath(national_path), **file_signature(national_path)},
+              "ca": ca_signature, "mode": mode, "columns": columns, "partition_bytes": partition_bytes}
+
+    manifest = _load_manifest(job_dir)
+    if manifest is None or manifest["inputs"] != json.loads(json.dumps(inputs)):
+        if manifest is not None:
+            print("Matching inputs changed since the last run; starting over.")
+        manifest = _new_manifest(job_dir, inputs, national_path, partition_bytes)
+        _save_manifest(job_dir, manifest)
+
+    parts = manifest["parts"]
+    pending = [p for p in parts if p["status"] != "done" or not os.path.exists(_part_path(job_dir, p["id"]))]
+    print(f"{len(parts) - len(pending)} of {len(parts)} partitions already done; matching {len(pending)}.")
+
+    if pending:
+        if mode == "fuzzy":
+            index = build_index(ca_df["zip_code"], ca_df["installation_date"], ca_df["system_size_dc"])
+        else:
+            index = key_index(pack_keys(ca_df["zip_code"], ca_df["installation_date"], ca_df["system_size_dc"]))
+        tasks = [(mode, national_path, columns, p, job_dir) for p in pending]
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(tasks)),
+                                 initializer=_init_worker, initargs=(index,)) as pool:
+            futures = [pool.submit(_match_partition, t) for t in tasks]
+            for future in as_completed(futures):
+                part_id, n_rows, n_out = future.result()
+                parts[part_id].update(status="done", rows=n_rows, output_rows=n_out)
+                _save_manifest(job_dir, manifest)
+                print(f"  partition {part_id}: {n_rows:,} CA rows -> {n_out:,}")
+
+    if mode == "fuzzy":
+        cands = pd.concat([pd.read_parquet(_part_path(job_dir, p["id"])) for p in parts], ignore_index=True)
+        linked, stats = resolve_links(cands, ca_df, sum(p["rows"] for p in parts))
+        linked.to_csv(out_csv + ".tmp", index=False)
+        os.replace(out_csv + ".tmp", out_csv)
+        print_match_quality(stats)
+        total = len(linked)
+    else:
+        _merge_csv(job_dir, parts, out_csv)
+        total = sum(p["output_rows"] for p in parts)
+
+    print(f"\n✅ Finished! {total:,} matched rows from {len(parts)} partitions")
+    print(f"Saved to {out_csv}")
+    return total
@@ -1,57 +1,30 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import json
 import numpy as np
 
+from zip_codes import normalize_zips
+from zip_panel import load_panel
+
 # --- TOGGLES ---
 NORMALIZE_BY_DETACHED = True        # normalize by single-family detached homes
 NORMALIZE_BY_HOUSEHOLDS = False     # normalize by total households instead (old method)
 RESTRICT_TO_COASTAL = True          # restrict to coastal counties only
 
 # === Step 1: Load datasets ===
-ev_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/ev_share_long.csv'
-pv_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Aggregated_Data_Solar/pv_capacity_ac_by_zip_up_to_2025_agg.csv'
-dwellings_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/DwellingData/2023Dwellings.csv'
 crosswalk_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/ZIP_COUNTY_062025.csv'  
 
-# --- Load EV data (now using EV_PHEV_Total) ---
-ev_df = pd.read_csv(ev_path)
-ev_df['Zip Code'] = ev_df['Zip Code'].astype(str).str.zfill(5)
+# EV, PV, dwellings and household metrics come from the cached ZIP-year panel (see zip_panel);
+# it re-reads ev_share_long.csv, the PV aggregate etc. only when their contents change
+panel = load_panel()
 
-# Expect columns: BEVs, PHEVs, EV_PHEV_Total, EV_Share, EV_PHEV_Share
-if 'EV_PHEV_Total' not in ev_df.columns:
+# Expect EVMaps.py columns: BEVs, PHEVs, EV_PHEV_Total, EV_Share, EV_PHEV_Share
+if 'EV_PHEV_Total' not in panel.columns:
     raise ValueError("❌ ERROR: ev_share_long.csv does not contain EV_PHEV_Total. Make sure the previous script was re-run.")
 
-# --- Load PV data ---
-pv_df = pd.read_csv(pv_path)
-pv_df.rename(columns={'zip': 'Zip Code'}, inplace=True)
-pv_df['Zip Code'] = pv_df['Zip Code'].astype(str).str.zfill(5)
-
-# --- Load Detached Homes Data ---
-dwellings_df = pd.read_csv(dwellings_path)
-dwellings_df['Zip Code'] = dwellings_df['NAME'].str.extract(r'(\d{5})')
-dwellings_df['Zip Code'] = dwellings_df['Zip Code'].astype(str).str.zfill(5)
-dwellings_df['num_detached'] = pd.to_numeric(dwellings_df['B25024_002E'], errors='coerce')
-
-# --- Load Household Data Only If Needed ---
-if NORMALIZE_BY_HOUSEHOLDS:
-    households_path = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/Households.json'
-    with open(households_path, 'r') as f:
-        data = json.load(f)
-    headers = data[0]
-    rows = data[1:]
-    households_df = pd.DataFrame(rows, columns=headers)
-    households_df.rename(columns={
-        'zip code tabulation area': 'Zip Code',
-        'B11001_001E': 'num_households'
-    }, inplace=True)
-    households_df['Zip Code'] = households_df['Zip Code'].astype(str).str.zfill(5)
-    households_df['num_households'] = pd.to_numeric(households_df['num_households'], errors='coerce')
-
 # --- Load ZIP-to-County Crosswalk (for coastal filtering) ---
 if RESTRICT_TO_COASTAL:
     crosswalk = pd.read_csv(crosswalk_path, dtype={'ZIP': str})
-    crosswalk['ZIP'] = crosswalk['ZIP'].str.zfill(5)
+    crosswalk['ZIP'] = normalize_zips(crosswalk['ZIP'])
 
     # FIPS to County Name lookup (California coastal only)
     county_fips_to_name = {
@@ -82,25 +55,15 @@ if RESTRICT_TO_COASTAL:
 
     print(f"✅ Identified {len(coastal_zips)} coastal ZIP codes.")
 
-# === Step 2: Filter EV data to 2024 ===
-ev_2024 = ev_df[ev_df['Year'] == 2024].copy()
-
-# === Step 3: Merge EV + Detached Data ===
-merged = ev_2024.merge(dwellings_df[['Zip Code', 'num_detached']], on='Zip Code', how='inner')
+# === Steps 2-4: EV (2024) + Detached + PV: ZIPs the panel has in all three ===
+keep = (panel['Year'] == 2024) & panel['has_ev'] & panel['has_dwellings'] & panel['has_pv']
+if NORMALIZE_BY_HOUSEHOLDS:
+    keep &= panel['has_households']
+merged = panel[keep]
 merged = merged[merged['num_detached'] > 0].copy()
-
-# --- Merge Household Data Only If Needed ---
 if NORMALIZE_BY_HOUSEHOLDS:
-    merged = merged.merge(households_df[['Zip Code', 'num_households']], on='Zip Code', how='inner')
     merged = merged[merged['num_households'] > 0].copy()
 
-# === Step 4: Merge PV Data ===
-merged = merged.merge(
-    pv_df[['Zip Code', 'pv_capacity_residential_ac', 'pv_count_residential_ac']],
-    on='Zip Code',
-    how='inner'
-)
-
 # --- Apply Coastal Filter if Enabled ---
 if RESTRICT_TO_COASTAL:
     before = len(merged)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+# ---------------- USER CONFIG ----------------
+# Sector name -> case-insensitive regex on the customer sector column
+SECTORS = {
+    "residential": r"residential",
+}
+
+# Size band name -> [low, high) in kW AC; None leaves that side open
+SIZE_BANDS = {
+    "under10": (None, 10),
+}
+# ------------------------------------------------
+
+
+def match_mask(series, pattern):
+    """Case-insensitive regex match as a bool array; categoricals are matched once per category."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        cat_hits = series.cat.categories.astype(str).str.contains(pattern, case=False, regex=True)
+        # code -1 (missing) lands on the trailing False
+        return np.append(np.asarray(cat_hits, dtype=bool), False)[series.cat.codes.to_numpy()]
+    return series.str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+
+
+def band_mask(size, low, high):
+    mask = np.isfinite(size)
+    if low is not None:
+        mask &= size >= low
+    if high is not None:
+        mask &= size < high
+    return mask
+
+
+def metric_columns(sectors=SECTORS, size_bands=SIZE_BANDS):
+    """Output column order: total capacity, then per sector capacity/count and each band's capacity/count."""
+    cols = ["pv_capacity_ac"]
+    for sector in sectors:
+        cols += [f"pv_capacity_{sector}_ac", f"pv_count_{sector}_ac"]
+        for band in size_bands:
+            cols += [f"pv_capacity_{sector}_ac_{band}", f"pv_count_{sector}_ac_{band}"]
+    return cols
+
+
+def aggregate_zip_metrics(df, zip_col="service_zip", size_col="system_size_ac", sector_col="customer_sector",
+                          sectors=SECTORS, size_bands=SIZE_BANDS):
+    """Every ZIP-level capacity and count metric in a single grouped pass.
+
+    Each metric is the system size (or 1 for counts) weighted by a boolean
+    sector / size-band mask, so adding sectors or bands adds columns, not passes.
+    """
+    size = pd.to_numeric(df[size_col], errors="coerce").to_numpy(dtype="float64")
+    cap = np.nan_to_num(size, nan=0.0)
+    bands = {band: band_mask(size, low, high) for band, (low, high) in size_bands.items()}
+
+    weights = {"pv_capacity_ac": cap}
+    for sector, pattern in sectors.items():
+        in_sector = match_mask(df[sector_col], pattern)
+        weights[f"pv_capacity_{sector}_ac"] = cap * in_sector
+        weights[f"pv_count_{sector}_ac"] = in_sector.astype(np.int64)
+        for band, in_band in bands.items():
+            hit = in_sector & in_band
+            weights[f"pv_capacity_{sector}_ac_{band}"] = cap * hit
+            weights[f"pv_count_{sector}_ac_{band}"] = hit.astype(np.int64)
+
+    agg = pd.DataFrame(weights).groupby(df[zip_col].to_numpy(), sort=True).sum()
+    agg.index.name = "zip"
+    return agg[metric_columns(sectors, size_bands)].reset_index()
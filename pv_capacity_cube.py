@@ -0,0 +1,263 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from pv_aggregates import SECTORS, SIZE_BANDS, match_mask, metric_columns
+
+# Precomputed PV capacity / count cube at ZIP x approval year x customer sector x size band.
+# Year ranges become differences of a cumulative sum along the year axis, so "up to 2025",
+# "only 2023" or "2019-2022" are array slices instead of a filter + groupby over raw rows.
+#
+# Axes
+#   zips    : sorted 5-digit ZIPs, plus a trailing "" slot for rows with no ZIP
+#   years   : every approval year from min to max; the extra last slot holds missing dates
+#   sectors : every combination of SECTORS matches, as a bit mask (bit i set = the row
+#             matches SECTORS key i; 0 = no sector), so overlapping sector patterns count a
+#             row in each sector it matches, as aggregate_zip_metrics does
+#   bands   : intervals between the size-band edges, plus "unknown" for missing sizes
+
+NO_ZIP = ""
+UNKNOWN_BAND = "unknown"
+
+
+def band_edges(size_bands=SIZE_BANDS):
+    return sorted({b for band in size_bands.values() for b in band if b is not None})
+
+
+def _band_labels(edges):
+    bounds = [None] + list(edges) + [None]
+    labels = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        labels.append(f"<{hi}" if lo is None else f"{lo}+" if hi is None else f"{lo}-{hi}")
+    return labels + [UNKNOWN_BAND]
+
+
+def cube_coordinates(clean_df, sectors=SECTORS, size_bands=SIZE_BANDS):
+    """Per-row cube coordinates for the photovoltaic rows of a cleaned frame.
+
+    Returns the PV mask over `clean_df` and a frame of zip label, approval year
+    (NaN when missing), sector index, band index and capacity for those rows.
+    """
+    is_pv = match_mask(clean_df["technology_type"], r"photovoltaic")
+    pv = clean_df[is_pv]
+
+    sector_idx = np.zeros(len(pv), dtype=np.int64)
+    for i, pattern in enumerate(sectors.values()):
+        sector_idx |= match_mask(pv["customer_sector"], pattern).astype(np.int64) << i
+
+    edges = band_edges(size_bands)
+    size = pd.to_numeric(pv["system_size_ac"], errors="coerce").to_numpy(dtype="float64")
+    band_idx = np.where(np.isfinite(size), np.searchsorted(edges, size, side="right"), len(edges) + 1)
+
+    coords = pd.DataFrame({
+        "zip": pv["service_zip"].where(pv["service_zip"].notna(), NO_ZIP).astype(str).to_numpy(),
+        "year": pv["app_approved_date"].dt.year.to_numpy(dtype="float64"),
+        "sector": sector_idx,
+        "band": band_idx,
+        "capacity": np.nan_to_num(size),
+    }, index=pv.index)
+    return is_pv, coords
+
+
+def _refresh_cumulative(cube):
+    cube["capacity_cum"] = np.cumsum(cube["capacity"][:, :-1], axis=1)
+    cube["count_cum"] = np.cumsum(cube["count"][:, :-1], axis=1)
+    return cube
+
+
+def empty_cube(sectors=SECTORS, size_bands=SIZE_BANDS, signature=None):
+    edges = band_edges(size_bands)
+    shape = (1, 1, 2 ** len(sectors), len(edges) + 2)
+    return _refresh_cumulative({
+        "zips": np.array([NO_ZIP]),
+        "years": np.arange(0),
+        "sectors": list(sectors),
+        "bands": _band_labels(edges),
+        "edges": edges,
+        "capacity": np.zeros(shape),
+        "count": np.zeros(shape, dtype=np.int64),
+        "signature": signature,
+    })
+
+
+def extend_axes(cube, zips=(), years=()):
+    """Grow the ZIP and year axes in place so the given labels have a slot."""
+    new_zips = np.setdiff1d(np.asarray(zips, dtype=str), cube["zips"])
+    known = np.asarray([y for y in years if np.isfinite(y)], dtype=np.int64)
+    old_years = cube["years"]
+    y0 = min([*old_years[:1], *known]) if len(old_years) or len(known) else 0
+    y1 = max([*old_years[-1:], *known]) if len(old_years) or len(known) else -1
+    if len(new_zips) == 0 and len(old_years) == y1 - y0 + 1:
+        return cube
+
+    zip_labels = np.append(np.union1d(cube["zips"][cube["zips"] != NO_ZIP], new_zips[new_zips != NO_ZIP]), NO_ZIP)
+    years = np.arange(y0, y1 + 1)
+    zip_pos = np.searchsorted(zip_labels[:-1], cube["zips"][:-1])
+    year_pos = np.append(old_years - y0, len(years)).astype(np.int64)
+
+    for key in ("capacity", "count"):
+        old = cube[key]
+        grown = np.zeros((len(zip_labels), len(years) + 1) + old.shape[2:], dtype=old.dtype)
+        grown[np.append(zip_pos, len(zip_labels) - 1)[:, None], year_pos[None, :]] = old
+        cube[key] = grown
+    cube["zips"], cube["years"] = zip_labels, years
+    return _refresh_cumulative(cube)
+
+
+def apply_rows(cube, coords, sign=1):
+    """Add (sign=1) or retract (sign=-1) rows given as cube_coordinates output."""
+    if len(coords) == 0:
+        return cube
+    extend_axes(cube, coords["zip"].unique(), coords["year"].unique())
+    zip_idx = np.searchsorted(cube["zips"][:-1], coords["zip"].to_numpy())
+    zip_idx = np.where(coords["zip"].to_numpy() == NO_ZIP, len(cube["zips"]) - 1, zip_idx)
+    year = coords["year"].to_numpy()
+    first = cube["years"][0] if len(cube["years"]) else 0
+    year_idx = np.where(np.isfinite(year), np.nan_to_num(year) - first, len(cube["years"])).astype(np.int64)
+
+    idx = (zip_idx, year_idx, coords["sector"].to_numpy(), coords["band"].to_numpy())
+    np.add.at(cube["capacity"], idx, sign * coords["capacity"].to_numpy())
+    np.add.at(cube["count"], idx, sign)
+    # Retractions leave float dust behind; an empty cell has no capacity
+    cube["capacity"][cube["count"] == 0] = 0.0
+    return _refresh_cumulative(cube)
+
+
+def build_cube(clean_df, sectors=SECTORS, size_bands=SIZE_BANDS, signature=None):
+    """Fold photovoltaic rows of a cleaned interconnection frame into the cube."""
+    _, coords = cube_coordinates(clean_df, sectors, size_bands)
+
+    zip_codes, zip_labels = pd.factorize(coords["zip"], sort=True)
+    zip_labels = np.asarray(zip_labels, dtype=str)
+    if NO_ZIP not in zip_labels:
+        zip_labels = np.append(zip_labels, NO_ZIP)
+    else:
+        # "" sorts first; move it to the end so real ZIPs start at 0
+        zip_codes = np.where(zip_codes == 0, len(zip_labels) - 1, zip_codes - 1)
+        zip_labels = np.append(zip_labels[1:], NO_ZIP)
+
+    year = coords["year"].to_numpy()
+    known = np.isfinite(year)
+    y0 = int(year[known].min()) if known.any() else 0
+    y1 = int(year[known].max()) if known.any() else -1
+    years = np.arange(y0, y1 + 1)
+    year_idx = np.where(known, np.nan_to_num(year) - y0, len(years)).astype(np.int64)
+
+    edges = band_edges(size_bands)
+    shape = (len(zip_labels), len(years) + 1, 2 ** len(sectors), len(edges) + 2)
+    flat = np.ravel_multi_index((zip_codes, year_idx, coords["sector"].to_numpy(), coords["band"].to_numpy()), shape)
+    n_cells = int(np.prod(shape))
+    capacity = np.bincount(flat, weights=coords["capacity"].to_numpy(), minlength=n_cells).reshape(shape)
+    count = np.bincount(flat, minlength=n_cells).reshape(shape)
+
+    return _refresh_cumulative({
+        "zips": zip_labels,
+        "years": years,
+        "sectors": list(sectors),
+        "bands": _band_labels(edges),
+        "edges": edges,
+        "capacity": capacity,
+        "count": count,
+        "signature": signature,
+    })
+
+
+def save_cube(cube, path):
+    meta = {k: cube[k] for k in ("sectors", "bands", "edges", "signature")}
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, zips=cube["zips"], years=cube["years"],
+                        capacity=cube["capacity"], count=cube["count"],
+                        meta=np.array(json.dumps(meta)))
+    os.replace(tmp_path, path)
+
+
+def load_cube(path, signature=None):
+    """Load a persisted cube; None if missing or built from different inputs."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if signature is not None and meta["signature"] != signature:
+            return None
+        cube = {k: data[k] for k in ("zips", "years", "capacity", "count")}
+    cube.update(meta)
+    return _refresh_cumulative(cube)
+
+
+def cube_signature(source_signature, sectors=SECTORS, size_bands=SIZE_BANDS):
+    """Inputs plus layout, so a config change invalidates the stored cube."""
+    return json.dumps([source_signature, "sector-combinations", sectors, band_edges(size_bands)], sort_keys=True)
+
+
+def slice_years(cube, start=None, end=None, include_missing_dates=False):
+    """(capacity, count) arrays [zip, sector, band] for approval years start..end inclusive."""
+    years = cube["years"]
+    first = int(years[0]) if len(years) else 0
+    lo = 0 if start is None else max(int(start) - first, 0)
+    hi = len(years) - 1 if end is None else min(int(end) - first, len(years) - 1)
+
+    out = []
+    for cum, raw in ((cube["capacity_cum"], cube["capacity"]), (cube["count_cum"], cube["count"])):
+        if hi >= lo:
+            total = cum[:, hi] - (cum[:, lo - 1] if lo > 0 else 0)
+        else:
+            total = np.zeros(raw.shape[:1] + raw.shape[2:], dtype=raw.dtype)
+        if include_missing_dates:
+            total = total + raw[:, -1]
+        out.append(total)
+    return tuple(out)
+
+
+def _sector_members(cube, i):
+    """Sector-axis slots (combination masks) that include sector i."""
+    return [c for c in range(2 ** len(cube["sectors"])) if c >> i & 1]
+
+
+def _band_members(cube, low, high):
+    edges = [None] + list(cube["edges"]) + [None]
+    members = []
+    for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        if (low is None or (lo is not None and lo >= low)) and (high is None or (hi is not None and hi <= high)):
+            members.append(i)
+    return members
+
+
+def zip_aggregates(cube, year=2025, include_all_prior=False, include_missing_dates=False,
+                   size_bands=SIZE_BANDS):
+    """Same frame as aggregate_zip_metrics, answered from the cube."""
+    start = None if include_all_prior else year
+    capacity, count = slice_years(cube, start, year, include_missing_dates)
+
+    has_zip = cube["zips"] != NO_ZIP
+    present = has_zip & (count.sum(axis=(1, 2)) > 0)
+    capacity, count = capacity[present], count[present]
+
+    cols = {"zip": cube["zips"][present].astype(object), "pv_capacity_ac": capacity.sum(axis=(1, 2))}
+    sectors = cube["sectors"]
+    for i, sector in enumerate(sectors):
+        combos = _sector_members(cube, i)
+        in_sector = capacity[:, combos].sum(axis=1), count[:, combos].sum(axis=1)
+        cols[f"pv_capacity_{sector}_ac"] = in_sector[0].sum(axis=1)
+        cols[f"pv_count_{sector}_ac"] = in_sector[1].sum(axis=1).astype(np.int64)
+        for band, (low, high) in size_bands.items():
+            members = _band_members(cube, low, high)
+            cols[f"pv_capacity_{sector}_ac_{band}"] = in_sector[0][:, members].sum(axis=1)
+            cols[f"pv_count_{sector}_ac_{band}"] = in_sector[1][:, members].sum(axis=1).astype(np.int64)
+    return pd.DataFrame(cols)[["zip"] + metric_columns({s: None for s in sectors}, size_bands)]
+
+
+def yearly_totals(cube, sector=None):
+    """Statewide capacity and installation count per approval year (all ZIPs, including unknown)."""
+    capacity = cube["capacity"][:, :-1]
+    count = cube["count"][:, :-1]
+    if sector is not None:
+        combos = _sector_members(cube, cube["sectors"].index(sector))
+        capacity, count = capacity[:, :, combos].sum(axis=2), count[:, :, combos].sum(axis=2)
+    axes = tuple(a for a in range(capacity.ndim) if a != 1)
+    totals = pd.DataFrame({
+        "year": cube["years"],
+        "system_size_ac": capacity.sum(axis=axes),
+        "installations": count.sum(axis=axes),
+    })
+    return totals[totals["installations"] > 0].reset_index(drop=True)
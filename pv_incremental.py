@@ -0,0 +1,176 @@
+import os
+import glob
+import json
+import tempfile
+from datetime import datetime
+import pandas as pd
+
+from interconnection_io import file_signature
+from pv_capacity_cube import (cube_coordinates, empty_cube, apply_rows, save_cube, load_cube,
+                              cube_signature)
+
+# Incremental refresh of the PV capacity cube. Only CSVs that are new or changed since
+# the last run are read; their rows are applied to the stored cube as deltas.
+#
+# State directory
+#   cube.npz        ZIP x year x sector x size-band cube (see pv_capacity_cube)
+#   ledger.parquet  one row per folded PV record: its id, source file and cube coordinates
+#   watermark.json  signature of every folded file, latest approval date, last update time
+#
+# A record that shows up again (same record id) replaces its earlier version: the old
+# coordinates are retracted and the new ones added. As in a full rebuild, the last file in
+# sorted order wins, so re-reading an older file never undoes a newer file's revision.
+# Records that vanish from a modified file are retracted. Files that are deleted from the
+# folder are left in the aggregates.
+
+CUBE_NAME = "cube.npz"
+LEDGER_NAME = "ledger.parquet"
+WATERMARK_NAME = "watermark.json"
+LEDGER_COLUMNS = ["record_id", "source_file", "zip", "year", "sector", "band", "capacity"]
+
+
+def record_ids(clean_df, id_col="application_id"):
+    """Stable per-record key: the utility's application id, else a hash of the record's content."""
+    if id_col in clean_df.columns and clean_df[id_col].notna().any():
+        # ids parsed as float in some files ('1234.0') must line up with text ids ('1234')
+        ids = clean_df[id_col].astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+        if ids.notna().all():
+            return ids.astype(str)
+        print(f"WARNING: {ids.isna().sum():,} rows without {id_col}; keying those by content.")
+    else:
+        ids = pd.Series(pd.NA, index=clean_df.index, dtype="string")
+    # Without an id a revised record can't be linked to its earlier version; only exact repeats dedupe
+    content = clean_df[["service_zip", "app_approved_date", "system_size_ac", "technology_type", "customer_sector"]]
+    hashed = pd.util.hash_pandas_object(content.astype(str), index=False).map("h{:016x}".format)
+    return ids.fillna(hashed).astype(str)
+
+
+def _load_state(state_dir, layout):
+    watermark_path = os.path.join(state_dir, WATERMARK_NAME)
+    if not os.path.exists(watermark_path):
+        return None, None, None
+    with open(watermark_path, "r") as f:
+        watermark = json.load(f)
+    cube = load_cube(os.path.join(state_dir, CUBE_NAME), layout)
+    if cube is None or watermark.get("layout") != layout:
+        print("Stored aggregates were built with a different sector/size-band layout; rebuilding.")
+        return None, None, None
+    ledger = pd.read_parquet(os.path.join(state_dir, LEDGER_NAME))
+    if int(cube["count"].sum()) != len(ledger):
+        # Interrupted between writing the ledger and the cube; the ledger is the source of truth
+        print("Stored cube is out of step with the record ledger; rebuilding it from the ledger.")
+        cube = apply_rows(empty_cube(signature=layout), ledger, sign=1)
+    return cube, ledger, watermark
+
+
+def _save_state(state_dir, cube, ledger, watermark):
+    os.makedirs(state_dir, exist_ok=True)
+    ledger_path = os.path.join(state_dir, LEDGER_NAME)
+    ledger.to_parquet(ledger_path + ".tmp", index=False)
+    os.replace(ledger_path + ".tmp", ledger_path)
+    save_cube(cube, os.path.join(state_dir, CUBE_NAME))
+    # The watermark goes last: if we die before this, the next run re-applies the same files,
+    # which is harmless because every incoming record replaces its ledger entry
+    watermark_path = os.path.join(state_dir, WATERMARK_NAME)
+    with open(watermark_path + ".tmp", "w") as f:
+        json.dump(watermark, f, indent=1, sort_keys=True)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+
+def pending_files(folder, watermark):
+    """CSVs in `folder` that are new or changed since the watermark."""
+    folded = (watermark or {}).get("files", {})
+    paths = sorted(glob.glob(os.path.join(folder, "*.csv")))
+    return [p for p in paths if folded.get(os.path.basename(p)) != file_signature(p)]
+
+
+def update_aggregates(folder, state_dir, read_files, clean):
+    """Fold new or changed CSVs into the stored cube and return it.
+
+    read_files(paths) -> raw frame with __source_file; clean(raw) -> cleaned frame
+    (service_zip, app_approved_date, system_size_ac, technology_type, customer_sector,
+    and application_id when the extract has one).
+    """
+    layout = cube_signature(None)
+    cube, ledger, watermark = _load_state(state_dir, layout)
+    if cube is None:
+        cube = empty_cube(signature=layout)
+        ledger = pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                               zip(LEDGER_COLUMNS, [str, str, str, "float64", "int64", "int64", "float64"])})
+        watermark = {"layout": layout, "files": {}, "max_approved_date": None}
+
+    paths = pending_files(folder, watermark)
+    if not paths:
+        print(f"PV aggregates are up to date ({len(watermark['files'])} file(s) folded in).")
+        return cube
+    print(f"Folding {len(paths)} new or changed file(s) into the PV aggregates...")
+
+    raw = read_files(paths)
+    cleaned = clean(raw)
+    cleaned["record_id"] = record_ids(cleaned)
+    cleaned["source_file"] = raw["__source_file"].astype(str).to_numpy()
+    # A record repeated across the incoming files: the last file (sorted order) wins
+    cleaned = cleaned.drop_duplicates(subset="record_id", keep="last")
+
+    is_pv, coords = cube_coordinates(cleaned)
+    incoming = coords.assign(record_id=cleaned.loc[is_pv, "record_id"].to_numpy(),
+                             source_file=cleaned.loc[is_pv, "source_file"].to_numpy())[LEDGER_COLUMNS]
+
+    # A record the ledger holds from a later file (sorted order) keeps that version
+    incoming_file = ledger["record_id"].map(cleaned.set_index("record_id")["source_file"])
+    in_cleaned = incoming_file.notna()
+    newer = in_cleaned & (incoming_file.fillna("") >= ledger["source_file"])
+
+    # Records whose coordinates haven't changed (re-read from a modified file) are left alone,
+    # but move to the incoming file when it sorts at or after their current one: a later edit
+    # that drops them from an older file must not retract them
+    coord_cols = ["record_id", "zip", "year", "sector", "band", "capacity"]
+    same = ledger[coord_cols].merge(incoming[coord_cols], how="inner", on=coord_cols)["record_id"]
+    is_same = ledger["record_id"].isin(same)
+    moved = is_same & newer
+    ledger.loc[moved, "source_file"] = incoming_file[moved]
+    stale = ledger.loc[in_cleaned & ~newer & ~is_same, "record_id"]
+    incoming = incoming[~incoming["record_id"].isin(same) & ~incoming["record_id"].isin(stale)]
+
+    # Retract earlier versions of every revised record, plus records dropped from a changed file
+    changed = {os.path.basename(p) for p in paths}
+    superseded = newer & ~is_same
+    dropped = ledger["source_file"].isin(changed) & ~in_cleaned
+    retract = ledger[superseded | dropped]
+    apply_rows(cube, retract, sign=-1)
+    apply_rows(cube, incoming, sign=1)
+
+    # Superseded records that are no longer PV are retracted without a replacement
+    revised = superseded & ledger["record_id"].isin(incoming["record_id"])
+    n_new = int((~incoming["record_id"].isin(ledger["record_id"])).sum())
+    n_removed = int(dropped.sum() + (superseded & ~revised).sum())
+    ledger = pd.concat([ledger[~(superseded | dropped)], incoming], ignore_index=True)
+    print(f"  {n_new:,} new PV records, {int(revised.sum()):,} revised, "
+          f"{n_removed:,} removed, {len(same):,} unchanged, {len(stale):,} kept from a later file")
+
+    for p in paths:
+        watermark["files"][os.path.basename(p)] = file_signature(p)
+    latest = cleaned["app_approved_date"].max()
+    if pd.notna(latest):
+        latest = latest.isoformat()
+        watermark["max_approved_date"] = max(filter(None, [watermark["max_approved_date"], latest]))
+    watermark["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    watermark["records"] = len(ledger)
+
+    _save_state(state_dir, cube, ledger, watermark)
+    return cube
+
+
+def replay_matches(folder, state_dir, read_files, clean):
+    """True when the stored ledger equals a from-scratch rebuild of every CSV in `folder`."""
+    with tempfile.TemporaryDirectory() as scratch:
+        update_aggregates(folder, scratch, read_files, clean)
+        replay = pd.read_parquet(os.path.join(scratch, LEDGER_NAME))
+    stored = pd.read_parquet(os.path.join(state_dir, LEDGER_NAME))
+    stored, replay = (df.sort_values("record_id").reset_index(drop=True)[LEDGER_COLUMNS] for df in (stored, replay))
+    if stored.equals(replay):
+        return True
+    diff = stored.merge(replay, how="outer", indicator=True).query("_merge != 'both'")
+    print(f"WARNING: stored PV ledger differs from a from-scratch replay on {len(diff):,} row(s):")
+    print(diff.head(10).to_string(index=False))
+    return False
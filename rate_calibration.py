@@ -0,0 +1,195 @@
+import time
+import numpy as np
+import pandas as pd
+
+from household_bills import DEFAULT_PARAMS, SEED, billing_inputs, load_zip_inputs, scenario_bills, synthesize_households
+from tariffs import REFERENCE_TARIFF, TARIFFS, compile_tariff, resolve, scale_tariff
+
+# Revenue-neutral calibration of the scenario tariffs.
+#
+# The S2/S3 rates in tariffs.py are typed in by hand. Here a tariff's energy part
+# (volumetric, TOU and tier rates) or its fixed part (fixed, income-graduated and capacity
+# charges) is scaled by one factor until the population's annual revenue, after the
+# elasticity response, hits a target (by default what REFERENCE_TARIFF collects).
+#
+# Revenue as a function of the scale is reduced to a few weighted sums, built from one pass
+# over the households:
+#   fixed revenue   sum(w * fixed charges)
+#   energy revenue  sum(w * TOU energy charge), linear in usage so the price response is a
+#                   multiplier on it
+#   tier revenue    sum(w * max(f * kWh - limit, 0)) for a usage multiplier f, read off
+#                   the households' sorted kWh and cumulative weights
+# so each root-finder step costs O(problems x tiers x log households), whatever the
+# population size. The root-finder is Illinois (modified regula falsi), run on a vector of
+# problems at once: parameters given as (problems, 1) arrays calibrate every parameter set
+# together, as the Monte Carlo and the optimizer need.
+
+# ---------------- USER CONFIG ----------------
+CALIBRATE = [('S2', 'energy'), ('S3', 'energy'), ('S3', 'fixed')]  # (tariff, part scaled)
+RTOL = 1e-9          # revenue tolerance, relative to the target
+MAX_ITER = 100
+# ------------------------------------------------
+
+
+def illinois(f, lo, hi, ftol=0.0, xtol=1e-12, max_iter=MAX_ITER):
+    """Roots of f on [lo, hi] for a vector of problems at once (Illinois method).
+
+    `f` maps an array of x (one per problem) to an array of residuals. `hi` is doubled
+    where the bracket does not change sign yet. Returns (x, converged, iterations).
+    """
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype='float64'), np.asarray(hi, dtype='float64'))
+    lo, hi = lo.copy(), hi.copy()
+    f_lo, f_hi = f(lo), f(hi)
+    for _ in range(60):
+        open_ = np.sign(f_lo) == np.sign(f_hi)
+        if not open_.any():
+            break
+        hi = np.where(open_, lo + 2 * (hi - lo), hi)
+        f_hi = np.where(open_, f(hi), f_hi)
+    bracketed = (np.sign(f_lo) != np.sign(f_hi)) | (f_hi == 0)
+
+    x, f_x = hi.copy(), f_hi.copy()
+    done = (np.abs(f_x) <= ftol) | ~bracketed
+    iterations = 0
+    while not done.all() and iterations < max_iter:
+        iterations += 1
+        step = np.divide(f_hi * (hi - lo), f_hi - f_lo, out=np.zeros_like(hi), where=f_hi != f_lo)
+        x_new = np.where(done, x, hi - step)
+        f_new = np.where(done, f_x, f(x_new))
+        crossed = np.sign(f_new) != np.sign(f_hi)
+        lo, f_lo = np.where(done, lo, np.where(crossed, hi, lo)), np.where(done, f_lo, np.where(crossed, f_hi, f_lo / 2))
+        hi, f_hi = np.where(done, hi, x_new), np.where(done, f_hi, f_new)
+        x, f_x = x_new, f_new
+        done = done | (np.abs(f_x) <= ftol) | (np.abs(hi - lo) <= xtol * np.maximum(np.abs(x), 1.0))
+    converged = bracketed & ((np.abs(f_x) <= ftol) | (np.abs(hi - lo) <= xtol * np.maximum(np.abs(x), 1.0)))
+    return x, converged, iterations
+
+
+def _flat(value):
+    value = np.asarray(value, dtype='float64')
+    return value.reshape(-1) if value.ndim > 1 else value
+
+
+def _weighted(values, w):
+    values = np.asarray(values, dtype='float64')
+    if values.ndim and values.shape[-1] == len(w):
+        return _flat(values @ w)
+    return _flat(values * w.sum())  # no household axis
+
+
+def revenue_model(households, tariff, part='energy', params=None, tariffs=TARIFFS, reference=REFERENCE_TARIFF):
+    """revenue(scale): annual revenue when `part` of `tariff` is multiplied by scale.
+
+    Parameters given as (problems, 1) arrays give one revenue per problem; scale then
+    has one entry per problem.
+    """
+    if part not in ('energy', 'fixed'):
+        raise ValueError(f"part must be 'energy' or 'fixed', not {part!r}")
+    periods, billed, p = billing_inputs(households, params)
+    w = np.asarray(households['weight'], dtype='float64')
+    at_par = compile_tariff({k: v for k, v in tariff.items() if k != 'tiers'})(periods, billed, p)
+    fixed = _weighted(at_par['fixed'], w)
+    energy = _weighted(at_par['energy'], w)
+
+    tiers = []
+    if 'tiers' in tariff:
+        usage = np.asarray(households['usage_kwh'], dtype='float64')
+        order = np.argsort(usage)
+        kwh = usage[order]
+        cum_w = np.concatenate([[0.0], np.cumsum(w[order])])
+        cum_wkwh = np.concatenate([[0.0], np.cumsum(w[order] * kwh)])
+        lower = 0.0
+        for upper, rate in tariff['tiers']:
+            upper = None if upper is None else _flat(resolve(upper, p))
+            tiers.append((lower, upper, _flat(resolve(rate, p))))
+            lower = upper
+
+    def excess(f, limit):
+        # sum(w * max(f * kWh - limit, 0)) over households
+        idx = np.searchsorted(kwh, limit / f, side='right')
+        return f * (cum_wkwh[-1] - cum_wkwh[idx]) - limit * (cum_w[-1] - cum_w[idx])
+
+    def tier_revenue(f):
+        total = 0.0
+        for lower, upper, rate in tiers:
+            block = excess(f, lower) - (0.0 if upper is None else excess(f, np.maximum(upper, lower)))
+            total = total + rate * block
+        return total
+
+    elasticity = _flat(p['elasticity'])
+    base = tariffs[reference].get('volumetric')
+    headline = tariff.get('volumetric')
+    base = None if base is None else _flat(resolve(base, p))
+    headline = None if headline is None else _flat(resolve(headline, p))
+
+    def response(scale):
+        if base is None or headline is None:
+            return 1.0
+        return 1 + elasticity * (scale * headline - base) / base
+
+    def revenue(scale):
+        scale = np.asarray(scale, dtype='float64')
+        if part == 'energy':
+            f = response(scale)
+            return 12 * (fixed + scale * (f * energy + tier_revenue(f)))
+        f = response(1.0)
+        return 12 * (scale * fixed + f * energy + tier_revenue(f))
+
+    return revenue
+
+
+def calibrate(households, tariff, part='energy', target=None, params=None, tariffs=TARIFFS,
+              reference=REFERENCE_TARIFF, rtol=RTOL):
+    """Scale on `part` of `tariff` that recovers `target` annual revenue (default: the reference tariff's).
+
+    Returns a dict of 'scale', 'revenue', 'target', 'converged' and 'iterations' (arrays
+    with one entry per parameter set when params are (problems, 1) arrays).
+    """
+    if isinstance(tariff, str):
+        tariff = tariffs[tariff]
+    if target is None:
+        target = revenue_model(households, tariffs[reference], 'energy', params, tariffs, reference)(1.0)
+    target = np.asarray(target, dtype='float64')
+    revenue = revenue_model(households, tariff, part, params, tariffs, reference)
+    shape = np.broadcast_shapes(np.shape(target), np.shape(revenue(1.0)))
+    scale, converged, iterations = illinois(lambda k: revenue(k) - target, np.zeros(shape), np.ones(shape),
+                                            ftol=rtol * np.abs(target))
+    return {'scale': scale, 'revenue': revenue(scale), 'target': target * np.ones(shape),
+            'converged': converged, 'iterations': iterations}
+
+
+def main():
+    # === Step 1: statewide synthetic population ===
+    zip_inputs = load_zip_inputs()
+    households = synthesize_households(zip_inputs, np.random.default_rng(SEED))
+    print(f"{len(households['usage_kwh']):,} synthetic households")
+
+    # === Step 2: revenue-neutral scales ===
+    rows, calibrated = [], {}
+    for name, part in CALIBRATE:
+        start = time.time()
+        result = calibrate(households, name, part)
+        seconds = time.time() - start
+        scale = float(result['scale'])
+        if not result['converged']:
+            print(f"⚠️ {name} ({part}) did not reach the target revenue")
+        tariff = scale_tariff(TARIFFS[name], scale, part, DEFAULT_PARAMS)
+        calibrated[f'{name}_{part}'] = tariff
+        rows.append({'Tariff': name, 'Scaled_Part': part, 'Scale': scale,
+                     'Target_Revenue': float(result['target']), 'Revenue': float(result['revenue']),
+                     'Iterations': result['iterations'], 'Seconds': seconds,
+                     'Volumetric': tariff.get('volumetric'), 'Peak': tariff['energy']['peak'],
+                     'OffPeak': tariff['energy']['offpeak']})
+    table = pd.DataFrame(rows)
+    print(table.to_string(index=False))
+
+    # === Step 3: check against the full bill model ===
+    bills = scenario_bills(households, tariffs={REFERENCE_TARIFF: TARIFFS[REFERENCE_TARIFF], **calibrated})
+    w = households['weight']
+    table['Check_Revenue'] = [bills[f'bill_{k}'] @ w for k in calibrated]
+    table.to_csv('calibrated_tariffs.csv', index=False)
+    print("✅ Saved calibrated_tariffs.csv")
+
+
+if __name__ == "__main__":
+    main()
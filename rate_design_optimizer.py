@@ -0,0 +1,242 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from household_bills import SEED, billing_inputs, load_zip_inputs, population_sample, scenario_bills
+from rate_calibration import calibrate
+from tariffs import REFERENCE_TARIFF, TARIFFS, price_response
+
+# Search between Scenario 1 (pure volumetric) and Scenario 3 (Wolak capacity + IGFC).
+#
+# Every candidate is CANDIDATE_TARIFF with its own capacity multiplier, income-graduated
+# fixed charges, income threshold and TOU peak premium, drawn from SEARCH_SPACE (Latin
+# hypercube; the upper fixed charge is searched as a non-negative step over the lower one so
+# the tiers never invert). Its energy rates are then scaled (rate_calibration.calibrate) so it collects
+# the same revenue as REFERENCE_TARIFF after the elasticity response. Candidates are billed
+# in batches of (candidates, 1) parameter arrays against the household arrays, batches on a
+# process pool, and scored on:
+#
+#   Cross_Subsidy        weighted mean |bill - cost of service| ($/household-year); cost of
+#                        service = marginal energy cost of the household's peak / off-peak
+#                        kWh under the candidate (after its price response) plus the rest of
+#                        the revenue requirement in proportion to its Wolak score
+#   EV_Subsidy           mean (cost of service - bill) of EV households (> 0: EVs underpay)
+#   Bill_Impact          weighted mean |bill change| vs REFERENCE_TARIFF
+#   Low_Income_Change    mean bill change of households under LOW_INCOME_AGI
+#
+# The Pareto frontier over OBJECTIVES (both minimized) is saved with every candidate on it.
+
+# ---------------- USER CONFIG ----------------
+N_CANDIDATES = 10_000
+POPULATION_SAMPLE = 20_000  # synthetic households statewide
+WORKERS = None              # None = one per core
+SEED_OFFSET = 1             # candidates use SEED + SEED_OFFSET, households SEED
+LOW_INCOME_AGI = 50_000
+OBJECTIVES = ('Cross_Subsidy', 'Bill_Impact')
+COST_OF_SERVICE = {'peak': 0.20, 'offpeak': 0.10}  # marginal energy cost, $/kWh
+
+# Searched parameters: (low, high)
+SEARCH_SPACE = {
+    'distribution_cost_multiplier': (0.0, 120.0),  # $/month per unit of Wolak score
+    'igfc_low': (0.0, 50.0),
+    'igfc_step': (0.0, 100.0),                     # igfc_high = igfc_low + igfc_step
+    'igfc_threshold': (25_000.0, 150_000.0),
+    'peak_premium': (0.0, 0.30),                   # peak minus off-peak $/kWh, before calibration
+}
+# Candidate tariff; its energy rates start at Scenario 1's off-peak level and are scaled to revenue neutrality
+CANDIDATE_TARIFF = {
+    'volumetric': 'candidate_volumetric',
+    'energy': {'peak': 'candidate_peak', 'offpeak': 'candidate_offpeak'},
+    'capacity': 'distribution_cost_multiplier',
+    'income_fixed': {'thresholds': ['igfc_threshold'], 'charges': ['igfc_low', 'igfc_high']},
+}
+# ------------------------------------------------
+
+BATCH_CELLS = 1_000_000
+
+_STATE = None  # per-worker households and target revenue, set by _init_worker
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def sample_candidates(n=N_CANDIDATES, space=SEARCH_SPACE, seed=SEED + SEED_OFFSET):
+    """Latin hypercube sample of the search space, one row per candidate."""
+    rng = np.random.default_rng(seed)
+    out = {}
+    for name, (low, high) in space.items():
+        u = (rng.permutation(n) + rng.random(n)) / n
+        out[name] = low + u * (high - low)
+    if 'igfc_step' in out:
+        out['igfc_high'] = out['igfc_low'] + out.pop('igfc_step')
+    return pd.DataFrame(out)
+
+
+def candidate_params(candidates, base=TARIFFS[REFERENCE_TARIFF]):
+    """Model parameters for the candidates, as (candidates, 1) arrays, before calibration."""
+    params = {c: candidates[c].to_numpy(dtype='float64')[:, None] for c in candidates.columns if c != 'peak_premium'}
+    offpeak = base['energy']['offpeak']
+    params['candidate_volumetric'] = np.full_like(params['igfc_low'], base['volumetric'])
+    params['candidate_offpeak'] = np.full_like(params['igfc_low'], offpeak)
+    params['candidate_peak'] = offpeak + candidates['peak_premium'].to_numpy(dtype='float64')[:, None]
+    return params
+
+
+def cost_of_service(households, target, factor=1.0, cost=COST_OF_SERVICE):
+    """Annual cost each household causes: marginal energy plus a Wolak-score share of the rest.
+
+    `factor` is the tariff's usage multiplier from price_response (e.g. (candidates, 1)),
+    so the energy cost follows the usage the tariff actually produces.
+    """
+    periods, billed, _ = billing_inputs(households)
+    w = np.asarray(households['weight'], dtype='float64')
+    energy = 12 * (periods[..., 0] * cost['peak'] + periods[..., 1] * cost['offpeak'])
+    energy = energy * np.asarray(factor, dtype='float64')
+    score = billed['wolak_score']
+    residual = target - energy @ w
+    return energy + np.asarray(residual)[..., None] * score / (score @ w)
+
+
+def candidate_metrics(households, bill, reference_bill, cost):
+    """Per-candidate scores from (candidates, households) annual bills."""
+    w = np.asarray(households['weight'], dtype='float64')
+    ev = np.asarray(households['is_ev'], dtype=bool)
+    low = np.asarray(households['agi'], dtype='float64') < LOW_INCOME_AGI
+    change = bill - reference_bill
+    out = {
+        'Revenue': bill @ w,
+        'Cross_Subsidy': np.abs(bill - cost) @ w / w.sum(),
+        'Bill_Impact': np.abs(change) @ w / w.sum(),
+    }
+    if ev.any():
+        out['EV_Subsidy'] = (cost - bill) @ (w * ev) / w[ev].sum()
+    if low.any():
+        out['Low_Income_Change'] = change @ (w * low) / w[low].sum()
+    return out
+
+
+def _evaluate_candidates(candidates):
+    households, target = _STATE['households'], _STATE['target']
+    tariffs = {REFERENCE_TARIFF: TARIFFS[REFERENCE_TARIFF], 'candidate': CANDIDATE_TARIFF}
+    params = candidate_params(candidates)
+    calibrated = calibrate(households, CANDIDATE_TARIFF, 'energy', target, params, tariffs)
+    scale = calibrated['scale'][:, None]
+    for name in ('candidate_volumetric', 'candidate_peak', 'candidate_offpeak'):
+        params[name] = params[name] * scale
+
+    bills = scenario_bills(households, params, tariffs)
+    _, _, p = billing_inputs(households, params)
+    cost = cost_of_service(households, target, price_response(tariffs, p)['candidate'])
+    out = candidate_metrics(households, bills['bill_candidate'], bills[f'bill_{REFERENCE_TARIFF}'], cost)
+    out['Energy_Scale'] = calibrated['scale']
+    out['Feasible'] = calibrated['converged'] & (calibrated['scale'] > 0)
+    out['Volumetric'] = params['candidate_volumetric'][:, 0]
+    out['Peak'] = params['candidate_peak'][:, 0]
+    out['OffPeak'] = params['candidate_offpeak'][:, 0]
+    return out
+
+
+def pareto_front(values):
+    """Mask of the non-dominated rows of an (n, 2) array, both columns minimized."""
+    values = np.asarray(values, dtype='float64')
+    order = np.lexsort((values[:, 1], values[:, 0]))
+    second = values[order, 1]
+    best_before = np.concatenate([[np.inf], np.minimum.accumulate(second)[:-1]])
+    mask = np.zeros(len(values), dtype=bool)
+    mask[order] = second < best_before
+    return mask
+
+
+def optimize(households, candidates, workers=WORKERS, objectives=OBJECTIVES):
+    """Scores for every candidate plus an 'On_Frontier' column."""
+    if len(objectives) != 2:
+        raise ValueError(f"Two objectives are needed for the frontier, got {objectives}")
+    target = float(scenario_bills(households, tariffs={REFERENCE_TARIFF: TARIFFS[REFERENCE_TARIFF]})[
+        f'bill_{REFERENCE_TARIFF}'] @ households['weight'])
+    state = {'households': households, 'target': target}
+
+    chunk = max(1, BATCH_CELLS // len(households['usage_kwh']))
+    batches = [candidates.iloc[i:i + chunk] for i in range(0, len(candidates), chunk)]
+    workers = min(workers or os.cpu_count(), len(batches))
+    if workers <= 1:
+        _init_worker(state)
+        results = [_evaluate_candidates(b) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as pool:
+            results = list(pool.map(_evaluate_candidates, batches))
+
+    scored = pd.concat([candidates.reset_index(drop=True),
+                        pd.DataFrame({k: np.concatenate([r[k] for r in results]) for k in results[0]})], axis=1)
+    feasible = scored['Feasible'].to_numpy()
+    on_front = np.zeros(len(scored), dtype=bool)
+    on_front[feasible] = pareto_front(scored.loc[feasible, list(objectives)].to_numpy())
+    scored['On_Frontier'] = on_front
+    return scored, state
+
+
+def scenario_points(households, state, tariffs=TARIFFS):
+    """The named scenarios scored like the candidates (hand-typed rates, not recalibrated)."""
+    bills = scenario_bills(households, tariffs=tariffs)
+    response = price_response(tariffs, billing_inputs(households)[2])
+    rows = []
+    for s in tariffs:
+        cost = cost_of_service(households, state['target'], response[s])
+        row = candidate_metrics(households, bills[f'bill_{s}'][None, :], bills[f'bill_{REFERENCE_TARIFF}'],
+                                cost)
+        rows.append({'Scenario': s, **{k: float(v[0]) for k, v in row.items()}})
+    return pd.DataFrame(rows)
+
+
+def plot_frontier(scored, points, objectives=OBJECTIVES, path='Rate_Design_Pareto_Frontier.png'):
+    x, y = objectives
+    feasible = scored[scored['Feasible']]
+    front = feasible[feasible['On_Frontier']].sort_values(x)
+    fig, ax = plt.subplots(figsize=(11, 6.5))
+    ax.scatter(feasible[x], feasible[y], s=4, color='#bdc3c7', alpha=0.5, label='Revenue-neutral candidates')
+    ax.plot(front[x], front[y], marker='o', markersize=4, linewidth=2, color='#2980b9', label='Pareto frontier')
+    for _, row in points.iterrows():
+        ax.scatter(row[x], row[y], s=80, marker='D', zorder=3)
+        ax.annotate(row['Scenario'], (row[x], row[y]), xytext=(6, 6), textcoords='offset points',
+                    fontsize=11, fontweight='bold')
+    ax.set_xlabel(f"{x.replace('_', ' ')} ($/household-year)", fontsize=12, fontweight='bold')
+    ax.set_ylabel(f"{y.replace('_', ' ')} ($/household-year)", fontsize=12, fontweight='bold')
+    ax.set_title('Rate Design Frontier: Volumetric to Capacity + IGFC', fontsize=14, fontweight='bold', pad=15)
+    ax.grid(linestyle='--', alpha=0.7)
+    ax.legend(fontsize=11)
+    fig.tight_layout()
+    fig.savefig(path, dpi=300)
+    return fig
+
+
+def main():
+    # === Step 1: households and candidates ===
+    zip_inputs = load_zip_inputs()
+    households = population_sample(zip_inputs, POPULATION_SAMPLE, np.random.default_rng(SEED))
+    candidates = sample_candidates()
+    print(f"{len(candidates):,} candidates x {len(households['usage_kwh']):,} households")
+
+    # === Step 2: calibrate and score every candidate ===
+    start = time.time()
+    scored, state = optimize(households, candidates)
+    print(f"Scored in {time.time() - start:.1f}s; {scored['Feasible'].sum():,} revenue-neutral, "
+          f"{scored['On_Frontier'].sum():,} on the frontier")
+
+    # === Step 3: save and plot ===
+    points = scenario_points(households, state)
+    print(points.to_string(index=False))
+    frontier = scored[scored['On_Frontier']].sort_values(OBJECTIVES[0])
+    print(frontier.head(20).to_string(index=False))
+    frontier.to_csv('rate_design_pareto_frontier.csv', index=False)
+    points.to_csv('rate_design_scenario_points.csv', index=False)
+    plot_frontier(scored, points)
+    print("✅ Saved rate_design_pareto_frontier.csv, rate_design_scenario_points.csv and Rate_Design_Pareto_Frontier.png")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import time
+import numpy as np
+import pandas as pd
+
+from household_bills import SEED, load_zip_inputs, population_sample, profile_households
+from rate_uncertainty import run_monte_carlo
+
+# Which ModelingFixedCharge.py assumptions drive the EV cross-subsidy result?
+#
+# Global sensitivity of OUTPUTS (per-draw metrics from rate_uncertainty.draw_metrics) to the
+# parameters in PARAM_RANGES, each uniform on its range:
+#
+#   Sobol   Saltelli sampling: base matrices A and B (N_BASE rows each) plus one matrix per
+#           parameter, A with that column taken from B, so N_BASE x (parameters + 2) runs.
+#           First-order S1 (Saltelli 2010) and total ST (Jansen) indices, with bootstrap
+#           confidence half-widths.
+#   Morris  MORRIS_TRAJECTORIES one-at-a-time trajectories on a MORRIS_LEVELS grid;
+#           mu* (mean |elementary effect|) and sigma, in output units per full range.
+#
+# Every sample goes through rate_uncertainty.run_monte_carlo, i.e. scenario_bills on
+# (draws, 1) parameter arrays in batches on a process pool, never one call per sample.
+
+# ---------------- USER CONFIG ----------------
+N_BASE = 4_096
+MORRIS_TRAJECTORIES = 200
+MORRIS_LEVELS = 4
+BOOTSTRAP = 200
+SEED_OFFSET = 2             # samples use SEED + SEED_OFFSET, households SEED
+POPULATION_SAMPLE = 2_000   # synthetic households statewide (0 = the ModelingFixedCharge.py profiles)
+OUTPUTS = ('EV_Mean_Change_S3', 'NonEV_Mean_Change_S3')
+PARAM_RANGES = {
+    'elasticity': (-0.4, -0.05),
+    'peak_ratio': (0.15, 0.30),
+    'distribution_cost_multiplier': (45.0, 85.0),
+    'ev_variance_adder': (0.4, 1.6),
+    'igfc_low': (10.0, 40.0),
+    'igfc_high': (50.0, 100.0),
+}
+# ------------------------------------------------
+
+
+def _scale(unit, ranges):
+    low = np.array([lo for lo, _ in ranges.values()])
+    high = np.array([hi for _, hi in ranges.values()])
+    return pd.DataFrame(low + unit * (high - low), columns=list(ranges))
+
+
+def saltelli_samples(n=N_BASE, ranges=PARAM_RANGES, rng=None):
+    """Rows of A, then B, then A with column i from B for each parameter i (unit cube)."""
+    rng = rng or np.random.default_rng(SEED + SEED_OFFSET)
+    k = len(ranges)
+    a, b = rng.random((n, k)), rng.random((n, k))
+    ab = np.repeat(a[None], k, axis=0)
+    ab[np.arange(k), :, np.arange(k)] = b.T
+    return np.concatenate([a, b, ab.reshape(k * n, k)])
+
+
+def sobol_indices(values, n, k, bootstrap=BOOTSTRAP, rng=None):
+    """S1 and ST (with 95% bootstrap half-widths) from saltelli_samples outputs."""
+    rng = rng or np.random.default_rng(SEED + SEED_OFFSET)
+    f_a, f_b = values[:n], values[n:2 * n]
+    f_ab = values[2 * n:].reshape(k, n)
+
+    def estimate(idx):
+        # idx: (..., n) resampled rows
+        a, b, ab = f_a[idx], f_b[idx], f_ab[:, idx]
+        var = np.var(np.concatenate([a, b], axis=-1), axis=-1)
+        s1 = np.mean(b * (ab - a), axis=-1) / var
+        st = 0.5 * np.mean((a - ab) ** 2, axis=-1) / var
+        return s1, st
+
+    s1, st = estimate(np.arange(n))
+    boot_s1, boot_st = estimate(rng.integers(0, n, (bootstrap, n)))
+    return {
+        'S1': s1, 'S1_conf': 1.96 * boot_s1.std(axis=-1),
+        'ST': st, 'ST_conf': 1.96 * boot_st.std(axis=-1),
+    }
+
+
+def morris_samples(trajectories=MORRIS_TRAJECTORIES, k=len(PARAM_RANGES), levels=MORRIS_LEVELS, rng=None):
+    """(trajectories x (k + 1), k) unit-cube points and the parameter moved at each step."""
+    rng = rng or np.random.default_rng(SEED + SEED_OFFSET)
+    delta = levels / (2 * (levels - 1))
+    start_levels = np.arange(levels) / (levels - 1)
+    start_levels = start_levels[start_levels + delta <= 1 + 1e-12]
+    start = rng.choice(start_levels, (trajectories, k))
+    order = np.argsort(rng.random((trajectories, k)), axis=1)
+    steps = np.zeros((trajectories, k + 1, k))
+    steps[np.arange(trajectories)[:, None], np.arange(1, k + 1)[None, :], order] = delta
+    points = start[:, None, :] + np.cumsum(steps, axis=1)
+    return points.reshape(-1, k), order, delta
+
+
+def morris_indices(values, order, delta):
+    """mu* and sigma of the elementary effects, per parameter."""
+    trajectories, k = order.shape
+    effects = np.diff(values.reshape(trajectories, k + 1), axis=1) / delta
+    by_param = np.empty_like(effects)
+    by_param[np.arange(trajectories)[:, None], order] = effects
+    return {'Morris_mu_star': np.abs(by_param).mean(axis=0), 'Morris_sigma': by_param.std(axis=0, ddof=1)}
+
+
+def sensitivity_table(households, ranges=PARAM_RANGES, outputs=OUTPUTS, n=N_BASE,
+                      trajectories=MORRIS_TRAJECTORIES, seed=SEED + SEED_OFFSET):
+    """Sobol and Morris indices for every output x parameter, ranked by ST within each output."""
+    rng = np.random.default_rng(seed)
+    k = len(ranges)
+    sobol_unit = saltelli_samples(n, ranges, rng)
+    morris_unit, order, delta = morris_samples(trajectories, k, MORRIS_LEVELS, rng)
+    draws = _scale(np.concatenate([sobol_unit, morris_unit]), ranges)
+
+    start = time.time()
+    metrics = run_monte_carlo(households, draws, household_bands=False)['metrics']
+    print(f"{len(draws):,} model evaluations x {len(households['usage_kwh']):,} households "
+          f"in {time.time() - start:.1f}s")
+
+    frames = []
+    for output in outputs:
+        values = metrics[output].to_numpy()
+        table = pd.DataFrame({'Output': output, 'Parameter': list(ranges),
+                              **sobol_indices(values[:len(sobol_unit)], n, k, rng=rng),
+                              **morris_indices(values[len(sobol_unit):], order, delta)})
+        table = table.sort_values('ST', ascending=False)
+        table.insert(2, 'Rank', np.arange(1, k + 1))
+        frames.append(table)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    # === Step 1: households ===
+    zip_inputs = load_zip_inputs()
+    if POPULATION_SAMPLE:
+        households = population_sample(zip_inputs, POPULATION_SAMPLE, np.random.default_rng(SEED))
+    else:
+        _, households = profile_households(zip_inputs)
+
+    # === Step 2: Sobol and Morris indices ===
+    table = sensitivity_table(households)
+    print(table.round(3).to_string(index=False))
+    table.to_csv('rate_sensitivity_indices.csv', index=False)
+    print("✅ Saved rate_sensitivity_indices.csv")
+
+
+if __name__ == "__main__":
+    main()
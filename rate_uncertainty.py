@@ -0,0 +1,171 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from household_bills import load_zip_inputs, population_sample, profile_households, scenario_bills
+from tariffs import REFERENCE_TARIFF, TARIFFS
+
+# Monte Carlo over the rate-design assumptions in ModelingFixedCharge.py.
+#
+# The point values (elasticity, peak ratio, distribution cost multiplier, EV variance
+# add-on) are drawn from PARAM_DISTRIBUTIONS. Each batch of draws goes through
+# household_bills.scenario_bills as (draws, 1) parameter arrays against (households,)
+# arrays, so a batch is a few (draws x households) array operations. Batches run on a
+# process pool. Reported:
+#
+#   per draw       revenue per scenario and the cost shift onto EV / non-EV households
+#                  (weighted change in what each group pays vs Scenario 1)
+#   summary        mean, sd and the BAND quantiles of every per-draw metric
+#   per household  BAND quantiles of each household's bill change (kept when
+#                  draws x households stays under BAND_CELL_LIMIT)
+
+# ---------------- USER CONFIG ----------------
+N_DRAWS = 100_000
+DRAW_CHUNK = 5_000          # draws per batch (fewer when draws x households would pass BATCH_CELLS)
+WORKERS = None              # None = one per core
+SEED = 0
+BAND = (0.05, 0.5, 0.95)    # quantiles reported for the confidence bands
+POPULATION_SAMPLE = 2_000   # synthetic households for the statewide run (0 = profiles only)
+
+# name -> (distribution, *args):
+#   ('normal', mean, sd)   ('uniform', low, high)   ('triangular', low, mode, high)
+#   ('lognormal', median, sigma)   ('fixed', value)
+PARAM_DISTRIBUTIONS = {
+    'elasticity': ('triangular', -0.4, -0.2, -0.05),
+    'peak_ratio': ('uniform', 0.15, 0.30),
+    'distribution_cost_multiplier': ('normal', 65.0, 10.0),
+    'ev_variance_adder': ('lognormal', 0.8, 0.3),
+}
+# ------------------------------------------------
+
+BATCH_CELLS = 1_000_000
+BAND_CELL_LIMIT = 50_000_000
+
+_HOUSEHOLDS = None  # per-worker households and tariffs, set by _init_worker
+_TARIFFS = None
+
+
+def _init_worker(households, tariffs):
+    global _HOUSEHOLDS, _TARIFFS
+    _HOUSEHOLDS, _TARIFFS = households, tariffs
+
+
+def draw_parameters(distributions=PARAM_DISTRIBUTIONS, n_draws=N_DRAWS, seed=SEED):
+    """One row per draw, one column per parameter."""
+    rng = np.random.default_rng(seed)
+    draws = {}
+    for name, (kind, *args) in distributions.items():
+        if kind == 'normal':
+            draws[name] = rng.normal(args[0], args[1], n_draws)
+        elif kind == 'uniform':
+            draws[name] = rng.uniform(args[0], args[1], n_draws)
+        elif kind == 'triangular':
+            draws[name] = rng.triangular(args[0], args[1], args[2], n_draws)
+        elif kind == 'lognormal':
+            draws[name] = args[0] * np.exp(args[1] * rng.standard_normal(n_draws))
+        elif kind == 'fixed':
+            draws[name] = np.full(n_draws, float(args[0]))
+        else:
+            raise ValueError(f"Unknown distribution {kind!r} for {name}")
+    return pd.DataFrame(draws)
+
+
+def draw_metrics(households, bills, reference=REFERENCE_TARIFF):
+    """Per-draw revenue and EV / non-EV cost shifts (vs `reference`) from (draws, households) bills."""
+    w = np.asarray(households['weight'], dtype='float64')
+    ev = np.asarray(households['is_ev'], dtype=bool)
+    scenarios = [k[len('bill_'):] for k in bills if k.startswith('bill_')]
+    shape = np.broadcast_shapes(*(np.shape(bills[f'bill_{s}']) for s in scenarios))
+    bill = {s: np.broadcast_to(bills[f'bill_{s}'], shape) for s in scenarios}
+
+    metrics = {f'Revenue_{s}': bill[s] @ w for s in scenarios}
+    others = [s for s in scenarios if s != reference]
+    for s in others:
+        change = bill[s] - bill[reference]
+        metrics[f'EV_Shift_{s}'] = change @ (w * ev)
+        metrics[f'NonEV_Shift_{s}'] = change @ (w * ~ev)
+        if ev.any():
+            metrics[f'EV_Mean_Change_{s}'] = metrics[f'EV_Shift_{s}'] / w[ev].sum()
+        if (~ev).any():
+            metrics[f'NonEV_Mean_Change_{s}'] = metrics[f'NonEV_Shift_{s}'] / w[~ev].sum()
+    return metrics, {s: bill[s] - bill[reference] for s in others}
+
+
+def _evaluate_draws(task):
+    params, keep_changes = task
+    bills = scenario_bills(_HOUSEHOLDS, {k: v[:, None] for k, v in params.items()}, _TARIFFS)
+    metrics, changes = draw_metrics(_HOUSEHOLDS, bills)
+    return metrics, (changes if keep_changes else None)
+
+
+def run_monte_carlo(households, draws, tariffs=TARIFFS, chunk=DRAW_CHUNK, workers=WORKERS, band=BAND,
+                    household_bands=True):
+    """Evaluate every draw x household; returns per-draw metrics, their summary and household bands."""
+    n_households = len(households['usage_kwh'])
+    keep_changes = household_bands and len(draws) * n_households <= BAND_CELL_LIMIT
+    chunk = max(1, min(chunk, BATCH_CELLS // max(n_households, 1)))
+    tasks = [({c: draws[c].to_numpy(dtype='float64')[i:i + chunk] for c in draws.columns}, keep_changes)
+             for i in range(0, len(draws), chunk)]
+
+    workers = min(workers or os.cpu_count(), len(tasks))
+    if workers <= 1:
+        _init_worker(households, tariffs)
+        results = [_evaluate_draws(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(households, tariffs)) as pool:
+            results = list(pool.map(_evaluate_draws, tasks))
+
+    metrics = pd.DataFrame({k: np.concatenate([r[0][k] for r in results]) for k in results[0][0]})
+    summary = metrics.quantile(list(band)).T
+    summary.columns = [f'P{q * 100:g}' for q in band]
+    summary.insert(0, 'SD', metrics.std())
+    summary.insert(0, 'Mean', metrics.mean())
+
+    bands = None
+    if keep_changes:
+        cols = {}
+        for s in results[0][1]:
+            change = np.concatenate([r[1][s] for r in results])
+            cols[f'Mean_Change_{s}'] = change.mean(axis=0)
+            for q, values in zip(band, np.quantile(change, band, axis=0)):
+                cols[f'P{q * 100:g}_Change_{s}'] = values
+        bands = pd.DataFrame(cols)
+    elif household_bands:
+        print(f"Skipping per-household bands: {len(draws):,} draws x {n_households:,} households is too many cells.")
+    return {'draws': draws, 'metrics': metrics, 'summary': summary, 'bands': bands}
+
+
+def main():
+    # === Step 1: parameter draws ===
+    draws = draw_parameters()
+    print(f"{len(draws):,} draws of {list(draws.columns)}")
+
+    # === Step 2: the ModelingFixedCharge.py profiles ===
+    zip_inputs = load_zip_inputs()
+    labels, profiles = profile_households(zip_inputs)
+    start = time.time()
+    result = run_monte_carlo(profiles, draws)
+    print(f"Profiles: {len(draws) * len(labels):,} draw x household bills in {time.time() - start:.1f}s")
+    bands = result['bands']
+    bands.insert(0, 'Profile_Name', [label.replace('\n', ' ') for label in labels])
+    print(bands.to_string(index=False))
+    bands.to_csv('mc_profile_bill_bands.csv', index=False)
+    result['summary'].to_csv('mc_profile_summary.csv')
+
+    # === Step 3: statewide synthetic sample ===
+    if POPULATION_SAMPLE:
+        households = population_sample(zip_inputs, POPULATION_SAMPLE, np.random.default_rng(SEED))
+        start = time.time()
+        result = run_monte_carlo(households, draws)
+        print(f"Population: {len(draws) * len(households['usage_kwh']):,} draw x household bills "
+              f"in {time.time() - start:.1f}s")
+        print(result['summary'].to_string())
+        result['summary'].to_csv('mc_population_summary.csv')
+    print("✅ Saved Monte Carlo bands and summaries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,18 @@
-import geopandas as gpd
 import pandas as pd
 
+from zcta_store import load_zcta_keys
+
 # -----------------------------
-# 1. Load the ZCTA shapefile
+# 1. Load the ZCTA keys
 # -----------------------------
+# The ZCTA store keeps every national zip5 key next to the California geometry,
+# so this no longer needs to parse the national shapefile.
 shapefile_path = "/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/tl_2025_us_zcta520/tl_2025_us_zcta520.shp"
 
-gdf = gpd.read_file(shapefile_path)
-
-print("Columns in shapefile:", gdf.columns)
-
-# Use the ZCTA5CE20 column
-if 'ZCTA5CE20' in gdf.columns:
-    gdf['ZCTA'] = gdf['ZCTA5CE20']
-else:
-    raise ValueError("Could not find ZCTA5CE20 column in shapefile.")
+zctas = load_zcta_keys(shp_path=shapefile_path)
 
 # Get sorted list of all ZCTAs
-zcta_list = sorted(gdf['ZCTA'].unique())
+zcta_list = sorted(zctas.unique())
 print(f"\nNumber of ZCTAs in shapefile: {len(zcta_list)}")
 print("Sample of ZCTAs:", zcta_list[:20])
 
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from match_keys import DAY_BITS, zip_day_keys
+
+# Tolerance-based linkage of CA interconnection records to LBNL TTS systems.
+#
+# The CA side is sorted once by (ZIP, approval day). Each probe row (a TTS system) looks up
+# the slice of CA records in its ZIP within +/- DATE_TOLERANCE_DAYS with two binary searches,
+# so the work is proportional to the candidates found, never to |CA| x |TTS|. Candidates
+# outside the size tolerance are dropped per chunk, which keeps memory bounded by the number
+# of plausible pairs rather than the size of the national file.
+#
+# Candidates are then assigned one-to-one: in each round a pair is accepted when it is the
+# best remaining candidate for both its TTS row and its CA record (lowest score, ties broken
+# by row order). That is the greedy best-first assignment, done in vectorized rounds.
+
+# ---------------- USER CONFIG ----------------
+DATE_TOLERANCE_DAYS = 14   # |TTS installation date - CA approval date|
+SIZE_TOLERANCE_KW = 0.05   # |size difference| allowed is the larger of this ...
+SIZE_TOLERANCE_REL = 0.02  # ... and this fraction of the CA system size
+# ------------------------------------------------
+
+
+def build_index(zips, dates, sizes):
+    """Sorted (ZIP, day) keys and sizes for the side being matched against."""
+    keys = zip_day_keys(zips, dates)
+    valid = np.flatnonzero(keys >= 0)
+    order = valid[np.argsort(keys[valid], kind="stable")]
+    size = pd.to_numeric(pd.Series(sizes), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return {"row": order, "key": keys[order], "size": size[order]}
+
+
+def candidate_pairs(index, zips, dates, sizes, date_tol=DATE_TOLERANCE_DAYS,
+                    size_tol_kw=SIZE_TOLERANCE_KW, size_tol_rel=SIZE_TOLERANCE_REL):
+    """Every (probe row, indexed row) pair within the date and size tolerances.
+
+    Returns probe position, indexed row, signed date difference (probe - indexed, days),
+    signed size difference and a score (each difference as a fraction of its tolerance).
+    """
+    keys = zip_day_keys(zips, dates)
+    size = pd.to_numeric(pd.Series(sizes), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    probe = np.flatnonzero((keys >= 0) & np.isfinite(size))
+    keys, size = keys[probe], size[probe]
+
+    # Clamp the window to this ZIP's day range so it can't run into a neighbouring ZIP
+    zip_base = (keys >> DAY_BITS) << DAY_BITS
+    lo = np.searchsorted(index["key"], np.maximum(keys - date_tol, zip_base), side="left")
+    hi = np.searchsorted(index["key"], np.minimum(keys + date_tol, zip_base + 2 ** DAY_BITS - 1), side="right")
+    counts = hi - lo
+
+    # Expand each probe's [lo, hi) slice into one candidate per indexed row
+    which = np.repeat(np.arange(len(probe)), counts)
+    pos = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    date_diff = keys[which] - index["key"][pos]
+    size_diff = size[which] - index["size"][pos]
+    size_tol = np.maximum(size_tol_kw, size_tol_rel * np.abs(index["size"][pos]))
+    keep = np.abs(size_diff) <= size_tol
+
+    date_diff, size_diff, size_tol = date_diff[keep], size_diff[keep], size_tol[keep]
+    score = np.abs(date_diff) / max(date_tol, 1) + np.abs(size_diff) / np.maximum(size_tol, 1e-9)
+    return pd.DataFrame({
+        "probe": probe[which[keep]],
+        "row": index["row"][pos[keep]],
+        "date_diff_days": date_diff,
+        "size_diff": size_diff,
+        "score": score,
+    })
+
+
+def assign_one_to_one(cands):
+    """Accept mutual-best candidates round by round until none are left."""
+    remaining = cands.sort_values(["score", "probe", "row"], kind="stable")
+    accepted = []
+    rounds = 0
+    while len(remaining):
+        rounds += 1
+        # Sorted by score, so the first candidate of each probe / row is its best
+        mutual = remaining[~remaining["probe"].duplicated() & ~remaining["row"].duplicated()]
+        accepted.append(mutual)
+        remaining = remaining[~remaining["probe"].isin(mutual["probe"]) & ~remaining["row"].isin(mutual["row"])]
+    pairs = pd.concat(accepted, ignore_index=True) if accepted else cands.iloc[:0]
+    pairs.attrs["rounds"] = rounds
+    return pairs
+
+
+def match_quality(pairs, cands, n_probe, n_index):
+    """Match counts, rates and how far matched records sit from each other."""
+    probes_with_cands = cands["probe"].nunique()
+    stats = {
+        "probe_rows": n_probe,
+        "index_rows": n_index,
+        "candidates": len(cands),
+        "probe_rows_with_candidates": probes_with_cands,
+        "ambiguous_probe_rows": int((cands["probe"].value_counts() > 1).sum()),
+        "matched": len(pairs),
+        "match_rate_probe": len(pairs) / n_probe if n_probe else 0.0,
+        "match_rate_index": len(pairs) / n_index if n_index else 0.0,
+        "lost_to_one_to_one": probes_with_cands - len(pairs),
+        "exact": int(((pairs["date_diff_days"] == 0) & (pairs["size_diff"].abs() < 1e-6)).sum()),
+        "assignment_rounds": pairs.attrs.get("rounds", 0),
+    }
+    for q in (0.5, 0.9, 0.99):
+        stats[f"abs_date_diff_days_p{int(q * 100)}"] = float(pairs["date_diff_days"].abs().quantile(q)) if len(pairs) else np.nan
+        stats[f"abs_size_diff_p{int(q * 100)}"] = float(pairs["size_diff"].abs().quantile(q)) if len(pairs) else np.nan
+    return stats
+
+
+def print_match_quality(stats):
+    print("\n--- Match quality ---")
+    for key, value in stats.items():
+        if isinstance(value, float):
+            print(f"{key:>30}: {value:,.4f}")
+        else:
+            print(f"{key:>30}: {value:,}")
+
+
+def chunk_candidates(index, chunk, probe_cols=("zip_code", "installation_date", "PV_system_size_DC"),
+                     offset=0, **tolerances):
+    """candidate_pairs for one probe frame, with the probe row's own columns attached.
+
+    Probe ids are chunk positions + `offset`, so they stay unique across chunks.
+    """
+    cands = candidate_pairs(index, *(chunk[c] for c in probe_cols), **tolerances)
+    rows = chunk.iloc[cands["probe"].to_numpy()].reset_index(drop=True)
+    cands["probe"] += offset
+    return pd.concat([cands, rows], axis=1)
+
+
+def resolve_links(cands, index_df, n_probe):
+    """One-to-one assignment over every chunk's candidates.
+
+    Returns the matched probe rows joined to their CA record (prefixed 'ca_') plus the
+    date and size differences, and the match-quality stats.
+    """
+    pairs = assign_one_to_one(cands)
+    stats = match_quality(pairs, cands, n_probe, len(index_df))
+    matched = pairs.drop(columns=["probe", "row", "score", "date_diff_days", "size_diff"]).reset_index(drop=True)
+    ca = index_df.iloc[pairs["row"].to_numpy()].add_prefix("ca_").reset_index(drop=True)
+    matched = pd.concat([matched, ca, pairs[["date_diff_days", "size_diff"]].reset_index(drop=True)], axis=1)
+    return matched, stats
+
+
+def link_records(index_df, probe_chunks, index_cols=("zip_code", "installation_date", "system_size_dc"),
+                 probe_cols=("zip_code", "installation_date", "PV_system_size_DC"), **tolerances):
+    """Link a stream of probe frames (TTS chunks) one-to-one onto `index_df` (CA records).
+
+    Only probe rows that have at least one candidate are kept between chunks.
+    """
+    index = build_index(*(index_df[c] for c in index_cols))
+    all_cands = []
+    offset = 0
+    for chunk in probe_chunks:
+        all_cands.append(chunk_candidates(index, chunk, probe_cols, offset, **tolerances))
+        offset += len(chunk)
+        print(f"Linked chunk: {len(chunk):,} rows, {len(all_cands[-1]):,} candidate pairs")
+
+    cands = pd.concat(all_cands, ignore_index=True) if all_cands else candidate_pairs(index, [], [], [])
+    return resolve_links(cands, index_df, offset)
@@ -1,13 +1,18 @@
 import os
-import glob
 import re
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 
+from interconnection_io import load_and_concat_csvs, load_projected_csvs, folder_signature
+from zip_codes import normalize_zips
+from pv_capacity_cube import build_cube, save_cube, load_cube, cube_signature, yearly_totals
+
 
 # ---------------- USER CONFIG ----------------
 CSV_FOLDER = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/Interconnected_Project_Sites_2025-08-31 (2)'
+PROJECTED_INGEST = True  # parse only the COLUMN_MAP columns, one file per core
+CUBE_PATH = r'/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Aggregated_Data_Solar/pv_capacity_cube_timeseries.npz'  # own cube: clean_df differs from SolarPVData.py's cleaning
 # ------------------------------------------------
 
 
@@ -18,6 +23,16 @@ COLUMN_MAP = {
     "app_approved_date": "App Approved Date",
     "technology_type": "Technology Type",
     "customer_sector": "Customer Sector",
+    "service_zip": "Service Zip",
+}
+
+# Projected ingest keeps the original names, so clean_df works on either loader
+INGEST_PATTERNS = {name: [rf"^{re.escape(name)}$"] for name in COLUMN_MAP.values()}
+INGEST_TYPES = {
+    COLUMN_MAP["system_size_ac"]: "float",
+    COLUMN_MAP["app_approved_date"]: "datetime",
+    COLUMN_MAP["technology_type"]: "category",
+    COLUMN_MAP["customer_sector"]: "category",
 }
 
 
@@ -28,6 +43,7 @@ def clean_df(raw):
     df["system_size_ac"] = pd.to_numeric(raw[COLUMN_MAP["system_size_ac"]], errors="coerce")
     df["technology_type"] = raw[COLUMN_MAP["technology_type"]].astype(str).str.strip()
     df["customer_sector"] = raw[COLUMN_MAP["customer_sector"]].astype(str).str.strip()
+    df["service_zip"] = normalize_zips(raw[COLUMN_MAP["service_zip"]])
 
     df["app_approved_date"] = pd.to_datetime(
         raw[COLUMN_MAP["app_approved_date"]],
@@ -38,39 +54,13 @@ def clean_df(raw):
     return df
 
 
-def load_and_concat_csvs(folder):
-    paths = glob.glob(os.path.join(folder, "*.csv"))
-    if not paths:
-        raise FileNotFoundError(f"No CSVs found in {folder}")
-
-    dfs = []
-    for p in paths:
-        try:
-            df = pd.read_csv(p, low_memory=False)
-            df["__source_file"] = os.path.basename(p)
-            dfs.append(df)
-        except Exception as e:
-            print(f"WARNING: failed to read {p}: {e}")
-
-    return pd.concat(dfs, ignore_index=True)
 
+def make_yearly_aggregations(cube):
+    # --- Residential PV per approval year, straight from the capacity cube ---
+    yearly = yearly_totals(cube, sector="residential")
 
-def make_yearly_aggregations(df):
-    # --- Filter to Photovoltaic systems ---
-    mask_pv = df["technology_type"].str.contains("photovoltaic", case=False, na=False)
-    df_pv = df[mask_pv].copy()
-
-    # --- Filter to Residential ---
-    mask_res = df_pv["customer_sector"].str.contains("residential", case=False, na=False)
-    df_res = df_pv[mask_res].copy()
-
-    # --- Extract approval year ---
-    df_res["year"] = df_res["app_approved_date"].dt.year
-    df_res = df_res.dropna(subset=["year"])
-
-    # --- Aggregate by year ---
-    yearly_capacity = df_res.groupby("year")["system_size_ac"].sum().sort_index().reset_index()
-    yearly_count = df_res.groupby("year").size().sort_index().reset_index(name="installations")
+    yearly_capacity = yearly[["year", "system_size_ac"]].copy()
+    yearly_count = yearly[["year", "installations"]].copy()
 
     # --- Make cumulative sums ---
     yearly_capacity["system_size_ac_cumu"] = yearly_capacity["system_size_ac"].cumsum()
@@ -81,6 +71,28 @@ def make_yearly_aggregations(df):
     return yearly_capacity, yearly_count
 
 
+def load_or_build_cube():
+    signature = cube_signature(f"solar_timeseries.clean_df|{folder_signature(CSV_FOLDER)}")
+    cube = load_cube(CUBE_PATH, signature)
+    if cube is not None:
+        print(f"Reusing capacity cube {CUBE_PATH}")
+        return cube
+
+    print("Loading raw CSVs...")
+    if PROJECTED_INGEST:
+        raw = load_projected_csvs(CSV_FOLDER, INGEST_PATTERNS, types=INGEST_TYPES)
+    else:
+        raw = load_and_concat_csvs(CSV_FOLDER)
+    print(f"Loaded {len(raw):,} rows.\n")
+
+    print("Cleaning...")
+    cube = build_cube(clean_df(raw), signature=signature)
+    os.makedirs(os.path.dirname(CUBE_PATH), exist_ok=True)
+    save_cube(cube, CUBE_PATH)
+    print(f"Saved capacity cube to {CUBE_PATH}")
+    return cube
+
+
 def plot_yearly_capacity(yearly_capacity):
     plt.figure(figsize=(10, 6))
     plt.plot(
@@ -120,15 +132,10 @@ def plot_yearly_count(yearly_count):
 
 
 def main():
-    print("Loading raw CSVs...")
-    raw = load_and_concat_csvs(CSV_FOLDER)
-    print(f"Loaded {len(raw):,} rows.\n")
-
-    print("Cleaning...")
-    cleaned = clean_df(raw)
+    cube = load_or_build_cube()
 
     print("Aggregating by year...")
-    yearly_capacity, yearly_count = make_yearly_aggregations(cleaned)
+    yearly_capacity, yearly_count = make_yearly_aggregations(cube)
 
     print("\n--- Yearly Installed Capacity (MW) ---")
     print(yearly_capacity)
@@ -0,0 +1,194 @@
+import numpy as np
+
+# Declarative tariffs for the fixed-charge scenarios.
+#
+# A tariff is a dict of components, all monthly:
+#   'volumetric'    headline $/kWh; the elasticity response follows its % change
+#                   vs REFERENCE_TARIFF (left out = no response)
+#   'energy'        $/kWh per TOU period in PERIODS, or one number for every period
+#   'tiers'         [[upper kWh, $/kWh], ..., [None, $/kWh]] on total monthly kWh,
+#                   added to any 'energy' charge (baseline allowance = first tier)
+#   'fixed'         $/month
+#   'income_fixed'  {'thresholds': [AGI, ...], 'charges': [$/month, ...]}, one more charge
+#                   than thresholds; AGI above a threshold moves up a charge
+#   'capacity'      $/month per unit of the household's 'wolak_score'
+#
+# Any number may instead be the name of a model parameter (household_bills.DEFAULT_PARAMS
+# or an override). Parameters can be arrays such as (draws, 1), so one compiled tariff
+# bills many parameter sets at once. compile_tariff turns a tariff into a function that
+# bills a (..., households, periods) usage matrix with array operations only.
+
+# ---------------- USER CONFIG ----------------
+PERIODS = ('peak', 'offpeak')
+REFERENCE_TARIFF = 'S1'
+TARIFFS = {
+    'S1': {  # Volumetric rate (status quo)
+        'volumetric': 0.45,
+        'energy': {'peak': 0.57, 'offpeak': 0.42},
+    },
+    'S2': {  # Current CPUC flat fixed charge
+        'volumetric': 0.39,
+        'energy': {'peak': 0.51, 'offpeak': 0.36},
+        'fixed': 24.15,
+    },
+    'S3': {  # Wolak capacity charge + income-graduated fixed charge
+        'volumetric': 0.20,
+        'energy': {'peak': 0.32, 'offpeak': 0.17},
+        'capacity': 'distribution_cost_multiplier',
+        'income_fixed': {'thresholds': ['igfc_threshold'], 'charges': ['igfc_low', 'igfc_high']},
+    },
+    # A fourth scenario is one more entry, e.g. a tiered baseline allowance on top of TOU:
+    # 'S4': {
+    #     'volumetric': 0.35,
+    #     'energy': {'peak': 0.45, 'offpeak': 0.30},
+    #     'tiers': [[300, 0.0], [None, 0.08]],
+    #     'fixed': 12.0,
+    # },
+}
+# ------------------------------------------------
+
+COMPONENTS = ('volumetric', 'energy', 'tiers', 'fixed', 'income_fixed', 'capacity')
+
+
+def resolve(value, params):
+    """`value`, or the parameter it names."""
+    if isinstance(value, str):
+        if value not in params:
+            raise ValueError(f"Tariff refers to unknown parameter {value!r}")
+        return params[value]
+    return value
+
+
+def _energy_rates(tariff, periods):
+    energy = tariff.get('energy', 0.0)
+    if not isinstance(energy, dict):
+        return [energy] * len(periods)
+    unknown = sorted(set(energy) - set(periods))
+    if unknown:
+        raise ValueError(f"Energy rates for unknown periods {unknown}; periods are {list(periods)}")
+    return [energy.get(p, 0.0) for p in periods]
+
+
+def check_tariff(tariff, periods=PERIODS):
+    """ValueError if `tariff` has unknown components or malformed tiers / income charges."""
+    unknown = sorted(set(tariff) - set(COMPONENTS))
+    if unknown:
+        raise ValueError(f"Unknown tariff components {unknown}; expected some of {list(COMPONENTS)}")
+    _energy_rates(tariff, periods)
+    tiers = tariff.get('tiers')
+    if tiers is not None and (not tiers or tiers[-1][0] is not None):
+        raise ValueError("The last tier must be [None, rate] (no upper limit)")
+    income = tariff.get('income_fixed')
+    if income is not None and len(income['charges']) != len(income['thresholds']) + 1:
+        raise ValueError("income_fixed needs one more charge than thresholds")
+
+
+def compile_tariff(tariff, periods=PERIODS):
+    """Evaluator bill(usage, households, params) for one tariff.
+
+    `usage` is (..., households, len(periods)) kWh per month; `households` holds 'agi' and,
+    for capacity charges, 'wolak_score'. Returns monthly 'energy', 'fixed' (every fixed
+    piece), 'bill', plus 'capacity' / 'access' when the tariff has them.
+    """
+    check_tariff(tariff, periods)
+    energy_rates = _energy_rates(tariff, periods)
+    constant_energy = not any(isinstance(r, str) for r in energy_rates)
+    rate_vector = np.asarray(energy_rates, dtype='float64') if constant_energy else None
+    tiers = tariff.get('tiers')
+    income = tariff.get('income_fixed')
+
+    def bill(usage, households, params):
+        usage = np.asarray(usage, dtype='float64')
+        if constant_energy:
+            energy = usage @ rate_vector
+        else:
+            rates = np.stack(np.broadcast_arrays(*[np.asarray(resolve(r, params), dtype='float64')
+                                                   for r in energy_rates]), axis=-1)
+            energy = (usage * rates).sum(axis=-1)
+
+        if tiers is not None:
+            total = usage.sum(axis=-1)
+            lower = 0.0
+            for upper, rate in tiers:
+                rate = resolve(rate, params)
+                if upper is None:
+                    energy = energy + rate * np.maximum(total - lower, 0.0)
+                else:
+                    upper = resolve(upper, params)
+                    energy = energy + rate * np.clip(total - lower, 0.0, np.maximum(upper - lower, 0.0))
+                    lower = upper
+
+        out = {'energy': energy}
+        fixed = resolve(tariff.get('fixed', 0.0), params)
+        if income is not None:
+            agi = np.asarray(households['agi'], dtype='float64')
+            charges = [resolve(c, params) for c in income['charges']]
+            access = charges[0]
+            for threshold, below, above in zip(income['thresholds'], charges[:-1], charges[1:]):
+                access = access + np.where(agi > resolve(threshold, params), np.subtract(above, below), 0.0)
+            out['access'] = access
+            fixed = fixed + access
+        if 'capacity' in tariff:
+            out['capacity'] = np.asarray(households['wolak_score'], dtype='float64') * resolve(tariff['capacity'], params)
+            fixed = fixed + out['capacity']
+        out['fixed'] = fixed
+        out['bill'] = fixed + energy
+        return out
+
+    return bill
+
+
+def compile_tariffs(tariffs=TARIFFS, periods=PERIODS):
+    return {name: compile_tariff(t, periods) for name, t in tariffs.items()}
+
+
+def price_response(tariffs, params, reference=REFERENCE_TARIFF):
+    """Usage multiplier per tariff: 1 + elasticity x % change in the headline volumetric rate."""
+    base = resolve(tariffs[reference].get('volumetric'), params)
+    out = {}
+    for name, t in tariffs.items():
+        if base is None or t.get('volumetric') is None:
+            out[name] = 1.0
+        else:
+            out[name] = 1 + params['elasticity'] * (resolve(t['volumetric'], params) - base) / base
+    return out
+
+
+def tou_usage(usage_kwh, peak_share):
+    """(..., households, 2) peak / off-peak kWh from monthly kWh and the peak share."""
+    usage_kwh, peak_share = np.broadcast_arrays(np.asarray(usage_kwh, dtype='float64'),
+                                                np.asarray(peak_share, dtype='float64'))
+    return np.stack([usage_kwh * peak_share, usage_kwh * (1 - peak_share)], axis=-1)
+
+
+def scale_tariff(tariff, scale, part, params):
+    """Copy of `tariff` with its 'energy' part (volumetric, energy and tier rates) or its
+    'fixed' part (fixed, income-graduated and capacity charges) multiplied by `scale`.
+
+    Parameter names in the scaled part are replaced by their values in `params`.
+    """
+    if part not in ('energy', 'fixed'):
+        raise ValueError(f"part must be 'energy' or 'fixed', not {part!r}")
+    out = dict(tariff)
+
+    def times(value):
+        return resolve(value, params) * scale
+
+    if part == 'energy':
+        if 'volumetric' in out:
+            out['volumetric'] = times(out['volumetric'])
+        if isinstance(out.get('energy'), dict):
+            out['energy'] = {p: times(r) for p, r in out['energy'].items()}
+        elif 'energy' in out:
+            out['energy'] = times(out['energy'])
+        if 'tiers' in out:
+            out['tiers'] = [[upper, times(rate)] for upper, rate in out['tiers']]
+    else:
+        if 'fixed' in out:
+            out['fixed'] = times(out['fixed'])
+        if 'income_fixed' in out:
+            out['income_fixed'] = {**out['income_fixed'],
+                                   'charges': [times(c) for c in out['income_fixed']['charges']]}
+        if 'capacity' in out:
+            out['capacity'] = times(out['capacity'])
+    return out
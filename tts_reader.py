@@ -0,0 +1,130 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.compute as pc
+
+from zip_codes import normalize_zips_arrow
+
+# Streaming reader for the LBNL Tracking the Sun national file. Blocks are parsed by Arrow,
+# rows outside California are dropped while still in Arrow, and only the survivors are
+# typed and handed to pandas, so the ~2/3 of the file that can never match costs one parse.
+
+# ---------------- USER CONFIG ----------------
+STATES = ("CA",)                  # keep rows whose `state` is one of these
+ZIP_RANGE = ('90000', '96199')    # used instead when the file has no `state` column
+BLOCK_SIZE = 64 << 20             # bytes of CSV parsed per batch
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d-%b-%Y")
+# ------------------------------------------------
+
+# Arrow types applied during the parse (name -> (parse type, final type)); any other
+# requested column stays a string. Sizes are parsed as float64 and then narrowed, which
+# rounds exactly like pd.to_numeric(...).astype('float32') on the CA side.
+COLUMN_TYPES = {
+    "PV_system_size_DC": (pa.float64(), pa.float32()),
+}
+DATE_COLUMNS = ("installation_date",)
+
+
+def _parse_dates(values):
+    """First DATE_FORMATS match per value, then pandas for the rest; unparseable -> null (like errors='coerce')."""
+    parsed = [pc.strptime(values, format=fmt, unit="s", error_is_null=True) for fmt in DATE_FORMATS]
+    parsed = pc.coalesce(*parsed)
+    # strptime reads a 2-digit %Y as year 00xx; send those to pandas too
+    parsed = pc.if_else(pc.less(pc.year(parsed), 1900), pa.scalar(None, parsed.type), parsed)
+
+    # Layouts outside DATE_FORMATS (times of day, 2-digit years, ...) go through pandas
+    missed = pc.and_(pc.is_null(parsed), pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(values)), 0))
+    n_missed = pc.sum(missed).as_py() or 0
+    if not n_missed:
+        return parsed
+    fallback = pd.to_datetime(pc.filter(values, missed).to_pandas(), errors="coerce", format="mixed")
+    n_bad = int(fallback.isna().sum())
+    if n_bad:
+        print(f"⚠️ {n_bad:,} of {len(values):,} date values could not be parsed; left as null")
+    fallback = pa.Array.from_pandas(fallback).cast(pa.timestamp("s"), safe=False)
+    return pc.replace_with_mask(parsed, missed, fallback)
+
+
+def _keep_mask(batch, states, zip_range):
+    names = batch.schema.names
+    if "state" in names:
+        return pc.is_in(pc.utf8_trim_whitespace(batch.column("state")), value_set=pa.array(states))
+    zips = pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(batch.column("zip_code")), 0, 5)
+    lo, hi = zip_range
+    return pc.and_(pc.greater_equal(zips, lo), pc.less_equal(zips, hi))
+
+
+def read_header(path):
+    return pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=1 << 16)).schema.names
+
+
+def byte_ranges(path, n_parts):
+    """Split the data rows of a CSV into ~n_parts (start, end) byte ranges on line boundaries.
+
+    Assumes no quoted field spans lines, which holds for the TTS extracts.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        bounds = [f.tell()]
+        for k in range(1, n_parts):
+            f.seek(max(bounds[0], size * k // n_parts))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    bounds = sorted(set(bounds))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_tts_batches(path, columns, states=STATES, zip_range=ZIP_RANGE, block_size=BLOCK_SIZE, byte_range=None):
+    """Typed Arrow record batches of `columns`, California rows only.
+
+    zip_code comes out as a normalized 5-digit string, DATE_COLUMNS as timestamps and
+    COLUMN_TYPES as their final type; everything else as read. byte_range=(start, end)
+    reads just that slice of data rows (see byte_ranges).
+    """
+    header = read_header(path)
+    filter_cols = ["state"] if "state" in header else ["zip_code"]
+    read_cols = list(dict.fromkeys(list(columns) + filter_cols))
+
+    types = {c: COLUMN_TYPES.get(c, (pa.string(),))[0] for c in read_cols}
+    read_options = pcsv.ReadOptions(block_size=block_size, use_threads=True)
+    source = path
+    if byte_range is not None:
+        start, end = byte_range
+        with open(path, "rb") as f:
+            f.seek(start)
+            source = pa.BufferReader(f.read(end - start))
+        read_options.column_names = header
+    reader = pcsv.open_csv(
+        source,
+        read_options=read_options,
+        convert_options=pcsv.ConvertOptions(include_columns=read_cols, column_types=types,
+                                            strings_can_be_null=True),
+    )
+    for batch in reader:
+        batch = batch.filter(_keep_mask(batch, states, zip_range))
+        if batch.num_rows == 0:
+            continue
+        arrays = []
+        for c in columns:
+            if c == "zip_code":
+                arrays.append(normalize_zips_arrow(batch.column(c)))
+            elif c in DATE_COLUMNS:
+                arrays.append(_parse_dates(batch.column(c)))
+            elif c in COLUMN_TYPES:
+                arrays.append(batch.column(c).cast(COLUMN_TYPES[c][-1]))
+            else:
+                arrays.append(batch.column(c))
+        yield pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+
+def tts_chunks(path, columns, **kwargs):
+    """read_tts_batches as pandas frames (ZIPs already normalized like the CA side)."""
+    for batch in read_tts_batches(path, columns, **kwargs):
+        df = batch.to_pandas()
+        for c in DATE_COLUMNS:
+            if c in df.columns:
+                df[c] = df[c].astype("datetime64[ns]")
+        yield df
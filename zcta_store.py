@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from zip_codes import extract_zip
+
+# California-only ZCTA geometry store. Built once from the national TIGER shapefile,
+# then every map script reads a small GeoParquet instead of parsing ~33k national polygons.
+#
+#   ca_zcta_4269.parquet   NAD83 lon/lat (the shapefile's own CRS)
+#   ca_zcta_3310.parquet   California Albers, for maps drawn in metres
+#   zcta_keys_us.parquet   every national zip5 key (no geometry)
+#
+# Each layer also has simplified copies (ca_zcta_3310_statewide.parquet, ...). Neighbouring
+# polygons are simplified as one coverage, so shared edges stay shared (no slivers or gaps).
+# load_zcta(figsize=..., dpi=...) picks the coarsest level whose error stays under one pixel.
+
+# ---------------- USER CONFIG ----------------
+ZCTA_SHP_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/tl_2025_us_zcta520/tl_2025_us_zcta520.shp'
+STORE_DIR = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/zcta_store'
+CA_ZIP_RANGE = ('90000', '96199')
+
+# Simplification level -> max edge displacement in metres (EPSG:3310), coarsest first
+SIMPLIFY_LEVELS = {
+    "statewide": 250,
+    "regional": 50,
+    "detail": 10,
+}
+RENDER_DPI = 300
+# ------------------------------------------------
+
+STORE_CRS = (4269, 3310)
+KEYS_NAME = "zcta_keys_us.parquet"
+META_NAME = "meta.json"
+
+
+def store_path(crs, store_dir=STORE_DIR, level=None):
+    suffix = "" if level is None else f"_{level}"
+    return os.path.join(store_dir, f"ca_zcta_{crs}{suffix}.parquet")
+
+
+def find_zip_column(gdf):
+    for c in gdf.columns:
+        if re.search(r"zip|zcta|zip5|zcta5", c, flags=re.I):
+            return c
+    raise KeyError("Could not find a ZIP column name in the shapefile. Columns: " + ", ".join(gdf.columns.astype(str)))
+
+
+def simplify_coverage(geoms, tolerance):
+    """Simplify adjacent polygons together so shared boundaries move as one edge."""
+    if hasattr(shapely, "coverage_simplify"):
+        return shapely.coverage_simplify(geoms, tolerance, simplify_boundary=True)
+    # GEOS < 3.12: per-polygon simplification (valid shapes, but neighbours may drift apart)
+    return shapely.simplify(geoms, tolerance, preserve_topology=True)
+
+
+def vertex_count(gdf):
+    return int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+
+
+def build_store(shp_path=ZCTA_SHP_PATH, store_dir=STORE_DIR):
+    """One-time build: national shapefile -> California GeoParquet in each STORE_CRS."""
+    print(f"Building CA ZCTA store from {shp_path} ...")
+    zctas = gpd.read_file(shp_path)
+    zctas["zip5"] = extract_zip(zctas[find_zip_column(zctas)])
+    zctas = zctas[zctas["zip5"].notna()]
+
+    os.makedirs(store_dir, exist_ok=True)
+    pd.DataFrame({"zip5": sorted(zctas["zip5"].unique())}).to_parquet(os.path.join(store_dir, KEYS_NAME), index=False)
+
+    lo, hi = CA_ZIP_RANGE
+    ca = zctas[(zctas["zip5"] >= lo) & (zctas["zip5"] <= hi)]
+    keep = ["zip5"] + [c for c in ("ALAND20", "AWATER20") if c in ca.columns] + ["geometry"]
+    ca = ca[keep].sort_values("zip5").reset_index(drop=True)
+
+    # Tolerances are in metres, so every level is simplified in California Albers
+    albers = ca.to_crs(epsg=3310)
+    levels = {None: albers}
+    for level, tolerance in SIMPLIFY_LEVELS.items():
+        levels[level] = albers.set_geometry(simplify_coverage(albers.geometry.values, tolerance), crs=albers.crs)
+
+    vertices = {}
+    for level, layer in levels.items():
+        vertices[level or "full"] = vertex_count(layer)
+        for crs in STORE_CRS:
+            out = layer if crs == 3310 else layer.to_crs(epsg=crs)
+            out.to_parquet(store_path(crs, store_dir, level), index=False)
+
+    st = os.stat(shp_path)
+    with open(os.path.join(store_dir, META_NAME), "w") as f:
+        json.dump({"source": os.path.abspath(shp_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                   "zip_range": list(CA_ZIP_RANGE), "n_zcta": len(ca),
+                   "bounds_3310": [float(b) for b in albers.total_bounds],
+                   "levels": SIMPLIFY_LEVELS, "vertices": vertices}, f, indent=1)
+    print(f"Saved {len(ca):,} California ZCTAs to {store_dir}")
+    print("Vertices per level: " + ", ".join(f"{k} {v:,}" for k, v in vertices.items()))
+
+
+def _read_meta(store_dir):
+    with open(os.path.join(store_dir, META_NAME), "r") as f:
+        return json.load(f)
+
+
+def _source_changed(meta, shp_path):
+    """True when the shapefile the store was built from has been replaced since."""
+    if not os.path.exists(shp_path):
+        return False  # nothing to rebuild from; keep the store
+    st = os.stat(shp_path)
+    return (meta.get("size"), meta.get("mtime_ns")) != (st.st_size, st.st_mtime_ns)
+
+
+def _ensure_store(shp_path, store_dir):
+    shp_path = shp_path or ZCTA_SHP_PATH
+    layers = [store_path(crs, store_dir, level) for crs in STORE_CRS for level in [None, *SIMPLIFY_LEVELS]]
+    if all(os.path.exists(p) for p in layers + [os.path.join(store_dir, META_NAME)]):
+        meta = _read_meta(store_dir)
+        if meta.get("levels") == SIMPLIFY_LEVELS and not _source_changed(meta, shp_path):
+            return
+    build_store(shp_path, store_dir)
+
+
+def pick_level(figsize, dpi=RENDER_DPI, bounds=None, store_dir=STORE_DIR):
+    """Coarsest simplification level whose error is under one output pixel; None means full detail.
+
+    The map is assumed to fill the whole figure, which overstates the pixel density a bit
+    (titles, legends and margins take space) and so errs towards finer geometry.
+    """
+    if bounds is None:
+        bounds = _read_meta(store_dir)["bounds_3310"]
+    minx, miny, maxx, maxy = bounds
+    width_px, height_px = figsize[0] * dpi, figsize[1] * dpi
+    # An equal-aspect map is scaled to whichever side runs out first
+    metres_per_px = max((maxx - minx) / width_px, (maxy - miny) / height_px)
+    for level, tolerance in SIMPLIFY_LEVELS.items():
+        if tolerance < metres_per_px:
+            return level
+    return None
+
+
+def load_zcta(crs=4269, store_dir=STORE_DIR, shp_path=None, figsize=None, dpi=RENDER_DPI, level=None):
+    """California ZCTA polygons keyed by normalized `zip5`, in EPSG:4269 or EPSG:3310.
+
+    Pass the figure size (inches) and dpi of the map to get the coarsest geometry that is
+    indistinguishable at that resolution, or name a SIMPLIFY_LEVELS `level` directly.
+    """
+    if crs not in STORE_CRS:
+        raise ValueError(f"ZCTA store holds EPSG {STORE_CRS}, not {crs}")
+    if level is not None and level not in SIMPLIFY_LEVELS:
+        raise ValueError(f"Unknown simplification level {level!r}; expected one of {list(SIMPLIFY_LEVELS)}")
+    _ensure_store(shp_path, store_dir)
+    if level is None and figsize is not None:
+        level = pick_level(figsize, dpi, store_dir=store_dir)
+    return gpd.read_parquet(store_path(crs, store_dir, level))
+
+
+def load_zcta_keys(store_dir=STORE_DIR, shp_path=None):
+    """Every national ZCTA key, without geometry."""
+    _ensure_store(shp_path, store_dir)
+    return pd.read_parquet(os.path.join(store_dir, KEYS_NAME))["zip5"]
+
+
+if __name__ == "__main__":
+    build_store()
@@ -0,0 +1,203 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype, pandas_dtype
+
+from interconnection_io import file_signature
+from zip_codes import N_ZIPS, zip_index, zip_labels
+from zip_sources import SOURCES
+
+# Dense per-ZIP metric arrays. Every metric is a float64 array whose position is the integer
+# ZIP (shape (100000,), or (100000, n_years) for per-ZIP-year sources), saved as .npy and
+# memory-mapped on open. Each metric's source dtype is recorded and restored by join (integer
+# counts with gaps come back as nullable Int64). Joining EV counts, PV capacity, income, population, dwellings and
+# households is then plain array indexing: no zero-padding, hashing or merge.
+#
+#   <source>.<metric>.npy   NaN where the source has no value
+#   <source>.__present.npy  bool: the source has a row for that ZIP (ZIP-year)
+#   meta.json               per source: input signature, years, metric names and dtypes
+#
+# Sources are re-read only when their input file changes (size / mtime).
+
+# ---------------- USER CONFIG ----------------
+STORE_DIR = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/zip_array_store'
+# ------------------------------------------------
+
+PRESENT = "__present"
+META_NAME = "meta.json"
+
+
+def _array_path(store_dir, source, name):
+    return os.path.join(store_dir, f"{source}.{name}.npy")
+
+
+def _save_array(path, arr):
+    np.save(path + ".tmp.npy", arr)
+    os.replace(path + ".tmp.npy", path)
+
+
+def _load_meta(store_dir):
+    path = os.path.join(store_dir, META_NAME)
+    if not os.path.exists(path):
+        return {"sources": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_meta(store_dir, meta):
+    path = os.path.join(store_dir, META_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def write_source(store_dir, source, df, per_year):
+    """Scatter one source frame ('zip' [+ 'year'] + numeric metrics) into dense arrays."""
+    idx = zip_index(df["zip"])
+    keep = idx >= 0
+    df, idx = df[keep], idx[keep]
+    metrics = [c for c in df.columns if c not in ("zip", "year") and is_numeric_dtype(df[c])]
+
+    years = None
+    if per_year:
+        years = np.unique(df["year"].to_numpy(dtype=np.int64))
+        pos = (idx, np.searchsorted(years, df["year"].to_numpy(dtype=np.int64)))
+        shape = (N_ZIPS, len(years))
+    else:
+        pos = (idx,)
+        shape = (N_ZIPS,)
+
+    flat = np.ravel_multi_index(pos, shape)
+    if len(np.unique(flat)) < len(flat):
+        keys = ["zip", "year"] if per_year else ["zip"]
+        dups = df.loc[pd.Series(flat).duplicated(keep=False).to_numpy(), keys].drop_duplicates()
+        raise ValueError(f"'{source}' has {len(dups):,} duplicated {'/'.join(keys)} keys, "
+                         f"e.g. {dups.head(3).to_dict('records')}")
+
+    present = np.zeros(shape, dtype=bool)
+    present[pos] = True
+    _save_array(_array_path(store_dir, source, PRESENT), present)
+    for m in metrics:
+        arr = np.full(shape, np.nan)
+        arr[pos] = df[m].to_numpy(dtype="float64", na_value=np.nan)
+        _save_array(_array_path(store_dir, source, m), arr)
+    return {"years": None if years is None else years.tolist(), "metrics": metrics,
+            "dtypes": {m: str(df[m].dtype) for m in metrics}}
+
+
+def build_store(store_dir=STORE_DIR, paths=None, force=False):
+    """Write arrays for every source whose input file is new or changed; returns the meta."""
+    os.makedirs(store_dir, exist_ok=True)
+    meta = _load_meta(store_dir)
+    for source, (reader, default_path, per_year) in SOURCES.items():
+        path = (paths or {}).get(source, default_path)
+        if not os.path.exists(path):
+            if source not in meta["sources"]:
+                print(f"⚠️ No input for '{source}' at {path}; its metrics are unavailable.")
+            continue
+        sig = file_signature(path)
+        if not force and meta["sources"].get(source, {}).get("signature") == sig:
+            continue
+        print(f"Storing '{source}' from {path} ...")
+        info = write_source(store_dir, source, reader(path), per_year)
+        meta["sources"][source] = {**info, "signature": sig, "path": os.path.abspath(path)}
+        _save_meta(store_dir, meta)
+    return meta
+
+
+def open_store(store_dir=STORE_DIR, paths=None, build=True):
+    """Handle on the store (refreshed from its inputs first unless build=False)."""
+    meta = build_store(store_dir, paths) if build else _load_meta(store_dir)
+    owner = {m: s for s, info in meta["sources"].items() for m in info["metrics"]}
+    return {"dir": store_dir, "meta": meta, "owner": owner, "arrays": {}}
+
+
+def metrics(store, source):
+    return list(store["meta"]["sources"][source]["metrics"])
+
+
+def _array(store, source, name):
+    key = (source, name)
+    if key not in store["arrays"]:
+        store["arrays"][key] = np.load(_array_path(store["dir"], source, name), mmap_mode="r")
+    return store["arrays"][key]
+
+
+def _at_year(store, source, arr, year):
+    years = store["meta"]["sources"][source]["years"]
+    if years is None:
+        return arr
+    if year not in years:
+        return np.zeros(N_ZIPS, dtype=arr.dtype) if arr.dtype == bool else np.full(N_ZIPS, np.nan)
+    return arr[:, years.index(year)]
+
+
+def _owner(store, metric):
+    if metric not in store["owner"]:
+        raise KeyError(f"'{metric}' is not in the ZIP store. Available: {sorted(store['owner'])}")
+    return store["owner"][metric]
+
+
+def column(store, metric, year=None):
+    """A metric as a (N_ZIPS,) array indexed by integer ZIP; per-year metrics need `year`."""
+    source = _owner(store, metric)
+    return _at_year(store, source, _array(store, source, metric), year)
+
+
+def typed(store, metric, values):
+    """`values` (float64, NaN = missing) of a metric as a Series in its source dtype."""
+    source = _owner(store, metric)
+    dtype = pandas_dtype(store["meta"]["sources"][source].get("dtypes", {}).get(metric, "float64"))
+    values = pd.Series(values)
+    if (is_integer_dtype(dtype) or is_bool_dtype(dtype)) and values.isna().any():
+        return values.astype("Int64" if is_integer_dtype(dtype) else "boolean")
+    return values.astype(dtype)
+
+
+def present(store, source, year=None):
+    return _at_year(store, source, _array(store, source, PRESENT), year)
+
+
+def lookup(store, metric, zips, year=None):
+    """Values of a metric for ZIP strings (NaN where the ZIP is unknown)."""
+    idx = zip_index(zips)
+    values = np.asarray(column(store, metric, year))[np.maximum(idx, 0)]
+    return np.where(idx >= 0, values, np.nan)
+
+
+def join(store, names, year=None):
+    """Metrics side by side for ZIPs present in every metric's source (an inner join).
+
+    With year=None and any per-year metric, every year is stacked into a long frame
+    with a 'Year' column. Metrics come back in their source dtypes (see typed).
+    """
+    out = _join(store, names, year)
+    for m in names:
+        out[m] = typed(store, m, out[m].to_numpy())
+    return out
+
+
+def _join(store, names, year=None):
+    sources = list(dict.fromkeys(_owner(store, m) for m in names))
+    yearly = [s for s in sources if store["meta"]["sources"][s]["years"] is not None]
+    if year is None and yearly:
+        years = sorted(set().union(*(store["meta"]["sources"][s]["years"] for s in yearly)))
+        frames = [_join(store, names, y).assign(Year=y) for y in years]
+        out = pd.concat(frames, ignore_index=True)
+        return out[["Year"] + [c for c in out.columns if c != "Year"]]
+
+    mask = np.ones(N_ZIPS, dtype=bool)
+    for s in sources:
+        mask &= present(store, s, year)
+    zips = np.flatnonzero(mask)
+    out = {"Zip Code": zip_labels(zips)}
+    for m in names:
+        out[m] = np.asarray(column(store, m, year))[zips]
+    return pd.DataFrame(out)
+
+
+if __name__ == "__main__":
+    meta = build_store()
+    for source, info in meta["sources"].items():
+        print(f"{source}: {len(info['metrics'])} metrics, years {info['years']}")
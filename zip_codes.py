@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# Arrow-backed strings keep the str.* calls below in compiled code instead of a Python loop
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+N_ZIPS = 100_000  # every 5-digit ZIP as an integer position
+
+
+def _as_object(s):
+    # Callers expect plain str values with None for missing, like the old row-wise helpers
+    out = s.astype(object)
+    out[s.isna().to_numpy()] = None
+    return out
+
+
+_POW10 = 10 ** np.arange(4, -1, -1, dtype=np.int64)
+
+
+def _leading_five(n):
+    """First five digits of integers, zero-padded (e.g. ZIP+4 stored as a number)."""
+    n = np.abs(n.astype(np.int64))
+    ndigits = np.floor(np.log10(np.maximum(n, 1))).astype(np.int64) + 1
+    n = np.where(ndigits > 5, n // 10 ** np.maximum(ndigits - 5, 0), n)
+    # Build the 5 digit code points arithmetically and view them as fixed-width str
+    codes = (n[:, None] // _POW10 % 10 + ord("0")).astype(np.uint32)
+    return codes.view("<U5").ravel()
+
+
+_STRIP_PATTERN = r"\.0+\s*$|\D"
+
+
+def _normalize_text(text):
+    # One pass drops a trailing '.0' (floats written out as text, e.g. '9025.0') and every non-digit
+    digits = text.str.replace(_STRIP_PATTERN, "", regex=True)
+    digits = digits.where(digits.str.len() > 0)
+    return digits.str.slice(0, 5).str.pad(5, side="left", fillchar="0")
+
+
+def normalize_zips(values):
+    """Vectorized 5-digit ZIP normalization.
+
+    Handles integer/float columns (94025.0, 9025 -> '09025'), ZIP+4 ('94025-1234'),
+    stray characters and zero-padding. Returns an object Series of str, None when
+    no digits are left.
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if is_numeric_dtype(s) and not is_bool_dtype(s):
+        num = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        whole = np.isfinite(num) & (num == np.floor(num))
+        out = np.full(len(num), None, dtype=object)
+        out[whole] = _leading_five(num[whole]).astype(object)
+        fractional = np.isfinite(num) & ~whole
+        if fractional.any():
+            text = pd.Series(num[fractional].astype(str), dtype=STRING_DTYPE)
+            out[fractional] = _as_object(_normalize_text(text)).to_numpy()
+        return pd.Series(out, index=s.index, name=s.name)
+
+    return _as_object(_normalize_text(s.astype(STRING_DTYPE)))
+
+
+def normalize_zips_arrow(values):
+    """normalize_zips for an Arrow string array, staying in Arrow (nulls where no digits are left)."""
+    import pyarrow.compute as pc
+    digits = pc.replace_substring_regex(values, pattern=_STRIP_PATTERN, replacement="")
+    digits = pc.if_else(pc.equal(pc.utf8_length(digits), 0), None, digits)
+    return pc.utf8_lpad(pc.utf8_slice_codeunits(digits, 0, 5), width=5, padding="0")
+
+
+def extract_zip(values):
+    """Pull the first 5-digit run out of labels like 'ZCTA5 95014'."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    return _as_object(s.astype(STRING_DTYPE).str.extract(r"(\d{5})", expand=False))
+
+
+def zip_index(zips):
+    """Integer positions for 5-digit ZIP strings; -1 where missing or not a ZIP."""
+    num = pd.to_numeric(pd.Series(zips), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    ok = np.isfinite(num) & (num >= 0) & (num < N_ZIPS)
+    return np.where(ok, num, -1).astype(np.int64)
+
+
+def zip_labels(idx):
+    return np.char.zfill(np.asarray(idx).astype(str), 5).astype(object)
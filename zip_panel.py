@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from interconnection_io import file_signature
+from zip_sources import SOURCES
+from zip_codes import N_ZIPS, zip_labels
+from zip_array_store import STORE_DIR, open_store, present, column, typed
+
+# One (ZIP, year) analysis panel: EV counts and shares, PV aggregates, income and population,
+# dwellings and households side by side, with a has_<source> flag per row for each source.
+# Per-ZIP sources repeat across years. Rows are every ZIP that appears in any source, for
+# every EV year. This is the analysis scripts' one entry point to the joined ZIP data;
+# zip_array_store is only its storage.
+#
+# The panel is cached as parquet, keyed by a content hash of each input file. Hashes are
+# memoized by file size / mtime, so an unchanged setup only stats the inputs and reads one
+# small parquet.
+
+# ---------------- USER CONFIG ----------------
+PANEL_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/zip_year_panel.parquet'
+# ------------------------------------------------
+
+KEY_COLUMNS = {"Zip Code": "string", "Year": "int16"}
+
+
+def content_hash(path, memo=None):
+    """sha1 of a file's bytes, reusing `memo` when its size and mtime are unchanged."""
+    sig = file_signature(path)
+    if memo and memo.get("signature") == sig:
+        return memo["sha1"], memo
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest(), {"signature": sig, "sha1": h.hexdigest()}
+
+
+def _meta_path(panel_path):
+    return panel_path + ".meta.json"
+
+
+def _load_meta(panel_path):
+    if not os.path.exists(_meta_path(panel_path)):
+        return {}
+    with open(_meta_path(panel_path), "r") as f:
+        return json.load(f)
+
+
+def _save_meta(panel_path, meta):
+    path = _meta_path(panel_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def input_hashes(paths=None, memo=None):
+    """Source name -> content hash (None when the input is missing), plus the updated memo."""
+    hashes, new_memo = {}, {}
+    for source, (_, default_path, _) in SOURCES.items():
+        path = (paths or {}).get(source, default_path)
+        if not os.path.exists(path):
+            hashes[source] = None
+            continue
+        hashes[source], new_memo[source] = content_hash(path, (memo or {}).get(source))
+    return hashes, new_memo
+
+
+def assemble_panel(store):
+    """Materialize the typed panel from the ZIP array store."""
+    sources = store["meta"]["sources"]
+    years = sorted(set().union(*(info["years"] or [] for info in sources.values())))
+    any_present = np.zeros(N_ZIPS, dtype=bool)
+    for source in sources:
+        for year in years or [None]:
+            any_present |= np.asarray(present(store, source, year))
+    zips = np.flatnonzero(any_present)
+
+    frames = []
+    for year in years:
+        frame = {"Zip Code": zip_labels(zips), "Year": year}
+        for source, info in sources.items():
+            frame[f"has_{source}"] = np.asarray(present(store, source, year))[zips]
+            for m in info["metrics"]:
+                frame[m] = np.asarray(column(store, m, year))[zips]
+        frames.append(pd.DataFrame(frame))
+    panel = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(KEY_COLUMNS))
+
+    # Keys typed; presence flags bool; metrics in their source dtypes (NaN / <NA> = not reported)
+    types = dict(KEY_COLUMNS)
+    types.update({c: "bool" for c in panel.columns if c.startswith("has_")})
+    panel = panel.astype(types)
+    for c in panel.columns:
+        if c not in types:
+            panel[c] = typed(store, c, panel[c].to_numpy(dtype="float64")).array
+    return panel
+
+
+def load_panel(panel_path=PANEL_PATH, paths=None, store_dir=STORE_DIR, rebuild=False):
+    """The (ZIP, year) panel, rebuilt only when an input's content changed."""
+    meta = _load_meta(panel_path)
+    hashes, memo = input_hashes(paths, meta.get("memo"))
+    if not rebuild and meta.get("inputs") == hashes and os.path.exists(panel_path):
+        if meta.get("memo") != memo:
+            # Touched but unchanged inputs: remember the new mtimes so they aren't rehashed
+            _save_meta(panel_path, {**meta, "memo": memo})
+        return pd.read_parquet(panel_path)
+
+    print("Building ZIP-year panel ...")
+    panel = assemble_panel(open_store(store_dir, paths))
+    panel.to_parquet(panel_path + ".tmp", index=False)
+    os.replace(panel_path + ".tmp", panel_path)
+    _save_meta(panel_path, {"inputs": hashes, "memo": memo, "rows": len(panel)})
+    print(f"Saved {len(panel):,} ZIP-year rows to {panel_path}")
+    return panel
+
+
+if __name__ == "__main__":
+    panel = load_panel(rebuild=True)
+    print(panel.dtypes)
@@ -0,0 +1,72 @@
+import json
+import pandas as pd
+
+from zip_codes import normalize_zips, extract_zip
+
+# Readers for the per-ZIP inputs the analysis scripts join together. Each returns a frame
+# keyed by a normalized 5-digit 'zip' (plus 'year' for per-ZIP-year sources) with numeric
+# metric columns, named the way the scripts already refer to them.
+
+# ---------------- USER CONFIG ----------------
+EV_SHARE_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/ev_share_long.csv'
+PV_AGG_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Aggregated_Data_Solar/pv_capacity_ac_by_zip_up_to_2025_agg.csv'
+INCOME_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/CA_income_population.csv'
+DWELLINGS_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/DwellingData/2023Dwellings.csv'
+HOUSEHOLDS_PATH = '/Users/dannysalingerbrown/Desktop/Electricity_Prices_Project/Data/Households.json'
+# ------------------------------------------------
+
+
+def read_ev_share(path=EV_SHARE_PATH):
+    """EVMaps.py output: vehicle totals, BEVs, PHEVs and shares per ZIP and year."""
+    df = pd.read_csv(path)
+    df = df.rename(columns={'Zip Code': 'zip', 'Year': 'year'})
+    df['zip'] = normalize_zips(df['zip'])
+    return df[df['zip'].notna()]
+
+
+def read_pv_aggregates(path=PV_AGG_PATH):
+    """SolarPVData.py output: PV capacity and counts per ZIP."""
+    df = pd.read_csv(path)
+    df['zip'] = normalize_zips(df['zip'])
+    return df[df['zip'].notna()]
+
+
+def read_income(path=INCOME_PATH):
+    """Compile_Income&Population.py output: CAAGI, population and CAAGI per capita per ZIP."""
+    df = pd.read_csv(path, dtype={'ZipCode': str})
+    df = df.rename(columns={'ZipCode': 'zip'})
+    df['zip'] = normalize_zips(df['zip'])
+    return df[df['zip'].notna()]
+
+
+def read_dwellings(path=DWELLINGS_PATH):
+    """ACS B25024 single-family detached units (total and vacant) per ZCTA."""
+    df = pd.read_csv(path)
+    out = pd.DataFrame({
+        'zip': extract_zip(df['NAME']),
+        'num_detached': pd.to_numeric(df['B25024_002E'], errors='coerce'),
+        'detached_vacant': pd.to_numeric(df['B25024_010E'], errors='coerce'),
+    })
+    return out[out['zip'].notna()]
+
+
+def read_households(path=HOUSEHOLDS_PATH):
+    """ACS B11001 households per ZCTA (Census API JSON: header row, then data rows)."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    df = pd.DataFrame(data[1:], columns=data[0])
+    out = pd.DataFrame({
+        'zip': normalize_zips(df['zip code tabulation area']),
+        'num_households': pd.to_numeric(df['B11001_001E'], errors='coerce'),
+    })
+    return out[out['zip'].notna()]
+
+
+# Source name -> (reader, default path, per-ZIP-year?)
+SOURCES = {
+    'ev': (read_ev_share, EV_SHARE_PATH, True),
+    'pv': (read_pv_aggregates, PV_AGG_PATH, False),
+    'income': (read_income, INCOME_PATH, False),
+    'dwellings': (read_dwellings, DWELLINGS_PATH, False),
+    'households': (read_households, HOUSEHOLDS_PATH, False),
+}